@@ -0,0 +1,91 @@
+"""Measures ``challtools compose --all`` on a large synthetic CTF.
+
+A temporary CTF with many multi-container challenges is generated and the two
+stages of compose generation are timed separately: loading and validating every
+challenge config, with an empty and with a warm validation cache, in this
+process and in a process pool, and generating the compose file from the loaded
+configs.
+
+Run with ``python benchmarks/compose_all.py [-n COUNT] [-j JOBS]``.
+"""
+
+import argparse
+import copy
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from challtools.utils import discover_challenges, generate_compose, load_valid_configs
+
+
+def make_config(i):
+    return {
+        "title": f"benchmark challenge {i}",
+        "description": "benchmark description",
+        "authors": ["author"],
+        "categories": ["web"],
+        "flag_format_prefix": "CTF{",
+        "flags": f"flag_{i}",
+        "deployment": {
+            "type": "docker",
+            "containers": {
+                f"web-{i}": {
+                    "image": "container",
+                    "services": [{"type": "website", "internal_port": 80}],
+                },
+                f"db-{i}": {"image": "postgres"},
+            },
+            "networks": {f"internal-{i}": [f"web-{i}", f"db-{i}"]},
+            "volumes": {f"data-{i}": [{f"db-{i}": "/var/lib/postgresql/data"}]},
+        },
+        "challenge_id": f"00000000-0000-0000-0000-{i:012}",
+        "spec": "0.0.1",
+    }
+
+
+def make_ctf(root, count):
+    (root / "ctf.yml").write_text("categories: [web]\n")
+    for i in range(count):
+        challdir = root / "challenges" / f"chall-{i}"
+        (challdir / "container").mkdir(parents=True)
+        (challdir / "challenge.yml").write_text(yaml.dump(make_config(i)))
+
+
+def measure(name, function):
+    start = time.perf_counter()
+    result = function()
+    print(f"{name:<32} {time.perf_counter() - start:8.3f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=1000, help="Amount of challenges")
+    parser.add_argument(
+        "-j", "--jobs", type=int, default=None, help="Amount of processes"
+    )
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        make_ctf(root, args.n)
+        os.chdir(root)
+        paths = discover_challenges()
+        print(f"{len(paths)} challenges, {args.jobs or os.cpu_count()} jobs")
+
+        measure("load, cold cache, pool", lambda: load_valid_configs(paths, args.jobs))
+        measure("load, warm cache, serial", lambda: load_valid_configs(paths, 1))
+        configs = measure(
+            "load, warm cache, pool", lambda: load_valid_configs(paths, args.jobs)
+        )
+
+        # generate_compose renames containers in place
+        copies = copy.deepcopy(configs)
+        measure("generate compose", lambda: generate_compose(copies, True))
+
+
+if __name__ == "__main__":
+    main()
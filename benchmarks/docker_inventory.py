@@ -0,0 +1,154 @@
+"""Measures the pre-flight checks of start_chall against a host with many images.
+
+The current targeted lookups (one inspect request per image, network and volume
+the challenge uses) are compared against the previous approach, which listed
+every image, network and volume on the host and searched the result. Listing
+images with the docker SDK is particularly expensive, since it inspects every
+listed image with a separate request.
+
+The docker daemon is replaced by a fake API client that keeps its inventory in
+memory, serializes every response to JSON and waits a fixed time per request to
+simulate the round trip to the daemon.
+
+Run with ``python benchmarks/docker_inventory.py [-n IMAGES] [--latency MS]``.
+"""
+
+import argparse
+import json
+import time
+
+import docker
+
+from challtools.utils import docker_resource_exists
+
+
+class FakeAPIClient:
+    """Implements the parts of docker.APIClient used by the image, network and volume collections."""
+
+    def __init__(self, image_count, latency):
+        self.latency = latency
+        self.requests = 0
+        self.images_by_id = {}
+        self.ids_by_tag = {}
+        for i in range(image_count):
+            image_id = f"sha256:{i:064x}"
+            tag = f"cached_image_{i}:latest"
+            self.images_by_id[image_id] = {
+                "Id": image_id,
+                "RepoTags": [tag],
+                "Config": {"Labels": {}},
+            }
+            self.ids_by_tag[tag] = image_id
+        self.networks_by_name = {
+            name: {"Id": name, "Name": name}
+            for name in ["bridge", "host", "none", "chall_net"]
+        }
+        self.volumes_by_name = {
+            f"volume_{i}": {"Name": f"volume_{i}"} for i in range(100)
+        }
+
+    def _respond(self, data):
+        self.requests += 1
+        time.sleep(self.latency)
+        return json.loads(json.dumps(data))
+
+    def images(self, name=None, all=False, filters=None):
+        return self._respond(
+            [
+                {"Id": image["Id"], "RepoTags": image["RepoTags"]}
+                for image in self.images_by_id.values()
+            ]
+        )
+
+    def inspect_image(self, name):
+        if name in self.images_by_id:
+            image_id = name
+        else:
+            image_id = self.ids_by_tag.get(name if ":" in name else f"{name}:latest")
+        if image_id is None:
+            self._respond(None)
+            raise docker.errors.ImageNotFound(f"No such image: {name}")
+        return self._respond(self.images_by_id[image_id])
+
+    def networks(self, *args, **kwargs):
+        return self._respond(list(self.networks_by_name.values()))
+
+    def inspect_network(self, name, *args, **kwargs):
+        if name not in self.networks_by_name:
+            self._respond(None)
+            raise docker.errors.NotFound(f"network {name} not found")
+        return self._respond(self.networks_by_name[name])
+
+    def volumes(self, **kwargs):
+        return self._respond({"Volumes": list(self.volumes_by_name.values())})
+
+    def inspect_volume(self, name):
+        if name not in self.volumes_by_name:
+            self._respond(None)
+            raise docker.errors.NotFound(f"get {name}: no such volume")
+        return self._respond(self.volumes_by_name[name])
+
+
+def make_client(image_count, latency):
+    # an explicit version keeps the client from contacting a daemon
+    client = docker.DockerClient(base_url="unix:///nonexistent", version="1.41")
+    client.api = FakeAPIClient(image_count, latency)
+    return client
+
+
+def check_listing(client, tags, networks, volumes):
+    tag_list = [
+        tag.split(":")[0]
+        for img in client.images.list()
+        for tag in img.attrs["RepoTags"]
+    ]
+    network_list = [network.name for network in client.networks.list()]
+    volume_list = [volume.name for volume in client.volumes.list()]
+    return (
+        all(tag in tag_list for tag in tags)
+        and all(network in network_list for network in networks)
+        and all(volume in volume_list for volume in volumes)
+    )
+
+
+def check_targeted(client, tags, networks, volumes):
+    return (
+        all(docker_resource_exists(client.images, tag) for tag in tags)
+        and all(docker_resource_exists(client.networks, name) for name in networks)
+        and all(docker_resource_exists(client.volumes, name) for name in volumes)
+    )
+
+
+def measure(name, check, client, *args):
+    client.api.requests = 0
+    start = time.perf_counter()
+    assert check(client, *args)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<10} {elapsed * 1000:10.1f} ms {client.api.requests:8} requests")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--images", type=int, default=10000)
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.1,
+        help="Simulated round trip time of a request to the daemon, in milliseconds",
+    )
+    args = parser.parse_args()
+
+    client = make_client(args.images, args.latency / 1000)
+    # a challenge with two containers, a solution, one network and one volume
+    tags = ["cached_image_17", "cached_image_4242", f"cached_image_{args.images - 1}"]
+    check_args = (tags, ["chall_net"], ["volume_7"])
+
+    print(f"{args.images} images, {args.latency} ms simulated latency per request")
+    listing = measure("listing", check_listing, client, *check_args)
+    targeted = measure("targeted", check_targeted, client, *check_args)
+    print(f"speedup: {listing / targeted:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
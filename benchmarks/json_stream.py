@@ -0,0 +1,96 @@
+"""Measures the throughput of decoding docker progress streams.
+
+A synthetic build log is generated, consisting of build output and the progress
+events of pulling a base image with several layers, and fed to the streaming
+decoder in chunks of different sizes. Every decoded event is also passed through
+the progress printer, as build_image does. The previous approach, which split
+every chunk into lines and decoded each with json.loads, is measured on chunks
+aligned to lines, since it fails on anything else.
+
+Run with ``python benchmarks/json_stream.py [--size MB]``.
+"""
+
+import argparse
+import json
+import time
+
+from challtools.progress import LayerProgress, ProgressPrinter, decode_json_stream
+
+
+def make_log(size):
+    lines = []
+    length = 0
+    layers = [f"{i:012x}" for i in range(8)]
+    total = 30 * 1000 * 1000
+    i = 0
+    while length < size:
+        layer = layers[i % len(layers)]
+        if i % 10 == 0:
+            event = {"stream": f"Step {i}/100000 : RUN make -j8 target_{i}\n"}
+        else:
+            event = {
+                "status": "Downloading",
+                "progressDetail": {"current": i * 1000 % total, "total": total},
+                "progress": "[=====>            ]  10.2MB/30MB",
+                "id": layer,
+            }
+        line = json.dumps(event).encode() + b"\r\n"
+        lines.append(line)
+        length += len(line)
+        i += 1
+    return lines
+
+
+def split_every(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+def legacy_decode(chunks):
+    for chunk in chunks:
+        for line in chunk.strip().split(b"\n"):
+            yield json.loads(line)
+
+
+def consume(events):
+    printer = ProgressPrinter(LayerProgress("base"), output=lambda *args: None)
+    count = 0
+    for event in events:
+        printer.update(event)
+        count += 1
+    printer.finish()
+    return count
+
+
+def measure(name, chunks, decode):
+    size = sum(len(chunk) for chunk in chunks)
+    start = time.perf_counter()
+    count = consume(decode(chunks))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{name:<28} {size / elapsed / 1e6:8.1f} MB/s {count / elapsed:12.0f} events/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--size", type=float, default=16, help="Size of the log, in megabytes"
+    )
+    args = parser.parse_args()
+
+    lines = make_log(int(args.size * 1e6))
+    data = b"".join(lines)
+    print(f"{len(data) / 1e6:.1f} MB, {len(lines)} events")
+
+    measure("legacy, line chunks", lines, legacy_decode)
+    measure("streaming, line chunks", lines, decode_json_stream)
+    for chunk_size in [64, 4096, 65536]:
+        measure(
+            f"streaming, {chunk_size} byte chunks",
+            split_every(data, chunk_size),
+            decode_json_stream,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Measures ConfigValidator throughput in configs per second.
+
+The current single pass validation is compared against the previous approach,
+which called jsonschema.validate (checking the schema and building a new
+validator every time) and then ran a second, default filling pass over a deep
+copy of the config.
+
+Run with ``python benchmarks/validator_throughput.py [-n COUNT]``.
+"""
+
+import argparse
+import time
+from copy import deepcopy
+
+import jsonschema
+
+from challtools.validator import (
+    ConfigValidator,
+    DefaultValidatingDraft7Validator,
+    get_schema,
+)
+
+
+def make_config(i):
+    return {
+        "title": f"benchmark challenge {i}",
+        "description": "benchmark description",
+        "authors": ["author one", "author two"],
+        "categories": "web",
+        "flag_format_prefix": "CTF{",
+        "flags": [
+            {"type": "text", "flag": f"flag_{i}"},
+            {"type": "regex", "flag": r"^flag_\d+$"},
+        ],
+        "hints": [{"content": "look closer"}],
+        "deployment": {
+            "type": "docker",
+            "containers": {
+                "web": {
+                    "image": "container",
+                    "services": [{"type": "website", "internal_port": 80}],
+                },
+                "db": {"image": "postgres"},
+            },
+            "networks": {"internal": ["web", "db"]},
+        },
+        "challenge_id": f"00000000-0000-0000-0000-{i:012}",
+        "spec": "0.0.1",
+    }
+
+
+def legacy_validate(config):
+    schema = get_schema()
+    jsonschema.validate(instance=config, schema=schema)
+    normalized_config = deepcopy(config)
+    DefaultValidatingDraft7Validator(schema).validate(normalized_config)
+    return normalized_config
+
+
+def current_validate(config):
+    ConfigValidator(config).validate()
+
+
+def measure(func, configs):
+    start = time.perf_counter()
+    for config in configs:
+        func(config)
+    return len(configs) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("-n", "--count", type=int, default=2000)
+    args = parser.parse_args()
+
+    configs = [make_config(i) for i in range(args.count)]
+
+    # warm up caches and lazy imports before measuring
+    legacy_validate(configs[0])
+    current_validate(configs[0])
+
+    # only the schema validation and default filling step of the legacy path
+    # is measured, the current path additionally runs all other checks
+    legacy = measure(legacy_validate, configs)
+    current = measure(current_validate, configs)
+
+    print(f"legacy schema validation:  {legacy:10.1f} configs/s")
+    print(f"ConfigValidator.validate:  {current:10.1f} configs/s")
+    print(f"speedup:                   {current / legacy:10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Measures loading challenge configuration files.
+
+A directory of challenge configs is generated and every file is loaded with the
+previous approach of ``yaml.safe_load``, by parsing with the fastest available
+loader, from the on-disk parse cache as a new process would, and from the per
+process memo.
+
+Run with ``python benchmarks/yaml_load.py [-n COUNT]``.
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import yaml
+
+from challtools import loader
+from challtools.loader import get_loader, load_yaml
+
+
+def make_config(i):
+    return {
+        "title": f"benchmark challenge {i}",
+        "description": "benchmark description\n" * 20,
+        "authors": ["author one", "author two"],
+        "categories": ["web"],
+        "flag_format_prefix": "CTF{",
+        "flags": [{"type": "text", "flag": f"flag_{i}"}],
+        "hints": [{"content": f"hint {j}", "cost": j} for j in range(5)],
+        "downloadable_files": [f"file_{j}.txt" for j in range(5)],
+        "deployment": {
+            "type": "docker",
+            "containers": {
+                f"web-{i}": {
+                    "image": "container",
+                    "services": [{"type": "website", "internal_port": 80}],
+                },
+            },
+        },
+        "spec": "0.0.1",
+    }
+
+
+def measure(name, paths, load):
+    start = time.perf_counter()
+    for path in paths:
+        load(path)
+    elapsed = time.perf_counter() - start
+    print(f"{name:<20} {len(paths) / elapsed:10.0f} files/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", type=int, default=1000, help="Amount of files")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.n):
+            path = Path(tmp) / f"chall-{i}" / "challenge.yml"
+            path.parent.mkdir()
+            path.write_text(yaml.dump(make_config(i)))
+            paths.append(path)
+        (Path(tmp) / "ctf.yml").write_text("{}\n")
+
+        print(f"{args.n} files, loader {get_loader().__name__}")
+        measure("yaml.safe_load", paths, lambda path: yaml.safe_load(path.read_text()))
+        measure(
+            "fastest loader",
+            paths,
+            lambda path: yaml.load(path.read_bytes(), Loader=get_loader()),
+        )
+        # populates the parse cache
+        for path in paths:
+            load_yaml(path)
+        loader._memo.clear()
+        measure("parse cache", paths, load_yaml)
+        measure("memo", paths, load_yaml)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,10 @@
-from importlib.metadata import version
+def __getattr__(name):
+    # resolving the version imports importlib.metadata, which is slow enough to
+    # be noticeable on every command, so it is only done when asked for
+    if name == "__version__":
+        from importlib.metadata import version
 
-__version__ = version("challtools")
+        globals()["__version__"] = version("challtools")
+        return globals()["__version__"]
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,4 @@
+from challtools.entry import main
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,17 @@
 import argparse
 
-from challtools import __version__
 from challtools.plugin import Plugin, lazy_runner
 
 
+def __getattr__(name):
+    if name == "__version__":
+        from challtools import __version__
+
+        return __version__
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
 class Validate(Plugin):
     def __init__(self, parser, subparsers):
         validate_desc = "Validates a challenge to make sure it's defined properly"
@@ -20,6 +28,32 @@ class Validate(Plugin):
             default=5,
             help="If a validation message with this level or above is raised, the command exits with exit code 1",
         )
+        validate_parser.add_argument(
+            "-a",
+            "--all",
+            action="store_true",
+            help="Validate all challenges in the CTF",
+        )
+        validate_parser.add_argument(
+            "-f",
+            "--format",
+            choices=["text", "jsonl"],
+            default="text",
+            help="The output format. jsonl prints one JSON record per challenge as soon as it has been validated",
+        )
+        validate_parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=None,
+            help="The amount of processes to validate challenges in when using --all, defaults to the amount of CPUs",
+        )
+        validate_parser.add_argument(
+            "-w",
+            "--watch",
+            action="store_true",
+            help="Keep running and validate challenges again whenever their files change, printing only changes in the validation messages",
+        )
         validate_parser.set_defaults(func=lazy_runner("challtools.builtins.validate"))
 
 
@@ -57,6 +91,24 @@ class Build(Plugin):
         build_parser = subparsers.add_parser(
             "build", description=build_desc, help=build_desc
         )
+        build_parser.add_argument(
+            "--force-rebuild",
+            action="store_true",
+            help="Rebuild docker images even if their build context is unchanged",
+        )
+        build_parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=4,
+            help="The maximum amount of docker images to build at the same time",
+        )
+        build_parser.add_argument(
+            "-w",
+            "--watch",
+            action="store_true",
+            help="Keep running and rebuild images whenever files in their build context change, and the whole challenge whenever its config changes",
+        )
         build_parser.set_defaults(func=lazy_runner("challtools.builtins.build"))
 
 
@@ -72,6 +124,11 @@ class Start(Plugin):
             action="store_true",
             help="Rebuild the challenge before starting",
         )
+        start_parser.add_argument(
+            "--force-rebuild",
+            action="store_true",
+            help="Rebuild docker images even if their build context is unchanged",
+        )
         start_parser.set_defaults(func=lazy_runner("challtools.builtins.start"))
 
 
@@ -81,9 +138,76 @@ class Solve(Plugin):
         solve_parser = subparsers.add_parser(
             "solve", description=solve_desc, help=solve_desc
         )
+        solve_parser.add_argument(
+            "--ready-timeout",
+            type=float,
+            default=30,
+            help="The maximum amount of seconds to wait for the challenge services to become ready before solving",
+        )
         solve_parser.set_defaults(func=lazy_runner("challtools.builtins.solve"))
 
 
+class CheckFlag(Plugin):
+    def __init__(self, parser, subparsers):
+        checkflag_desc = "Checks if flags are correct for a challenge, or for any challenge in the CTF"
+        checkflag_parser = subparsers.add_parser(
+            "checkflag", description=checkflag_desc, help=checkflag_desc
+        )
+        checkflag_parser.add_argument(
+            "flags", nargs="*", help="The flags to check, including the flag format"
+        )
+        checkflag_parser.add_argument(
+            "--stdin",
+            action="store_true",
+            help="Check newline-delimited flags from stdin and report how many matched each flag",
+        )
+        checkflag_parser.add_argument(
+            "--csv",
+            metavar="FILE",
+            help="Check a CSV file of challenge_id,submission rows against every challenge in the CTF, - for stdin",
+        )
+        checkflag_parser.add_argument(
+            "--collisions",
+            action="store_true",
+            help="Report flags accepted by more than one challenge in the CTF",
+        )
+        checkflag_parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            help="The amount of processes to check large CSV files with, defaults to the amount of CPUs",
+        )
+        checkflag_parser.set_defaults(func=lazy_runner("challtools.builtins.checkflag"))
+
+
+class SolveAll(Plugin):
+    def __init__(self, parser, subparsers):
+        solveall_desc = "Solves every challenge in this ctf, running each challenge and its solution on their own docker network so that several can be solved at the same time"
+        solveall_parser = subparsers.add_parser(
+            "solveall", description=solveall_desc, help=solveall_desc
+        )
+        solveall_parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=4,
+            help="Solve this many challenges in parallel",
+        )
+        solveall_parser.add_argument(
+            "--ready-timeout",
+            type=float,
+            default=30,
+            help="The maximum amount of seconds to wait for the services of a challenge to become ready before solving it",
+        )
+        solveall_parser.add_argument(
+            "--timeout",
+            type=float,
+            default=300,
+            help="The maximum amount of seconds a solution may run for",
+        )
+        solveall_parser.set_defaults(func=lazy_runner("challtools.builtins.solveall"))
+
+
 class Compose(Plugin):
     def __init__(self, parser, subparsers):
         compose_desc = "Writes a compose.yml file to the challenge directory which can be used to run all challenge services"
@@ -102,6 +226,19 @@ class Compose(Plugin):
             default="no",
             help="The restart policy to use for all services in the docker-compose file",
         )
+        compose_parser.add_argument(
+            "-i",
+            "--incremental",
+            action="store_true",
+            help="Keep services of an existing compose.yml that are unchanged exactly as they are, including their ports",
+        )
+        compose_parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=None,
+            help="The amount of processes to load challenges in when using --all, defaults to the amount of CPUs",
+        )
         compose_parser.set_defaults(func=lazy_runner("challtools.builtins.compose"))
 
 
@@ -135,6 +272,41 @@ class Push(Plugin):
             action="store_true",
             help="Do not build or push containers to any registry",
         )
+        push_parser.add_argument(
+            "--force-rebuild",
+            action="store_true",
+            help="Rebuild docker images even if their build context is unchanged",
+        )
+        push_parser.add_argument(
+            "--force-push",
+            action="store_true",
+            help="Push containers even if the registry already has them",
+        )
+        push_parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=4,
+            help="The maximum amount of docker images to build and push and files to upload at the same time, per challenge",
+        )
+        push_parser.add_argument(
+            "-a",
+            "--all",
+            action="store_true",
+            help="Push every challenge in the CTF, logging in to the registry only once",
+        )
+        push_parser.add_argument(
+            "--challenge-jobs",
+            type=int,
+            default=4,
+            help="The maximum amount of challenges to push at the same time when using --all",
+        )
+        push_parser.add_argument(
+            "--timeout",
+            type=float,
+            default=30,
+            help="The timeout of requests to the platform, in seconds",
+        )
         push_parser.set_defaults(func=lazy_runner("challtools.builtins.push"))
 
 
@@ -162,6 +334,13 @@ class AllChalls(Plugin):
             action="store_true",
             help="Exit as soon as the command fails on any challenge",
         )
+        allchalls_parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=1,
+            help="Run the command on this many challenges in parallel, each in its own process",
+        )
         allchalls_parser.set_defaults(
             func=lazy_runner("challtools.builtins.allchalls"),
             subparsers=subparsers,
@@ -1,4 +1,9 @@
 import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 from challtools.constants import *
 from challtools.exceptions import CriticalException
@@ -18,6 +23,12 @@ def run(args):
             "No CTF configuration file (ctf.yml) detected in the current directory or any parent directory, and therefore cannot discover challenges."
         )
 
+    if args.jobs < 1:
+        raise CriticalException("The number of jobs must be at least 1")
+
+    if args.jobs > 1:
+        return run_parallel(args)
+
     parser_args = parser.parse_args(args.command[1:])
     failed = False
     for path in discover_challenges():
@@ -36,3 +47,118 @@ def run(args):
                 return 1
 
     return int(failed)
+
+
+def run_isolated(command, path, processes, cancel):
+    """Runs a challtools command on a single challenge in a separate process, buffering all of its output.
+
+    Args:
+        command (list): The challtools command line to run, excluding the program name
+        path (pathlib.Path): The path to the challenge configuration file
+        processes (set): A set the running process is registered in while it runs, so that it can be terminated early
+        cancel (threading.Event): Set once the remaining challenges should not be run anymore
+
+    Returns:
+        dict: Dictionary with the keys ``path``, ``exit_code``, ``stdout``, ``stderr`` and ``duration``, or None if the run was cancelled before it started
+    """
+    if cancel.is_set():
+        return None
+
+    start = time.monotonic()
+    with subprocess.Popen(
+        [sys.executable, "-m", "challtools", *command],
+        cwd=path.parent,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    ) as process:
+        processes.add(process)
+        # the process may have started after the running ones were terminated
+        if cancel.is_set():
+            process.terminate()
+        stdout, stderr = process.communicate()
+        processes.discard(process)
+
+    return {
+        "path": path,
+        "exit_code": process.returncode,
+        "stdout": stdout.decode(errors="replace"),
+        "stderr": stderr.decode(errors="replace"),
+        "duration": time.monotonic() - start,
+    }
+
+
+def run_parallel(args):
+    root = get_ctf_config_path().parent
+    paths = discover_challenges()
+    processes = set()
+    results = []
+    cancel = threading.Event()
+    start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        pending = {
+            executor.submit(run_isolated, args.command, path, processes, cancel)
+            for path in paths
+        }
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.cancelled() or cancel.is_set():
+                    # terminated by us, the result would only be noise
+                    continue
+                result = future.result()
+
+                # print the output of each challenge at once so that it doesn't interleave
+                print(f"{BOLD}Running {args.command[0]} on {result['path']}{CLEAR}")
+                sys.stdout.write(result["stdout"])
+                sys.stdout.flush()
+                sys.stderr.write(result["stderr"])
+                sys.stderr.flush()
+                results.append(result)
+
+                if result["exit_code"] and args.exit_on_failure:
+                    cancel.set()
+                    for future in pending:
+                        future.cancel()
+                    for process in list(processes):
+                        process.terminate()
+
+    wall_time = time.monotonic() - start
+    print_summary(results, root, len(paths), wall_time)
+
+    return int(any(result["exit_code"] for result in results))
+
+
+def print_summary(results, root, total, wall_time):
+    """Prints a table with the exit code and duration of every challenge a command was ran on.
+
+    Args:
+        results (list): A list of results as returned by run_isolated
+        root (pathlib.Path): The CTF root directory, which challenge paths are displayed relative to
+        total (int): The total amount of discovered challenges
+        wall_time (float): The wall time of the entire run, in seconds
+    """
+    rows = [
+        (
+            str(result["path"].parent.relative_to(root)),
+            result["exit_code"],
+            result["duration"],
+        )
+        for result in sorted(results, key=lambda r: r["path"])
+    ]
+    width = max([len("Challenge")] + [len(row[0]) for row in rows])
+
+    print()
+    print(f"{BOLD}{'Challenge':<{width}}  Exit  Time{CLEAR}")
+    for name, exit_code, duration in rows:
+        color = CRITICAL if exit_code else SUCCESS
+        print(f"{name:<{width}}  {color}{exit_code:>4}{CLEAR}  {duration:.2f}s")
+
+    cpu_time = sum(row[2] for row in rows)
+    failed = sum(1 for row in rows if row[1])
+    print(
+        f"\n{BOLD}{len(rows)}/{total} challenges ran, {failed} failed. "
+        f"Total challenge time {cpu_time:.2f}s in {wall_time:.2f}s wall time.{CLEAR}"
+    )
@@ -1,13 +1,112 @@
+from pathlib import Path
+
 from challtools.constants import *
-from challtools.utils import build_chall, get_valid_config
+from challtools.discovery import CONFIG_NAMES
+from challtools.exceptions import CriticalException
+from challtools.utils import (
+    build_chall,
+    build_images,
+    get_chall_builds,
+    get_docker_client,
+    get_valid_config,
+)
 
 
 def run(args):
     config = get_valid_config()
 
-    if build_chall(config):
+    if args.watch:
+        return run_watch(args, config)
+
+    if build_chall(config, force_rebuild=args.force_rebuild, jobs=args.jobs):
         print(f"{SUCCESS}Challenge built successfully!{CLEAR}")
     else:
         print(f"{BOLD}Nothing to do{CLEAR}")
 
     return 0
+
+
+def run_watch(args, config):
+    from challtools.watch import create_watcher
+
+    root = Path(".").absolute()
+    client = None
+    # the config, and therefore the build script and every image, changed
+    full_build = True
+
+    with create_watcher(root) as watcher:
+        try:
+            while True:
+                reported = True
+                failed = False
+                try:
+                    if full_build:
+                        config = get_valid_config(cd=False)
+                        if client is None and (
+                            config["deployment"] or config["solution_image"]
+                        ):
+                            client = get_docker_client()
+                        if build_chall(
+                            config,
+                            force_rebuild=args.force_rebuild,
+                            jobs=args.jobs,
+                            client=client,
+                        ):
+                            print(f"{SUCCESS}Challenge built successfully!{CLEAR}")
+                        else:
+                            print(f"{BOLD}Nothing to do{CLEAR}")
+                    else:
+                        builds = get_affected_builds(config, changed)
+                        reported = bool(builds)
+                        if builds:
+                            build_images(
+                                builds,
+                                client,
+                                jobs=args.jobs,
+                                force_rebuild=args.force_rebuild,
+                            )
+                            print(f"{SUCCESS}Images rebuilt successfully!{CLEAR}")
+                except CriticalException as e:
+                    print(CRITICAL + e.args[0] + CLEAR)
+                    failed = True
+
+                if reported:
+                    print(
+                        f"{BOLD}Watching {root} for changes, press Ctrl+C to stop{CLEAR}"
+                    )
+                changed = watcher.wait()
+                # a failed full build is retried, since the config or the
+                # docker client it would have set up may be missing
+                full_build = (
+                    (full_build and failed)
+                    or root in changed
+                    or any(
+                        path.parent == root and path.name in CONFIG_NAMES
+                        for path in changed
+                    )
+                )
+        except KeyboardInterrupt:
+            return 0
+
+
+def get_affected_builds(config, changed):
+    """Lists the docker images of a challenge whose build context contains changed files. Expects to be run from the root directory of the challenge.
+
+    Args:
+        config (dict): The normalized challenge config
+        changed (set): The absolute paths of the changed files and directories, as returned by challtools.watch.Watcher.wait
+
+    Returns:
+        list: A list of (name, image, tag) tuples, as accepted by build_images
+    """
+    from challtools.watch import affected_directories
+
+    builds = [
+        (name, image, tag)
+        for name, image, tag in get_chall_builds(config)
+        if Path(image).is_dir()
+    ]
+    affected = affected_directories(
+        changed, [Path(image).absolute() for _, image, _ in builds]
+    )
+    return [build for build in builds if Path(build[1]).absolute() in affected]
@@ -0,0 +1,204 @@
+import os
+import sys
+import time
+
+from challtools.constants import *
+from challtools.exceptions import CriticalException
+from challtools.flags import FlagIndex, FlagMatcher
+from challtools.utils import (
+    discover_challenges,
+    get_ctf_config_path,
+    get_valid_config,
+)
+
+# CSV files of at least this many bytes are checked using multiple processes
+PARALLEL_THRESHOLD = 8 * 1024 * 1024
+
+
+def run(args):
+    if args.csv or args.collisions:
+        return run_ctf(args)
+
+    if not args.flags and not args.stdin:
+        raise CriticalException(
+            "No flags to check, pass them as arguments, use --stdin or use --csv"
+        )
+
+    config = get_valid_config()
+    matcher = FlagMatcher(config)
+
+    if not args.stdin:
+        correct = 0
+        for flag in args.flags:
+            if matcher.is_valid(flag):
+                correct += 1
+                print(f"{SUCCESS}{flag}: correct{CLEAR}")
+            else:
+                print(f"{CRITICAL}{flag}: incorrect{CLEAR}")
+        return int(correct != len(args.flags))
+
+    start = time.monotonic()
+    counts, incorrect = count_matches(matcher, sys.stdin)
+    elapsed = time.monotonic() - start
+
+    print_counts(config, counts, incorrect, elapsed)
+
+    return int(incorrect > 0)
+
+
+def count_matches(matcher, lines):
+    """Checks newline-delimited submissions, skipping empty lines.
+
+    Args:
+        matcher (challtools.flags.FlagMatcher): The matcher to check the submissions with
+        lines (iterable): The submissions, with or without line endings
+
+    Returns:
+        tuple: A list with the amount of submissions matching each flag of the challenge, and the amount of incorrect submissions
+    """
+    match = matcher.match
+    counts = [0] * len(matcher.flags)
+    incorrect = 0
+
+    for line in lines:
+        submission = line.rstrip("\r\n")
+        if not submission:
+            continue
+        index = match(submission)
+        if index is None:
+            incorrect += 1
+        else:
+            counts[index] += 1
+
+    return counts, incorrect
+
+
+def print_counts(config, counts, incorrect, elapsed):
+    """Prints how many submissions matched each flag.
+
+    Args:
+        config (dict): The normalized challenge config
+        counts (list): The amount of submissions matching each flag, as returned by count_matches
+        incorrect (int): The amount of incorrect submissions
+        elapsed (float): The time it took to check the submissions, in seconds
+    """
+    total = sum(counts) + incorrect
+    rate = f" ({total / elapsed:.0f}/s)" if elapsed > 0 else ""
+    print(f"{BOLD}Checked {total} submissions in {elapsed:.2f}s{rate}{CLEAR}")
+
+    for flag, count in zip(config["flags"], counts):
+        print(f"{flag['type']:<5}  {flag['flag']}: {count}")
+
+    print(
+        f"\n{SUCCESS}{sum(counts)} correct{CLEAR}, "
+        f"{CRITICAL if incorrect else BOLD}{incorrect} incorrect{CLEAR}"
+    )
+
+
+def run_ctf(args):
+    if get_ctf_config_path() is None:
+        raise CriticalException(
+            "No CTF configuration file (ctf.yml) detected in the current directory or any parent directory, and therefore cannot discover challenges."
+        )
+
+    index = load_flag_index()
+    exit_code = 0
+
+    if args.csv:
+        start = time.monotonic()
+        result = verify_submissions(
+            index, args.csv, jobs=args.jobs or os.cpu_count() or 1
+        )
+        elapsed = time.monotonic() - start
+
+        print_verify_result(index, result, elapsed)
+        exit_code = int(bool(result.unknown))
+
+    if args.collisions or args.csv:
+        collisions = index.collisions()
+        if collisions:
+            print(f"\n{HIGH}Flags accepted by more than one challenge:{CLEAR}")
+            for flag, challenge_ids in collisions:
+                print(
+                    f"{flag}: "
+                    + ", ".join(
+                        index.names[challenge_id] for challenge_id in challenge_ids
+                    )
+                )
+            exit_code = 1
+        elif args.collisions:
+            print(f"{SUCCESS}No flag is accepted by more than one challenge{CLEAR}")
+
+    return exit_code
+
+
+def load_flag_index():
+    """Builds a flag index of every challenge in the CTF.
+
+    Returns:
+        challtools.flags.FlagIndex: The index, with challenges named by their directory relative to the CTF root
+    """
+    root = get_ctf_config_path().parent
+    index = FlagIndex()
+    for path in discover_challenges():
+        config = get_valid_config(workdir=path.parent, search=False, cd=False)
+        index.add(config, name=str(path.parent.relative_to(root)))
+    return index
+
+
+def verify_submissions(index, path, jobs):
+    """Checks a CSV file of challenge ID and submission pairs against a flag index. Large files are checked using multiple processes.
+
+    Args:
+        index (challtools.flags.FlagIndex): The index to check the submissions with
+        path (string): The path to the CSV file, or - for stdin
+        jobs (int): The maximum amount of processes to use
+
+    Returns:
+        challtools.flags.VerifyResult: The verification result
+    """
+    if path == "-":
+        return index.verify_csv(sys.stdin)
+
+    try:
+        if os.path.getsize(path) < PARALLEL_THRESHOLD:
+            jobs = 1
+        with open(path, newline="") as f:
+            return index.verify_csv(f, jobs=jobs)
+    except OSError as e:
+        raise CriticalException(f"Could not read {path}: {e}")
+
+
+def print_verify_result(index, result, elapsed):
+    """Prints how many submissions to every challenge were correct.
+
+    Args:
+        index (challtools.flags.FlagIndex): The index the submissions were verified with
+        result (challtools.flags.VerifyResult): The verification result
+        elapsed (float): The time it took to verify the submissions, in seconds
+    """
+    total = sum(
+        sum(counter.values())
+        for counter in [result.correct, result.incorrect, result.unknown]
+    )
+    rate = f" ({total / elapsed:.0f}/s)" if elapsed > 0 else ""
+    print(f"{BOLD}Checked {total} submissions in {elapsed:.2f}s{rate}{CLEAR}\n")
+
+    names = sorted(index.names.items(), key=lambda item: item[1])
+    width = max([len("Challenge")] + [len(name) for _, name in names])
+    print(f"{BOLD}{'Challenge':<{width}}  Correct  Incorrect{CLEAR}")
+    for challenge_id, name in names:
+        print(
+            f"{name:<{width}}  {result.correct[challenge_id]:>7}  "
+            f"{result.incorrect[challenge_id]:>9}"
+        )
+
+    for challenge_id, count in sorted(result.unknown.items()):
+        print(
+            f"{HIGH}{count} submissions to unknown challenge ID {challenge_id}{CLEAR}"
+        )
+
+    print(
+        f"\n{SUCCESS}{sum(result.correct.values())} correct{CLEAR}, "
+        f"{sum(result.incorrect.values())} incorrect"
+    )
@@ -3,18 +3,34 @@ from pathlib import Path
 import yaml
 
 from challtools.constants import *
-from challtools.utils import discover_challenges, generate_compose, get_valid_config
+from challtools.exceptions import CriticalException
+from challtools.loader import parse_yaml
+from challtools.utils import (
+    discover_challenges,
+    generate_compose,
+    get_valid_config,
+    load_valid_configs,
+)
 
 
 def run(args):
     if args.all:
-        configs = [
-            (path, get_valid_config(path, cd=False)) for path in discover_challenges()
-        ]
+        configs = load_valid_configs(discover_challenges(), jobs=args.jobs)
     else:
         configs = [(Path("."), get_valid_config())]
 
-    compose = generate_compose(configs, args.all, restart_policy=args.restart_policy)
+    previous = None
+    if args.incremental and Path("compose.yml").exists():
+        try:
+            previous = parse_yaml(Path("compose.yml").read_text())
+        except yaml.YAMLError as e:
+            raise CriticalException(f"Could not parse the existing compose.yml: {e}")
+        if not isinstance(previous, dict):
+            previous = None
+
+    compose = generate_compose(
+        configs, args.all, restart_policy=args.restart_policy, previous=previous
+    )
 
     if not compose["services"]:
         print(f"{BOLD}No services defined, nothing to do{CLEAR}")
@@ -22,5 +38,34 @@ def run(args):
 
     Path("compose.yml").write_text(yaml.dump(compose))
 
+    if previous is not None:
+        print_changes(previous.get("services") or {}, compose["services"])
+
     print(f"{SUCCESS}compose.yml written!{CLEAR}")
     return 0
+
+
+def print_changes(previous_services, services):
+    """Prints which services of a compose file were added, changed and removed.
+
+    Args:
+        previous_services (dict): The services of the previous compose file
+        services (dict): The services of the new compose file
+    """
+    added = [name for name in services if name not in previous_services]
+    removed = [name for name in previous_services if name not in services]
+    changed = [
+        name
+        for name in services
+        if name in previous_services and services[name] != previous_services[name]
+    ]
+
+    for label, names in [("Added", added), ("Changed", changed), ("Removed", removed)]:
+        for name in sorted(names):
+            print(f"{BOLD}{label} service {name}{CLEAR}")
+
+    unchanged = len(services) - len(added) - len(changed)
+    print(
+        f"{BOLD}{len(added)} added, {len(changed)} changed, {len(removed)} removed, "
+        f"{unchanged} unchanged{CLEAR}"
+    )
@@ -5,6 +5,7 @@ import yaml
 
 from challtools.constants import *
 from challtools.exceptions import CriticalException
+from challtools.loader import parse_yaml
 from challtools.utils import load_ctf_config, process_messages
 from challtools.validator import ConfigValidator
 
@@ -22,7 +23,7 @@ def run(args):
 
     with path.open() as f:
         raw_config = f.read()
-    config = yaml.safe_load(raw_config)
+    config = parse_yaml(raw_config)
 
     validator = ConfigValidator(
         config, ctf_config=load_ctf_config(), challdir=Path(".")
@@ -58,7 +59,7 @@ def run(args):
     raw_config += f"challenge_id: {uuid.uuid4()}\n"
 
     try:
-        edited_config = yaml.safe_load(raw_config)
+        edited_config = parse_yaml(raw_config)
         del edited_config["challenge_id"]
         validator = ConfigValidator(
             edited_config, ctf_config=load_ctf_config(), challdir=Path(".")
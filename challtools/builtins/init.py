@@ -5,7 +5,6 @@ from pathlib import Path
 
 from challtools.constants import *
 from challtools.exceptions import CriticalException
-from challtools.utils import load_ctf_config
 
 
 def run(args):
@@ -51,6 +50,9 @@ def run(args):
         target_conf = target_dir / "challenge.yaml"
         content = (template_dir / "challenge.yaml").read_bytes()
 
+    # imported here since this module is also loaded for shell completion
+    from challtools.utils import load_ctf_config
+
     ctf_config = load_ctf_config() or {}
 
     replacements = {
@@ -1,18 +1,24 @@
 import hashlib
-import json
+import threading
+import time
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
 import requests
 from minio import Minio
-from minio.error import S3Error
 
 from challtools.constants import *
 from challtools.exceptions import CriticalException
+from challtools.registry import PUSHED, push_images
+from challtools.s3sync import sync_files
 from challtools.utils import (
+    PrefixedOutput,
     build_docker_images,
     create_docker_name,
+    discover_challenges,
     format_user_service,
+    get_ctf_config_path,
     get_docker_client,
     get_valid_config,
     load_ctf_config,
@@ -21,145 +27,308 @@ from challtools.validator import is_url
 
 
 def run(args):
+    if args.jobs < 1:
+        raise CriticalException("The number of jobs must be at least 1")
+
+    if args.all:
+        return push_all(args)
+
     config = get_valid_config()
-    ctf_config = load_ctf_config()
+    session = PushSession(load_ctf_config(), timeout=args.timeout)
 
-    if not config["challenge_id"]:
-        raise CriticalException("ID not configured in the challenge configuration file")
+    try:
+        push_challenge(config, Path("."), session, args)
+    finally:
+        session.close()
 
-    if not ctf_config.get("custom", {}).get("platform_url"):
-        raise CriticalException(
-            "Platform URL not configured in the CTF configuration file"
-        )
+    print(f"{SUCCESS}Challenge pushed!{CLEAR}")
+    return 0
+
+
+def push_all(args):
+    """Pushes every challenge in the CTF, up to ``args.challenge_jobs`` at the same time, sharing one PushSession between them.
 
-    if not ctf_config.get("custom", {}).get("platform_api_key"):
+    Args:
+        args (argparse.Namespace): The parsed push arguments
+
+    Returns:
+        int: The exit code, 1 if any challenge failed to push
+    """
+    if get_ctf_config_path() is None:
         raise CriticalException(
-            "Platform API key not configured in the CTF configuration file"
+            "No CTF configuration file (ctf.yml) detected in the current directory or any parent directory, and therefore cannot discover challenges."
         )
 
-    file_urls = [file for file in config["downloadable_files"] if is_url(file)]
+    if args.challenge_jobs < 1:
+        raise CriticalException("The number of challenge jobs must be at least 1")
 
-    if not args.skip_container_build and not args.skip_container_push:
-        if build_docker_images(config, get_docker_client()):
-            print(f"{BOLD}Challenge built{CLEAR}")
-        else:
-            print(f"{BOLD}Nothing to build{CLEAR}")
+    root = get_ctf_config_path().parent
+    paths = discover_challenges()
+    session = PushSession(
+        load_ctf_config(), timeout=args.timeout, pool_size=args.challenge_jobs
+    )
+    # fail before building anything if the platform is not configured
+    session.get_platform()
+
+    results = []
+    start = time.monotonic()
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.challenge_jobs) as executor:
+            futures = [
+                executor.submit(push_isolated, path, root, session, args)
+                for path in paths
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                if result["result"] == "pushed":
+                    print(f"{SUCCESS}{result['name']}: pushed{CLEAR}")
+                else:
+                    print(
+                        f"{CRITICAL}{result['name']}: failed{CLEAR} ({result['message']})"
+                    )
+                results.append(result)
+    finally:
+        session.close()
+
+    print_report(results, time.monotonic() - start)
+
+    return int(any(result["result"] == "failed" for result in results))
+
+
+def push_isolated(path, root, session, args):
+    """Pushes a single challenge without changing the working directory, so that several challenges can be pushed at the same time.
+
+    Args:
+        path (pathlib.Path): The path to the challenge configuration file
+        root (pathlib.Path): The CTF root directory, which the challenge path is displayed relative to
+        session (PushSession): The connections shared between all pushed challenges
+        args (argparse.Namespace): The parsed push arguments
+
+    Returns:
+        dict: Dictionary with the keys ``name``, ``result`` (``pushed`` or ``failed``), ``message``, ``stats`` and ``duration``
+    """
+    name = str(path.parent.relative_to(root))
+    output = PrefixedOutput(f"[{name}] ")
+    result = {
+        "name": name,
+        "result": "failed",
+        "message": None,
+        "stats": None,
+        "duration": 0,
+    }
+    start = time.monotonic()
 
-    if not args.skip_files:
-        if not config["downloadable_files"]:
-            print(f"{BOLD}No files defined, nothing to upload{CLEAR}")
+    try:
+        config = get_valid_config(
+            workdir=path.parent, search=False, cd=False, output=output
+        )
+        result["stats"] = push_challenge(
+            config, path.parent, session, args, output=output
+        )
+        result["result"] = "pushed"
+    except CriticalException as e:
+        result["message"] = e.args[0]
+    except Exception as e:
+        result["message"] = f"{type(e).__name__}: {e}"
+    finally:
+        output.flush()
+        result["duration"] = time.monotonic() - start
+
+    return result
+
+
+def print_report(results, wall_time):
+    """Prints a table with what was transferred for every pushed challenge.
+
+    Args:
+        results (list): A list of results as returned by push_isolated
+        wall_time (float): The wall time of the entire run, in seconds
+    """
+    results = sorted(results, key=lambda r: r["name"])
+    width = max([len("Challenge")] + [len(result["name"]) for result in results])
+
+    print()
+    print(
+        f"{BOLD}{'Challenge':<{width}}  Result  Uploaded  Unchanged  Deleted  Images    Total{CLEAR}"
+    )
+    for result in results:
+        if result["result"] == "pushed":
+            stats = result["stats"]
+            print(
+                f"{result['name']:<{width}}  {SUCCESS}pushed{CLEAR}  "
+                f"{stats['uploaded']:>8}  {stats['unchanged']:>9}  "
+                f"{stats['deleted']:>7}  "
+                f"{stats['images']:>3}/{stats['images'] + stats['images_unchanged']:<2}  "
+                f"{result['duration']:>6.2f}s"
+            )
         else:
-            custom_cfg = ctf_config.get("custom", {})
+            print(
+                f"{result['name']:<{width}}  {CRITICAL}failed{CLEAR}  "
+                f"{result['message']}"
+            )
 
-            bucket_name = custom_cfg.get("s3_bucket_name") or custom_cfg.get("bucket")
-            if not bucket_name:
-                raise CriticalException(
-                    "S3 bucket not configured in the CTF configuration file"
-                )
+    pushed = sum(1 for result in results if result["result"] == "pushed")
+    print(
+        f"\n{BOLD}{pushed} pushed, {len(results) - pushed} failed "
+        f"in {wall_time:.2f}s.{CLEAR}"
+    )
 
-            if not custom_cfg.get("secret"):
-                raise CriticalException(
-                    "Secret not configured in the CTF configuration file"
-                )
 
-            endpoint = custom_cfg.get("s3_endpoint")
-            if not endpoint:
-                raise CriticalException(
-                    "S3 endpoint not configured in the CTF configuration file"
-                )
+class PushSession:
+    """The connections shared by every challenge pushed in one run. Each of them is set up the first time it is needed and reused afterwards, so that one docker client is used for building and pushing, the registry is logged in to once, one pooled HTTP session is used for the platform and one MinIO client is used for S3. It is safe to use from multiple threads.
+
+    Args:
+        ctf_config (dict): The CTF config
+        timeout (float): The timeout of platform requests, in seconds
+        pool_size (int): The maximum amount of pooled connections to the platform
+    """
+
+    def __init__(self, ctf_config, timeout=30, pool_size=1):
+        self.custom = (ctf_config or {}).get("custom", {})
+        self.timeout = timeout
+        self.pool_size = pool_size
+        # reentrant since logging in to the registry gets the docker client
+        self.lock = threading.RLock()
+        self.http = None
+        self.s3 = None
+        self.docker = None
+        self.registry = None
+
+    def get_platform(self):
+        """Gets the platform connection, checking that the platform is configured.
+
+        Returns:
+            tuple: The platform url and a requests.Session to use for it
+        """
+        if not self.custom.get("platform_url"):
+            raise CriticalException(
+                "Platform URL not configured in the CTF configuration file"
+            )
 
-            access_key = custom_cfg.get("s3_key")
-            secret_key = custom_cfg.get("s3_secret")
-            if not access_key or not secret_key:
-                raise CriticalException(
-                    "S3 access key/secret not configured in the CTF configuration file"
-                )
+        if not self.custom.get("platform_api_key"):
+            raise CriticalException(
+                "Platform API key not configured in the CTF configuration file"
+            )
 
-            parsed_endpoint = urllib.parse.urlparse(endpoint)
-            if parsed_endpoint.scheme:
-                endpoint_host = parsed_endpoint.netloc or parsed_endpoint.path
-                secure = parsed_endpoint.scheme == "https"
-                public_endpoint = endpoint.rstrip("/")
-            else:
-                endpoint_host = endpoint
-                secure = True
-                public_endpoint = f"https://{endpoint.strip('/')}"
-
-            try:
-                s3_client = Minio(
-                    endpoint_host,
-                    access_key=access_key,
-                    secret_key=secret_key,
-                    secure=secure,
+        with self.lock:
+            if self.http is None:
+                self.http = requests.Session()
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=1, pool_maxsize=self.pool_size
                 )
-            except Exception as exc:
-                raise CriticalException(
-                    f"Could not create MinIO client: {exc}"
-                ) from exc
-            folder = hashlib.sha256(
-                f"{custom_cfg['secret']}-{config['challenge_id']}".encode()
-            ).hexdigest()
+                self.http.mount("http://", adapter)
+                self.http.mount("https://", adapter)
+                self.http.headers["X-API-Key"] = self.custom["platform_api_key"]
+
+        return self.custom["platform_url"], self.http
+
+    def get_s3(self):
+        """Gets the S3 connection, creating the MinIO client the first time.
+
+        Returns:
+            tuple: The minio.Minio client, the bucket name and the public endpoint objects are reachable at
+        """
+        with self.lock:
+            if self.s3 is None:
+                self.s3 = self._connect_s3()
+        return self.s3
+
+    def _connect_s3(self):
+        bucket_name = self.custom.get("s3_bucket_name") or self.custom.get("bucket")
+        if not bucket_name:
+            raise CriticalException(
+                "S3 bucket not configured in the CTF configuration file"
+            )
 
-            try:
-                objects = s3_client.list_objects(
-                    bucket_name, prefix=f"{folder}/", recursive=True
-                )
-                for obj in objects:
-                    key = obj.object_name
-                    print(f"{BOLD}Deleting old {key.split('/')[-1]}...{CLEAR}")
-                    s3_client.remove_object(bucket_name, key)
-            except S3Error as exc:
-                raise CriticalException(
-                    f"Could not clean up existing S3 objects: {exc}"
-                ) from exc
-            except Exception as exc:
-                raise CriticalException(
-                    f"Unexpected error cleaning S3 objects: {exc}"
-                ) from exc
-
-            filepaths = []
-            for file in config["downloadable_files"]:
-                if is_url(file):
-                    continue
+        if not self.custom.get("secret"):
+            raise CriticalException(
+                "Secret not configured in the CTF configuration file"
+            )
 
-                path = Path(file)
-                if path.is_dir():
-                    filepaths += list(path.iterdir())
-                else:
-                    filepaths.append(path)
+        endpoint = self.custom.get("s3_endpoint")
+        if not endpoint:
+            raise CriticalException(
+                "S3 endpoint not configured in the CTF configuration file"
+            )
+
+        access_key = self.custom.get("s3_key")
+        secret_key = self.custom.get("s3_secret")
+        if not access_key or not secret_key:
+            raise CriticalException(
+                "S3 access key/secret not configured in the CTF configuration file"
+            )
 
-            for path in filepaths:
-                if not path.exists():
-                    raise CriticalException(f"file {path} does not exist!")
+        parsed_endpoint = urllib.parse.urlparse(endpoint)
+        if parsed_endpoint.scheme:
+            endpoint_host = parsed_endpoint.netloc or parsed_endpoint.path
+            secure = parsed_endpoint.scheme == "https"
+            public_endpoint = endpoint.rstrip("/")
+        else:
+            endpoint_host = endpoint
+            secure = True
+            public_endpoint = f"https://{endpoint.strip('/')}"
 
-                key = f"{folder}/{path.name}"
-                print(f"{BOLD}Uploading {path.name}...{CLEAR}")
-                try:
-                    s3_client.fput_object(bucket_name, key, str(path))
-                except S3Error as exc:
-                    raise CriticalException(
-                        f"Failed to upload {path.name} to S3: {exc}"
-                    ) from exc
-                except Exception as exc:
-                    raise CriticalException(
-                        f"Unexpected error uploading {path.name} to S3: {exc}"
-                    ) from exc
-
-                file_urls.append(f"{public_endpoint}/{bucket_name}/{key}")
+        try:
+            s3_client = Minio(
+                endpoint_host,
+                access_key=access_key,
+                secret_key=secret_key,
+                secure=secure,
+            )
+        except Exception as exc:
+            raise CriticalException(f"Could not create MinIO client: {exc}") from exc
 
-    if not args.skip_container_push and config["deployment"]:
+        return s3_client, bucket_name, public_endpoint
+
+    def get_docker(self):
+        """Gets the docker client, creating it the first time. If that fails every later call fails the same way without trying again.
+
+        Returns:
+            docker.client.DockerClient: The docker client
+        """
+        with self.lock:
+            if self.docker is None:
+                try:
+                    self.docker = get_docker_client()
+                except CriticalException as e:
+                    self.docker = e
+        if isinstance(self.docker, CriticalException):
+            raise CriticalException(self.docker.args[0])
+        return self.docker
+
+    def get_registry(self, output=print):
+        """Gets a docker client logged in to the container registry. The login happens only once, and if it fails every later call fails the same way without trying again.
+
+        Args:
+            output (callable): The function used to print progress, with the same signature as print
+
+        Returns:
+            tuple: The docker.client.DockerClient and the registry url
+        """
+        with self.lock:
+            if self.registry is None:
+                try:
+                    self.registry = self._login_registry(output)
+                except CriticalException as e:
+                    self.registry = e
+        if isinstance(self.registry, CriticalException):
+            raise CriticalException(self.registry.args[0])
+        return self.registry
+
+    def _login_registry(self, output):
         try:
             import google.auth
             import google.auth.transport.requests
         except ImportError:
             raise CriticalException("google.auth could not be imported!")
 
-        if not ctf_config.get("custom", {}).get("container_registry"):
+        if not self.custom.get("container_registry"):
             raise CriticalException(
                 "Docker registry has not been configured in the CTF configuration file"
             )
 
-        print(f"{BOLD}Authenticating with registry...{CLEAR}")
+        output(f"{BOLD}Authenticating with registry...{CLEAR}")
 
         creds, project = google.auth.default(
             scopes=["https://www.googleapis.com/auth/cloud-platform"]
@@ -169,35 +338,123 @@ def run(args):
         if not creds.valid:
             raise CriticalException("Could not authenticate with GCP")
 
-        client = get_docker_client()
+        client = self.get_docker()
         r = client.login(
             "oauth2accesstoken",
             creds.token,
-            registry=ctf_config["custom"]["container_registry"],
+            registry=self.custom["container_registry"],
             reauth=True,
         )
         if not r.get("Status", "") == "Login Succeeded":
             raise CriticalException("Could not login with docker")
 
-        for container_name, _ in config["deployment"]["containers"].items():
+        return client, self.custom["container_registry"]
+
+    def close(self):
+        if self.http is not None:
+            self.http.close()
+
+
+def push_challenge(config, workdir, session, args, output=print):
+    """Builds a challenge, uploads its files, pushes its containers and pushes it to the platform. Paths in the challenge config are resolved relative to workdir rather than the working directory.
+
+    Args:
+        config (dict): The normalized challenge config
+        workdir (pathlib.Path): The challenge directory
+        session (PushSession): The connections to push with
+        args (argparse.Namespace): The parsed push arguments
+        output (callable): The function used to print progress, with the same signature as print
+
+    Returns:
+        dict: Dictionary with the amount of files ``uploaded``, ``unchanged`` and ``deleted``, the amount of container ``images`` pushed and the amount of container images skipped because the registry already had them, ``images_unchanged``
+
+    Raises:
+        CriticalException: If any step fails
+    """
+    stats = {
+        "uploaded": 0,
+        "unchanged": 0,
+        "deleted": 0,
+        "images": 0,
+        "images_unchanged": 0,
+    }
+
+    if not config["challenge_id"]:
+        raise CriticalException("ID not configured in the challenge configuration file")
+
+    platform_url, http = session.get_platform()
+
+    file_urls = [file for file in config["downloadable_files"] if is_url(file)]
+
+    if not args.skip_container_build and not args.skip_container_push:
+        if build_docker_images(
+            config,
+            session.get_docker(),
+            force_rebuild=args.force_rebuild,
+            jobs=args.jobs,
+            workdir=workdir,
+            output=output,
+        ):
+            output(f"{BOLD}Challenge built{CLEAR}")
+        else:
+            output(f"{BOLD}Nothing to build{CLEAR}")
+
+    if not args.skip_files:
+        if not config["downloadable_files"]:
+            output(f"{BOLD}No files defined, nothing to upload{CLEAR}")
+        else:
+            s3_client, bucket_name, public_endpoint = session.get_s3()
+            folder = hashlib.sha256(
+                f"{session.custom['secret']}-{config['challenge_id']}".encode()
+            ).hexdigest()
+
+            files = {}
+            for file in config["downloadable_files"]:
+                if is_url(file):
+                    continue
+
+                path = workdir / file
+                paths = list(path.iterdir()) if path.is_dir() else [path]
+                for path in paths:
+                    if not path.exists():
+                        raise CriticalException(f"file {path} does not exist!")
+                    files[path.name] = path
+
+            plan = sync_files(
+                s3_client,
+                bucket_name,
+                f"{folder}/",
+                files,
+                jobs=args.jobs,
+                output=output,
+            )
+            stats["uploaded"] = len(plan.upload)
+            stats["unchanged"] = len(plan.unchanged)
+            stats["deleted"] = len(plan.delete)
+
+            file_urls += [
+                f"{public_endpoint}/{bucket_name}/{folder}/{name}" for name in files
+            ]
+
+    if not args.skip_container_push and config["deployment"]:
+        client, registry = session.get_registry(output=output)
+
+        images = []
+        for container_name in config["deployment"]["containers"]:
             container_name = create_docker_name(
                 config["title"],
                 container_name=container_name,
                 chall_id=config["challenge_id"],
             )
-            repo_container_name = urllib.parse.urljoin(
-                ctf_config["custom"]["container_registry"], container_name
+            images.append(
+                (container_name, urllib.parse.urljoin(registry, container_name))
             )
 
-            print(f"{BOLD}Pushing container {container_name}...{CLEAR}")
-            client.images.get(container_name).tag(repo_container_name)
-            stream = client.images.push(repo_container_name, stream=True)
-            for log in stream:
-                log = json.loads(log)
-                if "error" in log:
-                    raise CriticalException(
-                        f"{CRITICAL}Failed pushing the container to the repository:{CLEAR}\n\033[31m{log['error']}"
-                    )
+        results = push_images(
+            client, images, jobs=args.jobs, force=args.force_push, output=output
+        )
+        stats["images"] = sum(1 for result in results if result.status == PUSHED)
+        stats["images_unchanged"] = len(results) - stats["images"]
 
     service_types = {
         s["type"]: s
@@ -231,18 +488,24 @@ def run(args):
         ],
     }
 
-    print(f"{BOLD}Pushing to platform...{CLEAR}")
+    output(f"{BOLD}Pushing to platform...{CLEAR}")
 
-    r = requests.post(
-        ctf_config["custom"]["platform_url"] + "/api/admin/push_challenge",
-        json=payload,
-        headers={"X-API-Key": ctf_config["custom"]["platform_api_key"]},
-    )
+    try:
+        r = http.post(
+            platform_url + "/api/admin/push_challenge",
+            json=payload,
+            timeout=session.timeout,
+        )
+    except requests.exceptions.RequestException as exc:
+        raise CriticalException(f"Request to the platform failed: {exc}") from exc
 
     if r.status_code != 200:
+        try:
+            message = r.json().get("message", "")
+        except ValueError:
+            message = r.text
         raise CriticalException(
-            f"Request failed with status {r.status_code} - {r.json().get('message','')}"
+            f"Request failed with status {r.status_code} - {message}"
         )
 
-    print(f"{SUCCESS}Challenge pushed!{CLEAR}")
-    return 0
+    return stats
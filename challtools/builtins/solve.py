@@ -1,8 +1,8 @@
 import sys
-import time
 
 from challtools.constants import *
 from challtools.exceptions import CriticalException
+from challtools.readiness import wait_until_ready
 from challtools.utils import (
     get_valid_config,
     start_chall,
@@ -24,10 +24,20 @@ def run(args):
         print(f"{BOLD}No services defined, there is nothing to solve{CLEAR}")
         return 0
 
-    # sleep to let challenge spin up
-    time.sleep(3)
-    # TODO if the services have a docker healthcheck, wait for it to pass instead
-    # TODO configureable sleep with a cmd arg
+    print(f"{BOLD}Waiting for services to become ready...{CLEAR}")
+    results = wait_until_ready(containers, config, deadline=args.ready_timeout)
+    for result in results:
+        if result.ready:
+            print(f"{result.name} ready after {result.elapsed:.2f}s ({result.method})")
+        else:
+            print(
+                f"{HIGH}{result.name} not ready after {result.elapsed:.2f}s ({result.method}, {result.reason}){CLEAR}"
+            )
+
+    if not all(result.ready for result in results):
+        for container in containers:
+            container.remove(force=True)
+        raise CriticalException("Challenge services did not become ready")
 
     solution_container = start_solution(config)
     print(f"{BOLD}Solving...{CLEAR}")
@@ -0,0 +1,190 @@
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from challtools.constants import *
+from challtools.exceptions import CriticalException
+from challtools.readiness import wait_until_ready
+from challtools.utils import (
+    PrefixedOutput,
+    discover_challenges,
+    get_ctf_config_path,
+    get_docker_client,
+    get_valid_config,
+    start_chall,
+    start_solution,
+    validate_solution_output,
+)
+
+RESULT_COLORS = {
+    "solved": SUCCESS,
+    "skipped": BOLD,
+    "failed": CRITICAL,
+    "timeout": HIGH,
+}
+
+
+def run(args):
+    if get_ctf_config_path() is None:
+        raise CriticalException(
+            "No CTF configuration file (ctf.yml) detected in the current directory or any parent directory, and therefore cannot discover challenges."
+        )
+
+    if args.jobs < 1:
+        raise CriticalException("The number of jobs must be at least 1")
+
+    root = get_ctf_config_path().parent
+    paths = discover_challenges()
+    results = []
+    start = time.monotonic()
+
+    with ThreadPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [executor.submit(solve_isolated, path, root, args) for path in paths]
+        for future in as_completed(futures):
+            result = future.result()
+            color = RESULT_COLORS[result["result"]]
+            print(
+                f"{color}{result['name']}: {result['result']}{CLEAR}"
+                + (f" ({result['message']})" if result["message"] else "")
+            )
+            results.append(result)
+
+    print_matrix(results, time.monotonic() - start)
+
+    return int(any(result["result"] in ["failed", "timeout"] for result in results))
+
+
+def solve_isolated(path, root, args):
+    """Starts a challenge and its solution on their own docker network and solves it. The challenge publishes no ports, so any amount of challenges can be solved at the same time.
+
+    Args:
+        path (pathlib.Path): The path to the challenge configuration file
+        root (pathlib.Path): The CTF root directory, which the challenge path is displayed relative to
+        args (argparse.Namespace): The parsed solveall arguments
+
+    Returns:
+        dict: Dictionary with the keys ``name``, ``result`` (one of ``solved``, ``failed``, ``timeout`` and ``skipped``), ``message``, ``ready_time`` and ``duration``
+    """
+    import docker
+    import requests
+
+    name = str(path.parent.relative_to(root))
+    output = PrefixedOutput(f"[{name}] ")
+    result = {
+        "name": name,
+        "result": "failed",
+        "message": None,
+        "ready_time": None,
+        "duration": 0,
+    }
+    start = time.monotonic()
+
+    client = None
+    network = None
+    containers = []
+    solution_container = None
+
+    try:
+        config = get_valid_config(
+            workdir=path.parent, search=False, cd=False, output=output
+        )
+
+        if not config["solution_image"]:
+            result["result"] = "skipped"
+            result["message"] = "no solution defined"
+            return result
+
+        client = get_docker_client()
+        network = client.networks.create(f"challtools_solve_{uuid.uuid4().hex[:12]}")
+
+        containers, _ = start_chall(config, network=network.name, output=output)
+        readiness = wait_until_ready(
+            containers, config, deadline=args.ready_timeout, network=network.name
+        )
+        result["ready_time"] = max(
+            [service.elapsed for service in readiness], default=0
+        )
+        not_ready = [service for service in readiness if not service.ready]
+        if not_ready:
+            result["result"] = (
+                "timeout"
+                if all(service.reason == "timeout" for service in not_ready)
+                else "failed"
+            )
+            result["message"] = "services not ready: " + ", ".join(
+                f"{service.name} ({service.reason})" for service in not_ready
+            )
+            return result
+
+        solution_container = start_solution(config, network=network.name)
+        try:
+            solution_container.wait(timeout=args.timeout)
+        except requests.exceptions.RequestException:
+            result["result"] = "timeout"
+            result["message"] = f"solution did not finish within {args.timeout}s"
+            return result
+
+        solution_output = solution_container.logs().decode(errors="replace")
+        if validate_solution_output(config, solution_output):
+            result["result"] = "solved"
+        else:
+            result["message"] = "wrong flag"
+            for line in solution_output.splitlines():
+                output(line)
+
+    except CriticalException as e:
+        result["message"] = e.args[0]
+    except docker.errors.DockerException as e:
+        result["message"] = str(e)
+    except Exception as e:
+        result["message"] = f"{type(e).__name__}: {e}"
+    finally:
+        for container in [*containers, solution_container]:
+            if container is None:
+                continue
+            try:
+                container.remove(force=True)
+            except docker.errors.DockerException:
+                pass
+        if network is not None:
+            try:
+                network.remove()
+            except docker.errors.DockerException:
+                pass
+        output.flush()
+        result["duration"] = time.monotonic() - start
+
+    return result
+
+
+def print_matrix(results, wall_time):
+    """Prints a table with the result and timings of every solved challenge.
+
+    Args:
+        results (list): A list of results as returned by solve_isolated
+        wall_time (float): The wall time of the entire run, in seconds
+    """
+    results = sorted(results, key=lambda r: r["name"])
+    width = max([len("Challenge")] + [len(result["name"]) for result in results])
+
+    print()
+    print(f"{BOLD}{'Challenge':<{width}}  Result   Ready    Total{CLEAR}")
+    for result in results:
+        color = RESULT_COLORS[result["result"]]
+        ready_time = (
+            f"{result['ready_time']:.2f}s" if result["ready_time"] is not None else "-"
+        )
+        print(
+            f"{result['name']:<{width}}  {color}{result['result']:<7}{CLEAR}  "
+            f"{ready_time:>6}  {result['duration']:>6.2f}s"
+        )
+
+    counts = {
+        status: sum(1 for result in results if result["result"] == status)
+        for status in RESULT_COLORS
+    }
+    print(
+        f"\n{BOLD}{counts['solved']} solved, {counts['failed']} failed, "
+        f"{counts['timeout']} timed out, {counts['skipped']} skipped "
+        f"in {wall_time:.2f}s.{CLEAR}"
+    )
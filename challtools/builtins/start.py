@@ -1,15 +1,14 @@
-import sys
-
 import docker
 
 from challtools.constants import *
+from challtools.logs import LogMultiplexer
 from challtools.utils import build_chall, get_valid_config, start_chall
 
 
 def run(args):
     config = get_valid_config()
 
-    if args.build and build_chall(config):
+    if args.build and build_chall(config, force_rebuild=args.force_rebuild):
         print(f"{SUCCESS}Challenge built successfully!{CLEAR}")
 
     containers, service_strings = start_chall(config)
@@ -18,32 +17,27 @@ def run(args):
         print(f"{BOLD}No services defined, nothing to do{CLEAR}")
         return 0
 
-    if len(containers) > 1:
-        print(
-            f"{HIGH}challtools does not properly support multiple containers yet. All are started, but you will only see information for the first container.{CLEAR}"
-        )
-
     if service_strings:
         print(f"{BOLD}Services:\n" + "\n".join(service_strings) + f"{CLEAR}")
 
+    multiplexer = LogMultiplexer(
+        {container.name: container for container in containers}
+    )
     try:
-        for log in containers[0].logs(
-            stream=True, stderr=True
-        ):  # TODO print logs from all containers
-            sys.stdout.write(log.decode())
+        exited = multiplexer.run()
     except KeyboardInterrupt:
         print(f"{BOLD}Stopping...{CLEAR}")
-        for container in containers:
-            try:
-                container.kill()
-            except docker.errors.APIError:
-                pass
-            try:
-                container.remove()
-            except docker.errors.APIError:
-                pass
+        multiplexer.stop()
+        stop_containers(containers)
         return 0
 
+    multiplexer.stop()
+    print(f"{HIGH}The container {exited} exited by itself, stopping the others.{CLEAR}")
+    stop_containers(containers)
+    return 1
+
+
+def stop_containers(containers):
     for container in containers:
         try:
             container.kill()
@@ -53,5 +47,3 @@ def run(args):
             container.remove()
         except docker.errors.APIError:
             pass
-    print(f"{HIGH}The container exited by itself.{CLEAR}")
-    return 1
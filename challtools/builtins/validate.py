@@ -1,19 +1,206 @@
-from pathlib import Path
+import json
+import os
 
+from challtools.cache import cached_validate
 from challtools.constants import *
-from challtools.utils import load_config, load_ctf_config, process_messages
-from challtools.validator import ConfigValidator
+from challtools.exceptions import CriticalException
+from challtools.utils import (
+    discover_challenges,
+    get_ctf_config_path,
+    load_ctf_config,
+    locate_config,
+    process_messages,
+)
 
 
 def run(args):
+    if args.watch:
+        return run_watch(args)
 
-    config = load_config()
+    if args.all:
+        return run_all(args)
 
-    validator = ConfigValidator(
-        config, ctf_config=load_ctf_config(), challdir=Path(".")
+    path = locate_config()
+    os.chdir(path.parent)
+
+    valid, messages, _ = cached_validate(
+        path, ctf_config_path=get_ctf_config_path(), challdir=path.parent
+    )
+
+    if args.format == "jsonl":
+        print_record(path, valid, messages)
+        return int(process_messages(messages)["highest_level"] >= args.error_level)
+
+    return print_report(messages, args)
+
+
+def run_all(args):
+    from challtools.validator import ConfigValidator
+
+    if get_ctf_config_path() is None:
+        raise CriticalException(
+            "No CTF configuration file (ctf.yml) detected in the current directory or any parent directory, and therefore cannot discover challenges."
+        )
+
+    ctf_config = load_ctf_config()
+    failed = False
+
+    for path, valid, messages in ConfigValidator.validate_many(
+        discover_challenges(), ctf_config=ctf_config, jobs=args.jobs
+    ):
+        if args.format == "jsonl":
+            print_record(path, valid, messages)
+            failed |= process_messages(messages)["highest_level"] >= args.error_level
+        else:
+            print(f"{BOLD}Validating {path}{CLEAR}")
+            failed |= bool(print_report(messages, args))
+
+    return int(failed)
+
+
+def run_watch(args):
+    import yaml
+
+    from challtools.watch import create_watcher
+
+    ctf_config_path = get_ctf_config_path()
+    if args.all:
+        if ctf_config_path is None:
+            raise CriticalException(
+                "No CTF configuration file (ctf.yml) detected in the current directory or any parent directory, and therefore cannot discover challenges."
+            )
+        root = ctf_config_path.parent.absolute()
+    else:
+        root = locate_config().parent.absolute()
+        os.chdir(root)
+    files = [ctf_config_path.absolute()] if ctf_config_path else []
+
+    # config path -> the latest validation messages
+    results = {}
+    changed = {root}
+
+    with create_watcher(root, files) as watcher:
+        try:
+            while True:
+                try:
+                    reported = validate_changes(args, root, files, changed, results)
+                except (CriticalException, OSError, yaml.YAMLError) as e:
+                    print(CRITICAL + str(e) + CLEAR)
+                    reported = True
+
+                if reported and args.format != "jsonl":
+                    print(
+                        f"{BOLD}Watching {root} for changes, press Ctrl+C to stop{CLEAR}"
+                    )
+                changed = watcher.wait()
+        except KeyboardInterrupt:
+            pass
+
+    return int(
+        any(
+            process_messages(messages)["highest_level"] >= args.error_level
+            for messages in results.values()
+        )
+    )
+
+
+def validate_changes(args, root, files, changed, results):
+    """Validates the challenges affected by changes again and prints how their validation messages changed. Challenges are affected if a file in their directory changed, and all challenges are affected if the CTF configuration file changed. Challenges that were not validated before are reported in full.
+
+    Args:
+        args (argparse.Namespace): The arguments of the validate command
+        root (pathlib.Path): The watched directory, the challenge directory or the CTF root when using --all
+        files (list): The watched files outside of the root
+        changed (set): The changed paths, as returned by challtools.watch.Watcher.wait
+        results (dict): The latest validation messages by challenge config path, which is updated
+
+    Returns:
+        bool: If anything was printed
+    """
+    from challtools.validator import ConfigValidator
+    from challtools.watch import affected_directories
+
+    if args.all:
+        paths = [path.absolute() for path in discover_challenges(root)]
+    else:
+        paths = [locate_config(root, search=False).absolute()]
+    ctf_config = load_ctf_config()
+
+    removed = sorted(results.keys() - set(paths))
+    for path in removed:
+        print(f"{BOLD}{path} was removed{CLEAR}")
+        del results[path]
+
+    if root in changed or set(files) & changed:
+        affected = paths
+    else:
+        directories = affected_directories(changed, [path.parent for path in paths])
+        affected = [
+            path for path in paths if path.parent in directories or path not in results
+        ]
+
+    validated = ConfigValidator.validate_many(
+        affected, ctf_config=ctf_config, jobs=args.jobs if len(affected) > 1 else 1
     )
-    messages = validator.validate()[1]
+    for path, valid, messages in sorted(validated, key=lambda result: result[0]):
+        if args.format == "jsonl":
+            print_record(path, valid, messages)
+        elif path not in results:
+            print(f"{BOLD}Validating {path}{CLEAR}")
+            print_report(messages, args)
+        else:
+            print_diff(path, results[path], messages, args)
+        results[path] = messages
+
+    return bool(removed or affected)
+
+
+def print_diff(path, previous, messages, args):
+    """Prints how the validation messages of a challenge changed since it was last validated.
+
+    Args:
+        path (pathlib.Path): The path to the challenge configuration file
+        previous (list): The messages of the previous validation
+        messages (list): The messages of the current validation
+        args (argparse.Namespace): The arguments of the validate command
+    """
+
+    def key(message):
+        return message["code"], message["field"], message["message"]
+
+    previous_keys = {key(message) for message in previous}
+    keys = {key(message) for message in messages}
+    resolved = [message for message in previous if key(message) not in keys]
+    added = [message for message in messages if key(message) not in previous_keys]
+
+    if not resolved and not added:
+        print(f"{BOLD}{path}: no changes{CLEAR}")
+        return
+
+    print(f"{BOLD}{path}:{CLEAR}")
+    for message_string in process_messages(resolved, verbose=args.verbose)[
+        "message_strings"
+    ]:
+        print(f"{SUCCESS}-{CLEAR} {message_string}")
+    for message_string in process_messages(added, verbose=args.verbose)[
+        "message_strings"
+    ]:
+        print(f"{CRITICAL}+{CLEAR} {message_string}")
+    print(process_messages(messages)["count_string"].lstrip("\n"))
+
+
+def print_record(path, valid, messages):
+    """Prints the validation result of a single challenge as one line of JSON, flushing it right away so that consumers can process it immediately."""
+    record = {
+        "path": str(path),
+        "valid": valid,
+        "highest_level": process_messages(messages)["highest_level"],
+        "messages": messages,
+    }
+    print(json.dumps(record), flush=True)
+
 
+def print_report(messages, args):
     processed = process_messages(messages, verbose=args.verbose)
 
     if processed["highest_level"]:
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import hashlib
+import importlib.resources
+import json
+import os
+import tempfile
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+from challtools.types import JsonDict, ValidatorMessage
+
+# bump this when the format of cache entries changes
+CACHE_FORMAT = 1
+# the maximum amount of entries kept in a validation cache directory, least recently used entries are evicted first
+MAX_VALIDATION_ENTRIES = 4096
+
+
+def cache_enabled() -> bool:
+    """Checks if the on-disk caches may be used. They are disabled by setting the ``CHALLTOOLS_NO_CACHE`` environment variable, which ``challtools --no-cache`` does."""
+    return not os.environ.get("CHALLTOOLS_NO_CACHE")
+
+
+def get_cache_dir(start: Path) -> Path:
+    """Gets the cache directory to use for a path. This is ``.challtools/cache`` in the CTF root directory if there is a CTF configuration file, otherwise in the directory of the path itself.
+
+    Args:
+        start: A challenge configuration file or directory to find the cache directory for.
+
+    Returns:
+        The path to the cache directory. It is not created by this function.
+    """
+    start = start.absolute()
+    if start.is_file():
+        start = start.parent
+
+    for directory in [start, *start.parents]:
+        if (directory / "ctf.yml").exists() or (directory / "ctf.yaml").exists():
+            return directory / ".challtools" / "cache"
+
+    return start / ".challtools" / "cache"
+
+
+@cache
+def _validator_digest() -> bytes:
+    """A digest of everything besides the configuration files that affects validation results. The validator source is used instead of the challtools version, since resolving the version is slow and the source also changes between development builds."""
+    digest = hashlib.sha256(f"{CACHE_FORMAT}|".encode())
+    for resource in ["validator.py", "challenge.schema.json", "codes.yml"]:
+        digest.update((importlib.resources.files("challtools") / resource).read_bytes())
+    return digest.digest()
+
+
+def _file_state(
+    normalized_config: JsonDict | None, challdir: Path | None
+) -> dict[str, bool]:
+    """The existence of all downloadable files checked by A003, since the validation result depends on them."""
+    if not challdir or not normalized_config:
+        return {}
+
+    from challtools.validator import is_url
+
+    return {
+        file: (challdir / file).exists()
+        for file in normalized_config["downloadable_files"]
+        if not is_url(file)
+    }
+
+
+def _read_entry(path: Path) -> dict[str, Any] | None:
+    try:
+        entry = json.loads(path.read_bytes())
+        os.utime(path)  # mark as recently used for eviction
+    except (OSError, ValueError):
+        return None
+
+    return entry
+
+
+def write_json(path: Path, data: Any) -> bool:
+    """Atomically writes JSON data to a cache file, creating its directory if needed. Values that would not survive a round trip through JSON unchanged are not written.
+
+    Args:
+        path: The file to write.
+        data: The data to write.
+
+    Returns:
+        If the data was written.
+    """
+    try:
+        encoded = json.dumps(data).encode()
+    except (TypeError, ValueError):
+        # configs containing values without a JSON representation (such as
+        # YAML timestamps in custom fields) are simply not cached
+        return False
+    if json.loads(encoded) != data:
+        # same for values that would not survive the round trip unchanged,
+        # such as non-string mapping keys
+        return False
+
+    return write_bytes(path, encoded)
+
+
+def write_bytes(path: Path, data: bytes) -> bool:
+    """Atomically writes data to a cache file, creating its directory if needed.
+
+    Args:
+        path: The file to write.
+        data: The data to write.
+
+    Returns:
+        If the data was written.
+    """
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_name, path)
+    except OSError:
+        return False
+
+    return True
+
+
+def _write_entry(path: Path, entry: dict[str, Any]):
+    if not write_json(path, entry):
+        return
+
+    try:
+        evict(path.parent, MAX_VALIDATION_ENTRIES)
+    except OSError:
+        pass
+
+
+def evict(directory: Path, max_entries: int, suffix: str = ".json"):
+    """Removes the least recently used entries from a cache directory until at most max_entries remain. Entries are marked as used by updating their modification time.
+
+    Args:
+        directory: The cache directory.
+        max_entries: The maximum amount of entries to keep.
+        suffix: The file name suffix of entries, other files are left alone.
+    """
+    with os.scandir(directory) as it:
+        entries = [
+            (entry.stat().st_mtime_ns, entry.path)
+            for entry in it
+            if entry.is_file() and entry.name.endswith(suffix)
+        ]
+
+    if len(entries) <= max_entries:
+        return
+
+    entries.sort()
+    for _, path in entries[: len(entries) - max_entries]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def cached_validate(
+    config_path: Path,
+    ctf_config_path: Path | None = None,
+    challdir: Path | None = None,
+) -> tuple[bool, list[ValidatorMessage], JsonDict | None]:
+    """Validates a challenge configuration file, reusing the result of a previous validation of identical files if possible.
+
+    Results are cached in ``.challtools/cache/validation`` keyed by the contents of the challenge and CTF configuration files, the validator source and the schema and message definitions. On a cache hit neither file is parsed.
+
+    Args:
+        config_path: The path to the challenge configuration file.
+        ctf_config_path: The path to the CTF configuration file to validate against, if any.
+        challdir: The challenge directory, passed on to the validator to check for downloadable files.
+
+    Returns:
+        A tuple of the validity of the config, the list of validator messages and the normalized config (None if the config is invalid).
+    """
+    config_bytes = config_path.read_bytes()
+    ctf_config_bytes = ctf_config_path.read_bytes() if ctf_config_path else None
+    challdir = challdir.absolute() if challdir else None
+
+    key = hashlib.sha256(_validator_digest())
+    key.update(hashlib.sha256(config_bytes).digest())
+    key.update(
+        hashlib.sha256(ctf_config_bytes).digest()
+        if ctf_config_bytes is not None
+        else b"no ctf config"
+    )
+    key.update(str(challdir).encode())
+    entry_path = get_cache_dir(config_path) / "validation" / (key.hexdigest() + ".json")
+
+    if cache_enabled():
+        entry = _read_entry(entry_path)
+        if entry and entry["files"] == _file_state(
+            entry["normalized_config"], challdir
+        ):
+            return entry["valid"], entry["messages"], entry["normalized_config"]
+
+    # only imported on cache misses, so that cache hits don't pay for them
+    from challtools.loader import parse_yaml
+    from challtools.validator import ConfigValidator
+
+    config = parse_yaml(config_bytes, config_path)
+    ctf_config = None
+    if ctf_config_bytes is not None:
+        ctf_config = parse_yaml(ctf_config_bytes, ctf_config_path) or {}
+
+    validator = ConfigValidator(config, ctf_config=ctf_config, challdir=challdir)
+    valid, messages = validator.validate()
+
+    if cache_enabled():
+        _write_entry(
+            entry_path,
+            {
+                "valid": valid,
+                "messages": messages,
+                "normalized_config": validator.normalized_config,
+                "files": _file_state(validator.normalized_config, challdir),
+            },
+        )
+
+    return valid, messages, validator.normalized_config
@@ -0,0 +1,260 @@
+"""A cached description of the argument parser, used for shell completion.
+
+Completing a command line requires the complete argument parser, which normally
+means executing the code of every plugin in ``.challtools/plugins``. Since that
+happens on every key press that triggers a completion, the parser is instead
+serialized to a manifest in ``.challtools/cache`` the first time and rebuilt
+from it afterwards. The manifest is invalidated whenever a plugin file or the
+builtin command definitions change.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib.resources
+import json
+import os
+from pathlib import Path
+from typing import Any, Callable
+
+from challtools.cache import cache_enabled, write_json
+from challtools.plugin import lazy_runner
+
+# bump this when the format of the manifest changes
+MANIFEST_FORMAT = 1
+MANIFEST_NAME = "completion.json"
+
+
+class ManifestError(Exception):
+    """Raised when a parser can not be represented in a manifest."""
+
+
+def get_manifest_path(plugins_dir: Path) -> Path:
+    """Gets the path of the completion manifest belonging to a plugins directory."""
+    return plugins_dir.parent / "cache" / MANIFEST_NAME
+
+
+def get_manifest_key(plugins_dir: Path) -> str:
+    """Computes a key identifying the state of everything that defines the argument parser. It consists of the builtin command definitions and the path, modification time and size of every python file in the plugins directory, so that no plugin file has to be read.
+
+    Args:
+        plugins_dir: The ``.challtools/plugins`` directory.
+
+    Returns:
+        A hex digest identifying the current state.
+    """
+    digest = hashlib.sha256(f"{MANIFEST_FORMAT}|".encode())
+    digest.update(
+        (
+            importlib.resources.files("challtools") / "builtins" / "__init__.py"
+        ).read_bytes()
+    )
+
+    plugin_files = []
+    for directory, dirnames, filenames in os.walk(plugins_dir):
+        dirnames[:] = [name for name in dirnames if name != "__pycache__"]
+        for filename in filenames:
+            if not filename.endswith(".py"):
+                continue
+            path = os.path.join(directory, filename)
+            stat = os.stat(path)
+            plugin_files.append(
+                f"{os.path.relpath(path, plugins_dir)}|{stat.st_mtime_ns}|{stat.st_size}"
+            )
+
+    for plugin_file in sorted(plugin_files):
+        digest.update(plugin_file.encode() + b"\0")
+
+    return digest.hexdigest()
+
+
+def _serialize_completer(completer: Any) -> dict[str, str] | None:
+    if completer is None:
+        return None
+
+    module_name = getattr(completer, "module_name", None)
+    func_name = getattr(completer, "func_name", None)
+    if module_name is None or func_name is None:
+        raise ManifestError(f"Completer {completer!r} is not a lazy_runner")
+
+    return {"module": module_name, "func": func_name}
+
+
+def serialize_parser(parser: argparse.ArgumentParser) -> dict[str, Any]:
+    """Serializes everything about an argument parser that is relevant for completion.
+
+    Args:
+        parser: The parser to serialize.
+
+    Returns:
+        A JSON serializable representation of the parser.
+
+    Raises:
+        ManifestError: If the parser contains completers that are not created by :func:`challtools.plugin.lazy_runner` or choices that are not JSON serializable.
+    """
+    actions = []
+    for action in parser._actions:
+        if isinstance(action, argparse._HelpAction):
+            continue
+
+        if isinstance(action, argparse._SubParsersAction):
+            helps = {
+                choice_action.dest: choice_action.help
+                for choice_action in action._choices_actions
+            }
+            actions.append(
+                {
+                    "subparsers": {
+                        name: {
+                            "help": helps.get(name),
+                            "parser": serialize_parser(subparser),
+                        }
+                        for name, subparser in action.choices.items()
+                    },
+                    "metavar": action.metavar,
+                }
+            )
+            continue
+
+        choices = list(action.choices) if action.choices is not None else None
+        if choices is not None and not all(
+            isinstance(choice, (str, int, float)) for choice in choices
+        ):
+            raise ManifestError(f"Choices of {action.dest} are not serializable")
+
+        actions.append(
+            {
+                "option_strings": action.option_strings,
+                "dest": action.dest,
+                "nargs": action.nargs,
+                "choices": choices,
+                "help": action.help,
+                "completer": _serialize_completer(getattr(action, "completer", None)),
+            }
+        )
+
+    return {
+        "prog": parser.prog,
+        "description": parser.description,
+        "actions": actions,
+    }
+
+
+def deserialize_parser(
+    data: dict[str, Any], parser: argparse.ArgumentParser | None = None
+) -> argparse.ArgumentParser:
+    """Rebuilds an argument parser from its serialized form. The rebuilt parser completes like the original one, but does not run any commands.
+
+    Args:
+        data: The serialized parser, as returned by :func:`serialize_parser`.
+        parser: The parser to add the arguments to. A new one is created if not given.
+
+    Returns:
+        The rebuilt parser.
+    """
+    if parser is None:
+        parser = argparse.ArgumentParser(
+            prog=data["prog"], description=data["description"]
+        )
+
+    for action_data in data["actions"]:
+        if "subparsers" in action_data:
+            subparsers = parser.add_subparsers(metavar=action_data["metavar"])
+            for name, subparser_data in action_data["subparsers"].items():
+                kwargs = {}
+                if subparser_data["help"] is not None:
+                    kwargs["help"] = subparser_data["help"]
+                subparser = subparsers.add_parser(
+                    name, description=subparser_data["parser"]["description"], **kwargs
+                )
+                deserialize_parser(subparser_data["parser"], subparser)
+            continue
+
+        kwargs = {"help": action_data["help"], "choices": action_data["choices"]}
+        if action_data["nargs"] == 0:
+            kwargs["action"] = "store_true"
+            del kwargs["choices"]
+        else:
+            kwargs["nargs"] = action_data["nargs"]
+        if action_data["option_strings"]:
+            kwargs["dest"] = action_data["dest"]
+            args = action_data["option_strings"]
+        else:
+            args = [action_data["dest"]]
+
+        action = parser.add_argument(*args, **kwargs)
+        if action_data["completer"]:
+            action.completer = lazy_runner(
+                action_data["completer"]["module"], action_data["completer"]["func"]
+            )
+
+    return parser
+
+
+def load_manifest(plugins_dir: Path) -> argparse.ArgumentParser | None:
+    """Rebuilds the argument parser from the completion manifest of a plugins directory.
+
+    Args:
+        plugins_dir: The ``.challtools/plugins`` directory.
+
+    Returns:
+        The rebuilt parser, or None if there is no up to date manifest.
+    """
+    if not cache_enabled():
+        return None
+
+    try:
+        manifest = json.loads(get_manifest_path(plugins_dir).read_bytes())
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get("key") != get_manifest_key(plugins_dir):
+        return None
+
+    return deserialize_parser(manifest["parser"])
+
+
+def save_manifest(plugins_dir: Path, parser: argparse.ArgumentParser):
+    """Writes the completion manifest of a plugins directory. Nothing is written if the parser can not be represented in a manifest, in which case completion keeps using the real parser.
+
+    Args:
+        plugins_dir: The ``.challtools/plugins`` directory.
+        parser: The complete challtools argument parser.
+    """
+    if not cache_enabled():
+        return
+
+    try:
+        data = serialize_parser(parser)
+    except ManifestError:
+        return
+
+    write_json(
+        get_manifest_path(plugins_dir),
+        {"key": get_manifest_key(plugins_dir), "parser": data},
+    )
+
+
+def get_completion_parser(
+    plugins_dir: Path | None, build_parser: Callable[[], argparse.ArgumentParser]
+) -> argparse.ArgumentParser:
+    """Gets an argument parser to complete with, preferring the manifest over building the real parser.
+
+    Args:
+        plugins_dir: The ``.challtools/plugins`` directory, or None if there is none.
+        build_parser: A function building the real parser, executing all plugins.
+
+    Returns:
+        The argument parser to complete with.
+    """
+    if plugins_dir is None:
+        # without plugins, building the parser is already cheap
+        return build_parser()
+
+    parser = load_manifest(plugins_dir)
+    if parser is None:
+        parser = build_parser()
+        save_manifest(plugins_dir, parser)
+
+    return parser
@@ -3,10 +3,10 @@ from __future__ import annotations
 from collections.abc import Callable
 from functools import cached_property
 from pathlib import Path
-from typing import Any, Self, override
-
-import yaml
+from typing import Any, Self, cast, override
 
+from challtools.discovery import find_challenges
+from challtools.loader import load_yaml
 from challtools.types import JsonDict, ValidatorMessage
 from challtools.validator import ConfigValidator
 
@@ -37,7 +37,8 @@ class _GeneratedCachedProperty[T]:
 
 
 class _Challenge:
-    config_path: Path  # pyright: ignore [reportUninitializedInstanceVariable] # initialized in __new__
+    config_path: Path  # pyright: ignore [reportUninitializedInstanceVariable] # initialized in get
+    ctf: "_CTF | None"  # pyright: ignore [reportUninitializedInstanceVariable] # initialized in get
 
     def __new__(cls, config_path: Path | None = None):
         config_path = config_path.absolute() if config_path else None
@@ -55,21 +56,35 @@ class _Challenge:
                     break
             else:
                 return None
-
-        instance = super().__new__(cls)
-        instance.config_path = config_path.absolute()
-        return instance
+            config_path = config_path.absolute()
+
+        return cls.get(config_path, _CTF(search_start=config_path.parent))
+
+    @classmethod
+    def get(cls, config_path: Path, ctf: _CTF | None) -> Self:
+        """Gets the challenge at an absolute path from the registry of its CTF, or of challenges outside of any CTF, creating it if it is not registered yet."""
+        registry = ctf.challenge_registry if ctf else _standalone_challenges
+        instance = registry.get(config_path)
+        if instance is None:
+            instance = super().__new__(cls)
+            instance.config_path = config_path
+            instance.ctf = ctf
+            registry[config_path] = instance
+        return cast(Self, instance)
 
     @cached_property
     def raw_config(self) -> dict[str, Any]:
         """The raw parsed configuration file before any validation or normalization is done."""
-        data = self.config_path.read_text()
-        config = yaml.safe_load(data)
+        config = load_yaml(self.config_path)
 
         return config if config else {}
 
     def _validate(self):
-        validator = ConfigValidator(self.raw_config)
+        validator = ConfigValidator(
+            self.raw_config,
+            ctf_config=self.ctf.raw_config if self.ctf else None,
+            challdir=self.config_path.parent,
+        )
         self.valid, self.validator_messages = validator.validate()
         self.normalized_config = validator.normalized_config
 
@@ -81,6 +96,11 @@ class _Challenge:
         _GeneratedCachedProperty(_validate)
     )
 
+    def invalidate(self):
+        """Discards the parsed configuration file and validation results, so that they are computed again on next access."""
+        for name in ["raw_config", "valid", "validator_messages", "normalized_config"]:
+            self.__dict__.pop(name, None)
+
     @override
     def __repr__(self):
         if not self.valid:
@@ -89,10 +109,20 @@ class _Challenge:
 
 
 class _CTF:
+    """
+    A CTF and the challenges in it. There is a single instance per CTF
+    configuration file, which owns the parsed configuration and every challenge
+    object in the CTF, so that the configuration is parsed once no matter how
+    many challenges are validated against it.
+    """
+
     config_path: Path  # pyright: ignore [reportUninitializedInstanceVariable] # initialized in __new__
+    # every challenge object of the CTF by the path to its configuration file
+    challenge_registry: "dict[Path, _Challenge]"  # pyright: ignore [reportUninitializedInstanceVariable] # initialized in __new__
 
-    def __new__(cls):
-        for directory in [context.rundir, *context.rundir.parents]:
+    def __new__(cls, search_start: Path | None = None):
+        search_start = search_start or context.rundir
+        for directory in [search_start, *search_start.parents]:
             if (directory / "ctf.yaml").exists():
                 config_path = directory / "ctf.yaml"
                 break
@@ -102,27 +132,37 @@ class _CTF:
         else:
             return None
 
-        instance = super().__new__(cls)
-        instance.config_path = config_path.absolute()
+        config_path = config_path.absolute()
+        instance = _ctfs.get(config_path)
+        if instance is None:
+            instance = super().__new__(cls)
+            instance.config_path = config_path
+            instance.challenge_registry = {}
+            _ctfs[config_path] = instance
         return instance
 
     @cached_property
-    def challenges(self):
-        """A list of all challenges in the CTF."""
+    def challenges(self) -> list[_Challenge]:
+        """A list of all challenges in the CTF, found the same way as by challtools.utils.discover_challenges."""
         return [
-            _Challenge(p)
-            for p in list(self.config_path.parent.glob("**/challenge.yaml"))
-            + list(self.config_path.parent.glob("**/challenge.yml"))
+            _Challenge.get(p.absolute(), self)
+            for p in find_challenges(self.config_path.parent)
         ]
 
     @cached_property
     def raw_config(self) -> dict[str, Any]:
         """The raw parsed configuration file before any validation or normalization is done."""
-        data = self.config_path.read_text()
-        config = yaml.safe_load(data)
+        config = load_yaml(self.config_path)
 
         return config if config else {}
 
+    def invalidate(self):
+        """Discards the parsed configuration file and the list of challenges, so that they are computed again on next access. Since every challenge is validated against the configuration, their validation results are discarded as well."""
+        self.__dict__.pop("raw_config", None)
+        self.__dict__.pop("challenges", None)
+        for challenge in self.challenge_registry.values():
+            challenge.invalidate()
+
 
 class _Context:
     rundir: Path = Path.cwd()
@@ -137,5 +177,17 @@ class _Context:
         """The CTF in the current context, if any."""
         return _CTF()
 
+    def invalidate(self):
+        """Discards every CTF and challenge, for example after changing ``rundir``."""
+        self.__dict__.pop("challenge", None)
+        self.__dict__.pop("ctf", None)
+        _ctfs.clear()
+        _standalone_challenges.clear()
+
+
+# every CTF by the path to its configuration file
+_ctfs: dict[Path, _CTF] = {}
+# challenges that are not part of a CTF by the path to their configuration file
+_standalone_challenges: dict[Path, _Challenge] = {}
 
 context = _Context()
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import os
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+# file containing gitignore style patterns of directories to skip during discovery
+IGNORE_FILE = ".challtoolsignore"
+# directories that never contain challenges but can be very large. hidden directories are always skipped as well
+PRUNED_DIRECTORIES = {"node_modules", "__pycache__", "venv", "bower_components"}
+CONFIG_NAMES = ["challenge.yml", "challenge.yaml"]
+
+
+class IgnoreRule(NamedTuple):
+    """A single pattern from an ignore file."""
+
+    base: str  # the directory of the ignore file, relative to the discovery root, with a trailing slash unless empty
+    regex: re.Pattern[str]
+    negate: bool
+    dir_only: bool
+
+
+def _translate_glob(pattern: str) -> str:
+    """Translates the glob part of a gitignore pattern into a regular expression."""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("/**", i) and i + 3 == len(pattern):
+            regex += "/.*"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+        if c == "*":
+            regex += "[^/]*"
+        elif c == "?":
+            regex += "[^/]"
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end == -1:
+                regex += re.escape(c)
+            else:
+                body = pattern[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                regex += f"[{body.replace(chr(92), chr(92) * 2)}]"
+                i = end
+        elif c == "\\" and i + 1 < len(pattern):
+            i += 1
+            regex += re.escape(pattern[i])
+        else:
+            regex += re.escape(c)
+        i += 1
+    return regex
+
+
+def parse_ignore_rule(line: str, base: str = "") -> IgnoreRule | None:
+    """Parses a line of an ignore file using gitignore syntax.
+
+    Args:
+        line: The line to parse.
+        base: The directory of the ignore file, relative to the discovery root.
+
+    Returns:
+        The parsed rule, or None if the line is empty or a comment.
+    """
+    if not line.endswith("\\ "):
+        line = line.rstrip()
+    if not line or line.startswith("#"):
+        return None
+
+    negate = line.startswith("!")
+    if negate:
+        line = line[1:]
+    elif line.startswith("\\!") or line.startswith("\\#"):
+        line = line[1:]
+
+    dir_only = line.endswith("/")
+    line = line.rstrip("/")
+    if not line:
+        return None
+
+    # patterns containing a slash are relative to the ignore file, others match at any depth
+    anchored = "/" in line
+    line = line.lstrip("/")
+    regex = _translate_glob(line)
+    if not anchored:
+        regex = "(?:.*/)?" + regex
+
+    if base:
+        base = base.rstrip("/") + "/"
+
+    return IgnoreRule(base, re.compile(regex + r"\Z", re.DOTALL), negate, dir_only)
+
+
+def read_ignore_file(path: Path, base: str = "") -> list[IgnoreRule]:
+    """Reads all rules from an ignore file, returning an empty list if it does not exist."""
+    try:
+        lines = path.read_text().splitlines()
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+    rules = []
+    for line in lines:
+        rule = parse_ignore_rule(line, base)
+        if rule:
+            rules.append(rule)
+    return rules
+
+
+def is_ignored(rules: list[IgnoreRule], relative_path: str, is_dir: bool) -> bool:
+    """Checks if a path is ignored by a list of rules. Later rules take precedence over earlier ones.
+
+    Args:
+        rules: The rules to check against, in the order they were defined.
+        relative_path: The path to check, relative to the discovery root and using forward slashes.
+        is_dir: If the path is a directory.
+    """
+    ignored = False
+    for rule in rules:
+        if rule.dir_only and not is_dir:
+            continue
+        if not relative_path.startswith(rule.base):
+            continue
+        if rule.regex.match(relative_path[len(rule.base) :]):
+            ignored = not rule.negate
+    return ignored
+
+
+def find_challenges(root: Path) -> list[Path]:
+    """Finds all challenge configuration files in a directory tree. Directories containing a challenge configuration are not searched any further, and hidden directories, known vendor directories and directories matched by a ``.challtoolsignore`` file are skipped.
+
+    Args:
+        root: The directory to search, usually the CTF root directory.
+
+    Returns:
+        A sorted list of paths to challenge configuration files.
+    """
+    results: list[Path] = []
+
+    def walk(directory: str, relative: str, rules: list[IgnoreRule]):
+        try:
+            with os.scandir(directory) as it:
+                entries = {entry.name: entry for entry in it}
+        except (PermissionError, NotADirectoryError, FileNotFoundError):
+            return
+
+        for name in CONFIG_NAMES:
+            if name in entries:
+                results.append(Path(entries[name].path))
+                return
+
+        if IGNORE_FILE in entries:
+            rules = rules + read_ignore_file(Path(entries[IGNORE_FILE].path), relative)
+
+        for name in sorted(entries):
+            if name.startswith(".") or name in PRUNED_DIRECTORIES:
+                continue
+            entry = entries[name]
+            try:
+                if not entry.is_dir():
+                    continue
+            except OSError:
+                continue
+            child_relative = relative + name
+            if is_ignored(rules, child_relative, True):
+                continue
+            walk(entry.path, child_relative + "/", rules)
+
+    walk(str(root), "", [])
+    return results
@@ -3,54 +3,68 @@ from __future__ import annotations
 
 import argparse
 import importlib.util
-import inspect
+import os
 from collections import defaultdict
 from pathlib import Path
-
-import argcomplete
+from types import ModuleType
 
 import challtools.builtins
-from challtools import __version__
 from challtools.constants import *
 from challtools.exceptions import CriticalException
 from challtools.plugin import Plugin
 
 
-def main(passed_args: list[str] | None = None):
-    """Main entry point for the challtools CLI."""
+def find_plugins_dir() -> Path | None:
+    """Finds the closest ``.challtools/plugins`` directory in the current or any parent directory."""
+    curpath = Path().absolute()
+    for directory in [curpath, *curpath.parents]:
+        plugins_dir = directory / ".challtools/plugins"
+        if plugins_dir.exists():
+            return plugins_dir
+    return None
+
+
+def load_plugin_modules(plugins_dir: Path | None) -> list[ModuleType]:
+    """Executes all plugins in a plugins directory, returning their modules after the builtin plugin module."""
+    plugin_modules = [challtools.builtins]
+
+    if plugins_dir is None:
+        return plugin_modules
+
+    for plugin_dir in plugins_dir.iterdir():
+        if plugin_dir.is_dir():
+            spec = importlib.util.spec_from_file_location(
+                plugin_dir.name, (plugin_dir / "__init__.py").absolute()
+            )
+            if spec is None or spec.loader is None:
+                print(f"{HIGH}Could not load plugin {plugin_dir}, skipping{CLEAR}")
+                continue
+            plugin_module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(plugin_module)
+            plugin_modules.append(plugin_module)
+
+    return plugin_modules
+
+
+def build_parser(
+    plugin_modules: list[ModuleType],
+) -> tuple[argparse.ArgumentParser, list[type[Plugin]]]:
+    """Builds the challtools argument parser from the plugins in a list of modules.
+
+    Returns:
+        A tuple of the parser and the plugin classes that were used to build it.
+    """
     parser = argparse.ArgumentParser(
         prog="challtools",
         description="A tool for managing CTF challenges and challenge repositories using the OpenChallSpec",
     )
     subparsers = parser.add_subparsers(metavar="COMMAND")
 
-    plugin_modules = [challtools.builtins]
-
-    # discover plugins in parent directories
-    curpath = Path().absolute()
-    for directory in [curpath, *curpath.parents]:
-        plugins_dir = directory / ".challtools/plugins"
-        if plugins_dir.exists():
-            for plugin_dir in plugins_dir.iterdir():
-                if plugin_dir.is_dir():
-                    spec = importlib.util.spec_from_file_location(
-                        plugin_dir.name, (plugin_dir / "__init__.py").absolute()
-                    )
-                    if spec is None or spec.loader is None:
-                        print(
-                            f"{HIGH}Could not load plugin {plugin_dir}, skipping{CLEAR}"
-                        )
-                        continue
-                    plugin_module = importlib.util.module_from_spec(spec)
-                    spec.loader.exec_module(plugin_module)
-                    plugin_modules.append(plugin_module)
-            break
-
     plugin_classes: list[type[Plugin]] = []
 
     for plugin_module in plugin_modules:
-        for _, obj in inspect.getmembers(plugin_module):
-            if inspect.isclass(obj) and issubclass(obj, Plugin) and obj is not Plugin:
+        for _, obj in sorted(vars(plugin_module).items()):
+            if isinstance(obj, type) and issubclass(obj, Plugin) and obj is not Plugin:
                 plugin_classes.append(obj)
 
     plugin_classes.sort(key=lambda p: p.priority)
@@ -58,12 +72,48 @@ def main(passed_args: list[str] | None = None):
         _ = plugin_class(parser, subparsers)
 
     _ = parser.add_argument("-v", "--version", action="store_true")
+    _ = parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write cached validation results",
+    )
+
+    return parser, plugin_classes
+
+
+def complete(plugins_dir: Path | None):
+    """Completes the command line given by the shell. The parser is rebuilt from a cached manifest when possible, so that plugins are only executed when they change."""
+    import argcomplete
+
+    from challtools.completion import get_completion_parser
 
+    parser = get_completion_parser(
+        plugins_dir, lambda: build_parser(load_plugin_modules(plugins_dir))[0]
+    )
     argcomplete.autocomplete(parser, always_complete_options=False)
 
+
+def main(passed_args: list[str] | None = None):
+    """Main entry point for the challtools CLI."""
+    plugins_dir = find_plugins_dir()
+
+    # argcomplete only does anything when invoked by the shell for completion,
+    # in which case it exits after printing the completions
+    if "_ARGCOMPLETE" in os.environ:
+        complete(plugins_dir)
+
+    plugin_modules = load_plugin_modules(plugins_dir)
+    parser, plugin_classes = build_parser(plugin_modules)
+
     args = parser.parse_args(passed_args)
 
+    if args.no_cache:
+        # an environment variable so that it also applies to subprocesses
+        os.environ["CHALLTOOLS_NO_CACHE"] = "1"
+
     if args.version:
+        from challtools import __version__
+
         print(f"challtools {__version__}\n")
 
         plugin_classes_by_module: defaultdict[str, list[str]] = defaultdict(list)
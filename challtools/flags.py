@@ -0,0 +1,288 @@
+"""Checking submitted flags against the flags of a challenge.
+
+A FlagMatcher is built once from a normalized config and can then check any
+amount of submissions: the flag format is checked with a single comparison, text
+flags are looked up in a dict and regex flags are compiled once.
+
+A FlagIndex holds the matchers of every challenge in a CTF by challenge ID, to
+verify submissions to any challenge, in bulk using several processes for large
+amounts, and to find flags that are accepted by more than one challenge.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import re
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Any, Iterable, Iterator, NamedTuple, TextIO
+
+from challtools.exceptions import CriticalException
+
+# the amount of CSV lines sent to a worker process at a time
+VERIFY_CHUNK_SIZE = 50000
+
+
+class FlagMatcher:
+    """Checks submissions against the flags of a challenge. A submission is correct if it has the flag format, if the challenge has one, and what is inside the flag format equals a text flag or contains a match of a regex flag.
+
+    Args:
+        config: The normalized challenge config.
+    """
+
+    def __init__(self, config: dict[str, Any]):
+        self.flags: list[dict[str, Any]] = config["flags"]
+        self.prefix: str = config["flag_format_prefix"] or ""
+        # the suffix is only part of the flag format if there is a prefix
+        self.suffix: str = (config["flag_format_suffix"] or "") if self.prefix else ""
+        self.format_length = len(self.prefix) + len(self.suffix)
+
+        self.text_flags: dict[str, int] = {}
+        self.regex_flags: list[tuple[int, re.Pattern[str]]] = []
+        for index, flag in enumerate(self.flags):
+            if flag["type"] == "text":
+                self.text_flags.setdefault(flag["flag"], index)
+            elif flag["type"] == "regex":
+                self.regex_flags.append((index, re.compile(flag["flag"])))
+
+    def strip_format(self, submission: str) -> str | None:
+        """Removes the flag format from a submission.
+
+        Returns:
+            What is inside the flag format, or None if the submission does not have the flag format.
+        """
+        if not self.prefix:
+            return submission
+
+        if (
+            len(submission) < self.format_length
+            or not submission.startswith(self.prefix)
+            or not submission.endswith(self.suffix)
+        ):
+            return None
+
+        return submission[len(self.prefix) : len(submission) - len(self.suffix)]
+
+    def match(self, submission: str) -> int | None:
+        """Finds the flag a submission matches.
+
+        Returns:
+            The index in ``config["flags"]`` of the first flag the submission matches, or None if it is incorrect.
+        """
+        inner = self.strip_format(submission)
+        if inner is None:
+            return None
+
+        text_index = self.text_flags.get(inner)
+        for index, pattern in self.regex_flags:
+            if text_index is not None and index > text_index:
+                break
+            if pattern.search(inner):
+                return index
+
+        return text_index
+
+    def is_valid(self, submission: str) -> bool:
+        """Checks if a submission is a correct flag."""
+        return self.match(submission) is not None
+
+
+class VerifyResult(NamedTuple):
+    """The amount of correct and incorrect submissions per challenge ID, and of submissions to unknown challenge IDs."""
+
+    correct: Counter
+    incorrect: Counter
+    unknown: Counter
+
+    def update(self, other: VerifyResult):
+        self.correct.update(other.correct)
+        self.incorrect.update(other.incorrect)
+        self.unknown.update(other.unknown)
+
+
+class FlagIndex:
+    """The flag matchers of every challenge in a CTF, by challenge ID."""
+
+    def __init__(self):
+        self.matchers: dict[str, FlagMatcher] = {}
+        self.names: dict[str, str] = {}
+
+    def add(self, config: dict[str, Any], name: str | None = None):
+        """Adds a challenge to the index.
+
+        Args:
+            config: The normalized challenge config.
+            name: The name to display for the challenge, the title if not given.
+
+        Raises:
+            CriticalException: If the challenge has no ID, or another challenge in the index has the same ID.
+        """
+        name = name or config["title"]
+        challenge_id = config["challenge_id"]
+        if not challenge_id:
+            raise CriticalException(f"{name} has no challenge ID")
+        if challenge_id in self.matchers:
+            raise CriticalException(
+                f"{name} and {self.names[challenge_id]} have the same challenge ID {challenge_id}"
+            )
+
+        self.matchers[challenge_id] = FlagMatcher(config)
+        self.names[challenge_id] = name
+
+    def match(self, challenge_id: str, submission: str) -> bool | None:
+        """Checks a submission to a challenge.
+
+        Returns:
+            If the submission is correct, or None if there is no challenge with the ID.
+        """
+        matcher = self.matchers.get(challenge_id)
+        if matcher is None:
+            return None
+        return matcher.is_valid(submission)
+
+    def verify(self, rows: Iterable[tuple[str, str]]) -> VerifyResult:
+        """Checks submissions to any challenges.
+
+        Args:
+            rows: (challenge ID, submission) pairs.
+
+        Returns:
+            The amount of correct and incorrect submissions.
+        """
+        matchers = self.matchers
+        result = VerifyResult(Counter(), Counter(), Counter())
+        for challenge_id, submission in rows:
+            matcher = matchers.get(challenge_id)
+            if matcher is None:
+                result.unknown[challenge_id] += 1
+            elif matcher.match(submission) is None:
+                result.incorrect[challenge_id] += 1
+            else:
+                result.correct[challenge_id] += 1
+        return result
+
+    def verify_csv(
+        self, f: TextIO, jobs: int = 1, chunk_size: int = VERIFY_CHUNK_SIZE
+    ) -> VerifyResult:
+        """Checks a CSV file of submissions, see parse_submissions. With more than one job, the file is split into chunks of raw text that are parsed and checked by worker processes, which is only worth it for hundreds of thousands of submissions.
+
+        Args:
+            f: The CSV file, opened in text mode with ``newline=""``.
+            jobs: The amount of worker processes, or 1 to check in this process.
+            chunk_size: The amount of lines sent to a worker at a time.
+
+        Returns:
+            The amount of correct and incorrect submissions.
+
+        Raises:
+            CriticalException: If a row does not have exactly two columns.
+        """
+        if jobs <= 1:
+            return self.verify(parse_submissions(f))
+
+        result = VerifyResult(Counter(), Counter(), Counter())
+        with ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(self,)
+        ) as executor:
+            # only a few chunks are read ahead, so that large files are never
+            # held in memory as a whole
+            pending = set()
+            for i, chunk in enumerate(split_records(f, chunk_size)):
+                if len(pending) >= 2 * jobs:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        result.update(future.result())
+                pending.add(executor.submit(_verify_chunk, chunk, i == 0))
+            for future in pending:
+                result.update(future.result())
+        return result
+
+    def collisions(self) -> list[tuple[str, list[str]]]:
+        """Finds text flags that are accepted by more than one challenge, either as a text flag or by matching a regex flag of another challenge.
+
+        Returns:
+            (flag including the flag format, challenge IDs accepting it) pairs, sorted by flag.
+        """
+        collisions = []
+        seen = set()
+        for matcher in self.matchers.values():
+            for text_flag in matcher.text_flags:
+                submission = matcher.prefix + text_flag + matcher.suffix
+                if submission in seen:
+                    continue
+                seen.add(submission)
+                accepting = [
+                    challenge_id
+                    for challenge_id, other in self.matchers.items()
+                    if other.is_valid(submission)
+                ]
+                if len(accepting) > 1:
+                    collisions.append((submission, accepting))
+        return sorted(collisions)
+
+
+def parse_submissions(
+    lines: Iterable[str], skip_header: bool = True
+) -> Iterator[tuple[str, str]]:
+    """Parses CSV rows of challenge ID and submission pairs. Empty rows are skipped.
+
+    Args:
+        lines: The lines of the CSV file.
+        skip_header: If a first row naming the columns ``challenge_id`` and ``submission`` should be skipped.
+
+    Yields:
+        (challenge ID, submission) tuples.
+
+    Raises:
+        CriticalException: If a row does not have exactly two columns.
+    """
+    for row in csv.reader(lines):
+        if not row:
+            continue
+        if len(row) != 2:
+            raise CriticalException(
+                f"Submission row {','.join(row)!r} does not have exactly two columns"
+            )
+        if skip_header:
+            skip_header = False
+            if row == ["challenge_id", "submission"]:
+                continue
+        yield row[0], row[1]
+
+
+def split_records(f: Iterable[str], chunk_size: int) -> Iterator[str]:
+    """Splits a CSV file into chunks of whole records. A line ending inside a quoted field, which is the case after a line with an odd amount of quotes, never ends a chunk.
+
+    Args:
+        f: The CSV file, opened in text mode with ``newline=""``.
+        chunk_size: The amount of lines in a chunk, unless extended to the end of a record.
+
+    Yields:
+        The text of each chunk.
+    """
+    chunk = []
+    quoted = False
+    for line in f:
+        chunk.append(line)
+        if line.count('"') % 2:
+            quoted = not quoted
+        if len(chunk) >= chunk_size and not quoted:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+
+
+_worker_index: FlagIndex | None = None
+
+
+def _init_worker(index: FlagIndex):
+    global _worker_index
+    _worker_index = index
+
+
+def _verify_chunk(text: str, first: bool) -> VerifyResult:
+    return _worker_index.verify(
+        parse_submissions(io.StringIO(text, newline=""), skip_header=first)
+    )
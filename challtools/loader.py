@@ -0,0 +1,122 @@
+"""Loading of YAML configuration files.
+
+Every YAML document challtools reads goes through this module. Documents are
+parsed with the libyaml based ``CSafeLoader`` when PyYAML was built with it,
+which is several times faster than the pure Python ``SafeLoader`` it falls back
+to.
+
+Parsed files are memoized per process by path, modification time and size, so
+that a file read repeatedly, such as the CTF configuration when running a
+command on every challenge, is only parsed once. Parse results are additionally
+persisted in ``.challtools/cache/yaml`` as marshal data keyed by the contents of
+the file, so that separate processes, including those started by ``allchalls
+--jobs``, don't parse unchanged files again either, and don't even import
+PyYAML. Callers always receive their own copy of a document and may modify it.
+"""
+
+from __future__ import annotations
+
+import copy
+import hashlib
+import marshal
+import os
+from functools import cache
+from pathlib import Path
+from typing import Any
+
+from challtools.cache import cache_enabled, evict, get_cache_dir, write_bytes
+
+# bump this when the format of parse cache entries changes
+PARSE_CACHE_FORMAT = 1
+# the maximum amount of entries kept in a parse cache directory
+MAX_PARSE_ENTRIES = 4096
+
+# resolved path -> (mtime_ns, size, marshal data or the document itself, if it is marshal data)
+_memo: dict[str, tuple[int, int, Any, bool]] = {}
+
+
+@cache
+def get_loader() -> type:
+    """The fastest available safe YAML loader class."""
+    import yaml
+
+    return getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+def parse_yaml(data: str | bytes, path: Path | None = None) -> Any:
+    """Parses a YAML document like ``yaml.safe_load``.
+
+    Args:
+        data: The document.
+        path: The file the document was read from. If given, the parse result is cached on disk in the cache directory of the file.
+
+    Returns:
+        The parsed document.
+
+    Raises:
+        yaml.YAMLError: If the document is not valid YAML.
+    """
+    if path is None or not cache_enabled():
+        return _parse(data)
+
+    encoded = data.encode() if isinstance(data, str) else data
+    key = hashlib.sha256(f"{PARSE_CACHE_FORMAT}|{marshal.version}|".encode())
+    key.update(encoded)
+    entry_path = get_cache_dir(path) / "yaml" / (key.hexdigest() + ".marshal")
+
+    try:
+        document = marshal.loads(entry_path.read_bytes())
+        os.utime(entry_path)  # mark as recently used for eviction
+        return document
+    except (OSError, EOFError, ValueError, TypeError):
+        pass
+
+    document = _parse(data)
+    try:
+        dumped = marshal.dumps(document)
+    except ValueError:
+        # documents containing values marshal can't represent, such as YAML
+        # timestamps, are simply not cached
+        return document
+
+    if write_bytes(entry_path, dumped):
+        try:
+            evict(entry_path.parent, MAX_PARSE_ENTRIES, suffix=".marshal")
+        except OSError:
+            pass
+    return document
+
+
+def load_yaml(path: Path) -> Any:
+    """Loads a YAML file, reusing the result of a previous load or parse of the same file if it is unchanged.
+
+    Args:
+        path: The file to load.
+
+    Returns:
+        The parsed document, which the caller is free to modify.
+
+    Raises:
+        OSError: If the file can not be read.
+        yaml.YAMLError: If the file is not valid YAML.
+    """
+    key = os.path.abspath(path)
+    stat = os.stat(key)
+
+    memo = _memo.get(key)
+    if memo and memo[:2] == (stat.st_mtime_ns, stat.st_size):
+        _, _, value, is_marshal = memo
+        return marshal.loads(value) if is_marshal else copy.deepcopy(value)
+
+    document = parse_yaml(Path(key).read_bytes(), Path(key))
+    try:
+        _memo[key] = (stat.st_mtime_ns, stat.st_size, marshal.dumps(document), True)
+    except ValueError:
+        _memo[key] = (stat.st_mtime_ns, stat.st_size, copy.deepcopy(document), False)
+    return document
+
+
+def _parse(data: str | bytes) -> Any:
+    import yaml
+
+    return yaml.load(data, Loader=get_loader())
@@ -0,0 +1,170 @@
+"""Following the logs of several containers at once.
+
+Every container's log stream is read by its own thread, split into lines and
+put on a shared bounded queue, which the calling thread prints from. A full
+queue blocks the reading threads, so a container that logs faster than the
+terminal can print never makes challtools buffer more than a fixed amount of
+lines.
+"""
+
+from __future__ import annotations
+
+import queue
+import re
+import threading
+from datetime import datetime, timezone
+from typing import Any, Callable, NamedTuple
+
+from challtools.constants import *
+
+# the maximum amount of lines waiting to be printed
+DEFAULT_MAX_QUEUED_LINES = 1000
+# partial lines longer than this are printed without waiting for the rest
+MAX_LINE_LENGTH = 64 * 1024
+PREFIX_COLORS = [MEDIUM, SUCCESS, HIGH, LOW, "\033[1;35m", CRITICAL]
+# the RFC 3339 timestamp and space docker puts before every log line
+TIMESTAMP_PREFIX = re.compile(rb"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?Z) ")
+
+
+class LogLine(NamedTuple):
+    """A line logged by a container, or the end of its log if line is None."""
+
+    name: str
+    timestamp: str
+    line: str | None
+
+
+def format_timestamp(timestamp: bytes) -> str:
+    """Formats an RFC 3339 timestamp as added by docker to log lines as local time with millisecond precision."""
+    try:
+        text = timestamp.decode()
+        parsed = datetime.strptime(text[:19], "%Y-%m-%dT%H:%M:%S").replace(
+            tzinfo=timezone.utc
+        )
+        fraction = text[20:23] if text[19:20] == "." else "000"
+        return parsed.astimezone().strftime("%H:%M:%S.") + fraction.ljust(3, "0")
+    except ValueError:
+        return datetime.now().strftime("%H:%M:%S.%f")[:12]
+
+
+def split_log_lines(chunks):
+    """Splits the chunks of a docker log stream into lines, which the chunks do not necessarily align with.
+
+    Args:
+        chunks: An iterable of bytes, as returned by ``container.logs(stream=True)``.
+
+    Yields:
+        Each line as bytes, without the trailing newline. Overly long lines are split.
+    """
+    buffer = b""
+    for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        yield from lines
+        while len(buffer) > MAX_LINE_LENGTH:
+            yield buffer[:MAX_LINE_LENGTH]
+            buffer = buffer[MAX_LINE_LENGTH:]
+    if buffer:
+        yield buffer
+
+
+class LogMultiplexer:
+    """Follows the logs of several containers concurrently and prints them merged, with a coloured name prefix and a timestamp on every line.
+
+    Args:
+        containers: The containers to follow, by the name to display for them.
+        max_queued_lines: The maximum amount of lines read but not yet printed.
+        output: The function used to print lines, with the same signature as print.
+    """
+
+    def __init__(
+        self,
+        containers: dict[str, Any],
+        max_queued_lines: int = DEFAULT_MAX_QUEUED_LINES,
+        output: Callable[..., Any] = print,
+    ):
+        self.containers = containers
+        self.queue: queue.Queue[LogLine] = queue.Queue(maxsize=max_queued_lines)
+        self.output = output
+        self.stopped = threading.Event()
+        self.streams: list[Any] = []
+        self.threads: list[threading.Thread] = []
+        self.width = max([len(name) for name in containers], default=0)
+        self.prefixes = {
+            name: PREFIX_COLORS[i % len(PREFIX_COLORS)] + name.ljust(self.width) + CLEAR
+            for i, name in enumerate(containers)
+        }
+
+    def _put(self, item: LogLine) -> bool:
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _follow(self, name: str, container: Any):
+        try:
+            stream = container.logs(
+                stream=True, follow=True, stdout=True, stderr=True, timestamps=True
+            )
+            self.streams.append(stream)
+            for line in split_log_lines(stream):
+                match = TIMESTAMP_PREFIX.match(line)
+                if match:
+                    timestamp, text = match[1], line[match.end() :]
+                else:
+                    # the continuation of an overly long line
+                    timestamp, text = b"", line
+                if not self._put(
+                    LogLine(
+                        name,
+                        format_timestamp(timestamp),
+                        text.decode(errors="replace").rstrip("\r"),
+                    )
+                ):
+                    return
+        except Exception as e:
+            if not self.stopped.is_set():
+                self._put(
+                    LogLine(name, format_timestamp(b""), f"log stream failed: {e}")
+                )
+        self._put(LogLine(name, format_timestamp(b""), None))
+
+    def run(self) -> str | None:
+        """Prints the logs of all containers until one of them exits.
+
+        Returns:
+            The name of the first container whose log ended, meaning that it exited, or None if there are no containers.
+        """
+        for name, container in self.containers.items():
+            thread = threading.Thread(
+                target=self._follow, args=(name, container), daemon=True
+            )
+            thread.start()
+            self.threads.append(thread)
+
+        if not self.threads:
+            return None
+
+        while True:
+            try:
+                # a timeout keeps the wait interruptible by ctrl-c on windows
+                item = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item.line is None:
+                return item.name
+            self.output(f"{self.prefixes[item.name]} {item.timestamp} | {item.line}")
+
+    def stop(self):
+        """Stops following the logs. The containers themselves are not stopped."""
+        self.stopped.set()
+        for stream in self.streams:
+            try:
+                stream.close()
+            except Exception:
+                pass
+        for thread in self.threads:
+            thread.join(timeout=1)
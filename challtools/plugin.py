@@ -38,6 +38,9 @@ def lazy_import(name: str):
         The imported module.
     """
 
+    if name in sys.modules:
+        return sys.modules[name]
+
     spec = importlib.util.find_spec(name)
     if spec is None:
         raise ImportError(f"Module '{name}' not found.")
@@ -61,11 +64,16 @@ def lazy_runner(name: str, func_name: str = "run"):
             Defaults to "run".
 
     Returns:
-        A function that calls the run function of the imported module.
+        A function that calls the run function of the imported module. The
+        module and function names are available as its ``module_name`` and
+        ``func_name`` attributes, which allows completers created with this
+        function to be cached for shell completion.
     """
 
     def run(*args, **kwargs):
         module = lazy_import(name)
         return getattr(module, func_name)(*args, **kwargs)
 
+    run.module_name = name
+    run.func_name = func_name
     return run
@@ -0,0 +1,302 @@
+"""Allocation of host ports for challenge services.
+
+Ports handed out to started containers are recorded as leases in a file shared
+by every challtools process on the host, so that challenges started at the same
+time never receive the same port. A lease belongs either to a process, until
+the ports are bound by a container, or to a container. Leases of processes that
+have exited and of containers that no longer run are reclaimed automatically.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import socket
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Iterable
+
+from challtools.exceptions import CriticalException
+
+DEFAULT_START_PORT = 50000
+DEFAULT_END_PORT = 60000
+# overrides the location of the lease file
+LEASE_PATH_ENV = "CHALLTOOLS_PORT_LEASES"
+
+
+def get_lease_path() -> Path:
+    """Gets the path of the host wide port lease file."""
+    if os.environ.get(LEASE_PATH_ENV):
+        return Path(os.environ[LEASE_PATH_ENV])
+    return Path(tempfile.gettempdir()) / "challtools" / "port-leases.json"
+
+
+def stable_port(key: str, start_port: int, end_port: int) -> int:
+    """Derives a port in a range from a key, so that the same key always gets the same port regardless of what other ports are handed out.
+
+    Args:
+        key: A string identifying what the port is for.
+        start_port: The first port of the range.
+        end_port: The last port of the range.
+    """
+    digest = hashlib.sha256(key.encode()).digest()
+    return start_port + int.from_bytes(digest[:8], "big") % (end_port - start_port + 1)
+
+
+def is_port_free(port: int, host: str = "") -> bool:
+    """Checks if a TCP port can be bound on the host, which docker requires to publish it.
+
+    Args:
+        port: The port to check.
+        host: The address to bind to. Defaults to all interfaces, which docker publishes on.
+    """
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        try:
+            sock.bind((host, port))
+        except OSError:
+            return False
+    return True
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if sys.platform == "win32":
+        # there is no cheap way to check this on windows, leases of processes
+        # are short lived though since they are transferred to containers
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _container_alive(client: Any, container_id: str) -> bool:
+    import docker
+
+    try:
+        container = client.containers.get(container_id)
+    except docker.errors.NotFound:
+        return False
+    except docker.errors.DockerException:
+        return True
+    return container.status not in ["exited", "dead"]
+
+
+class PortAllocator:
+    """Hands out ports from a range, skipping ports that are reserved or, optionally, in use on this host.
+
+    Args:
+        start_port: The first port of the range.
+        end_port: The last port of the range.
+        reserved: Ports that must not be handed out, such as explicitly configured external ports.
+        probe: If ports should be checked for availability on this host before being handed out.
+    """
+
+    def __init__(
+        self,
+        start_port: int = DEFAULT_START_PORT,
+        end_port: int = DEFAULT_END_PORT,
+        reserved: Iterable[int] = (),
+        probe: bool = True,
+    ):
+        self.start_port = start_port
+        self.next_port = start_port
+        self.end_port = end_port
+        self.reserved = set(reserved)
+        self.probe = probe
+
+    def reserve(self, port: int):
+        """Marks a port as taken."""
+        self.reserved.add(port)
+
+    def allocate(self) -> int:
+        """Hands out the lowest available port in the range.
+
+        Raises:
+            CriticalException: If there are no available ports left in the range.
+        """
+        while self.next_port <= self.end_port:
+            port = self.next_port
+            self.next_port += 1
+            if port in self.reserved:
+                continue
+            if self.probe and not is_port_free(port):
+                continue
+            self.reserved.add(port)
+            return port
+
+        raise CriticalException(
+            f"There are no free ports left in the range up to {self.end_port}"
+        )
+
+    def allocate_stable(self, key: str) -> int:
+        """Hands out the port derived from a key by stable_port or, if it is not available, the next available port after it, wrapping around to the start of the range.
+
+        Raises:
+            CriticalException: If there are no available ports left in the range.
+        """
+        size = self.end_port - self.start_port + 1
+        offset = stable_port(key, self.start_port, self.end_port) - self.start_port
+        for i in range(size):
+            port = self.start_port + (offset + i) % size
+            if port in self.reserved:
+                continue
+            if self.probe and not is_port_free(port):
+                continue
+            self.reserved.add(port)
+            return port
+
+        raise CriticalException(
+            f"There are no free ports left in the range {self.start_port}-{self.end_port}"
+        )
+
+
+class _FileLock:
+    """An exclusive lock on a file, held while the lease file is read and written."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.file = None
+
+    def __enter__(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.file = open(self.path, "a+b")
+        if sys.platform == "win32":
+            import msvcrt
+
+            self.file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after 10 seconds, keep waiting
+                    continue
+        else:
+            import fcntl
+
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc_info):
+        if sys.platform == "win32":
+            import msvcrt
+
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+        self.file.close()
+
+
+class PortLeases:
+    """The port leases of all challtools processes on this host. Use as a context manager, which holds a lock on the lease file, loads the leases, reclaims dead ones and saves any changes on exit.
+
+    Args:
+        client: A docker client used to check if the containers holding leases still run. Container leases are never reclaimed without one.
+        path: The lease file, defaults to get_lease_path().
+    """
+
+    def __init__(self, client: Any = None, path: Path | None = None):
+        self.client = client
+        self.path = path or get_lease_path()
+        self.lock = _FileLock(self.path.with_name(self.path.name + ".lock"))
+        self.leases: dict[str, dict[str, Any]] = {}
+
+    def __enter__(self) -> PortLeases:
+        self.lock.__enter__()
+        try:
+            self.leases = json.loads(self.path.read_bytes())["leases"]
+        except (OSError, ValueError, KeyError, TypeError):
+            self.leases = {}
+        self.reclaim()
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            data = json.dumps({"leases": self.leases}).encode()
+            fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_name, self.path)
+        finally:
+            self.lock.__exit__(*exc_info)
+
+    def _alive(self, lease: dict[str, Any]) -> bool:
+        if "container" in lease:
+            return self.client is None or _container_alive(
+                self.client, lease["container"]
+            )
+        return _pid_alive(lease.get("pid", 0))
+
+    def reclaim(self):
+        """Removes the leases of processes that have exited and containers that no longer run."""
+        self.leases = {
+            port: lease for port, lease in self.leases.items() if self._alive(lease)
+        }
+
+    def ports(self) -> set[int]:
+        """All currently leased ports."""
+        return {int(port) for port in self.leases}
+
+    def lease(self, port: int, container_id: str | None = None):
+        """Leases a port to the current process, or to a container if given."""
+        lease: dict[str, Any] = {"pid": os.getpid(), "time": time.time()}
+        if container_id:
+            lease["container"] = container_id
+        self.leases[str(port)] = lease
+
+    def release(self, port: int):
+        """Removes the lease of a port."""
+        self.leases.pop(str(port), None)
+
+
+def allocate_ports(
+    count: int,
+    reserved: Iterable[int] = (),
+    client: Any = None,
+    start_port: int = DEFAULT_START_PORT,
+) -> list[int]:
+    """Allocates free host ports and leases them to the current process. Transfer the leases to the containers publishing the ports with lease_ports once they are created.
+
+    Args:
+        count: The amount of ports to allocate.
+        reserved: Ports that must not be allocated, such as explicitly configured external ports.
+        client: A docker client used to reclaim leases of containers that no longer run.
+        start_port: The lowest port to allocate.
+
+    Returns:
+        The allocated ports.
+    """
+    if not count:
+        return []
+
+    with PortLeases(client) as leases:
+        allocator = PortAllocator(
+            start_port=start_port, reserved={*reserved, *leases.ports()}
+        )
+        ports = [allocator.allocate() for _ in range(count)]
+        for port in ports:
+            leases.lease(port)
+
+    return ports
+
+
+def lease_ports(ports: Iterable[int], container_id: str, client: Any = None):
+    """Transfers the leases of ports to the container publishing them, so that they are kept until the container stops."""
+    ports = list(ports)
+    if not ports:
+        return
+
+    with PortLeases(client) as leases:
+        for port in ports:
+            leases.lease(port, container_id)
@@ -0,0 +1,235 @@
+"""Decoding and displaying the JSON progress streams of the docker daemon.
+
+Building, pulling and pushing images make the daemon stream JSON objects, one
+per line, but the chunks they arrive in are not aligned with the lines: an object
+can be split across chunks and a chunk can contain many objects. The decoder
+carries incomplete data over to the next chunk and decodes objects in place with
+``json.JSONDecoder.raw_decode``.
+
+Pulls and pushes report the progress of every layer separately, often hundreds
+of times per second. These events are aggregated into the progress of the whole
+image, which is printed as a single line whenever a layer finishes and at most
+once per interval in between.
+"""
+
+from __future__ import annotations
+
+import codecs
+import json
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable, Iterator
+
+# the minimum time between two progress lines that are not caused by a layer finishing
+DEFAULT_INTERVAL = 2.0
+# statuses of events about a single layer
+LAYER_STATUSES = {
+    "Pulling fs layer",
+    "Waiting",
+    "Downloading",
+    "Verifying Checksum",
+    "Download complete",
+    "Extracting",
+    "Pull complete",
+    "Already exists",
+    "Preparing",
+    "Pushing",
+    "Pushed",
+    "Layer already exists",
+}
+LAYER_STATUS_PREFIXES = ("Mounted from", "Retrying")
+# statuses after which a layer is complete
+DONE_STATUSES = {"Pull complete", "Already exists", "Pushed", "Layer already exists"}
+# statuses whose progress counts bytes transferred, as opposed to extracted
+TRANSFER_STATUSES = {"Downloading", "Pushing"}
+
+_WHITESPACE = re.compile(r"\s*")
+
+
+def decode_json_stream(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """Decodes a stream of concatenated JSON values, which may be split across chunks at any point, including inside multibyte characters.
+
+    Args:
+        chunks: An iterable of bytes, such as a docker API stream.
+
+    Yields:
+        Every decoded value, as soon as it is complete.
+
+    Raises:
+        json.JSONDecodeError: If a complete line is not valid JSON, or the stream ends with an incomplete value.
+    """
+    decoder = json.JSONDecoder()
+    text_decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    buffer = ""
+
+    for chunk in chunks:
+        buffer += text_decoder.decode(chunk)
+        position = _WHITESPACE.match(buffer).end()
+        while position < len(buffer):
+            try:
+                value, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if "\n" in buffer[position:]:
+                    # the value does not end on its line, more data can not fix it
+                    raise
+                break
+            yield value
+            position = _WHITESPACE.match(buffer, position).end()
+        buffer = buffer[position:]
+
+    buffer += text_decoder.decode(b"", final=True)
+    if buffer.strip():
+        # raises a JSONDecodeError describing the truncated value
+        decoder.decode(buffer)
+
+
+@contextmanager
+def closing_stream(stream: Iterator[Any]) -> Iterator[Iterator[Any]]:
+    """Closes a stream returned by the docker SDK when leaving the context, together with the HTTP response it reads from. The SDK streams are generators that don't close their response themselves, so the daemon would keep building or pushing after the stream is abandoned. Closing the response disconnects from the daemon, which aborts the operation.
+
+    Args:
+        stream: A stream as returned by the docker SDK with ``stream=True``.
+
+    Yields:
+        The stream.
+    """
+    # the SDK generator reads from a local named response
+    frame = getattr(stream, "gi_frame", None)
+    response = frame.f_locals.get("response") if frame is not None else None
+    try:
+        yield stream
+    finally:
+        close = getattr(stream, "close", None)
+        if close is not None:
+            close()
+        if response is not None:
+            response.close()
+
+
+def is_layer_event(event: dict[str, Any]) -> bool:
+    """Checks if a progress event is about a single layer rather than a whole image."""
+    status = event.get("status", "")
+    return bool(event.get("id")) and (
+        status in LAYER_STATUSES or status.startswith(LAYER_STATUS_PREFIXES)
+    )
+
+
+class LayerProgress:
+    """Aggregates the per layer events of a pull or push into the progress of the whole image.
+
+    Args:
+        name: The name displayed in the progress line.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.layers: dict[str, dict[str, Any]] = {}
+
+    def update(self, event: dict[str, Any]) -> bool:
+        """Applies a layer event. Events that are not about a layer are ignored.
+
+        Returns:
+            If a layer finished with this event.
+        """
+        if not is_layer_event(event):
+            return False
+
+        status = event["status"]
+        layer = self.layers.setdefault(
+            event["id"], {"done": False, "current": 0, "total": 0}
+        )
+
+        if status in DONE_STATUSES or status.startswith("Mounted from"):
+            was_done = layer["done"]
+            layer["done"] = True
+            layer["current"] = layer["total"]
+            return not was_done
+
+        if status == "Download complete":
+            layer["current"] = layer["total"]
+        elif status in TRANSFER_STATUSES:
+            detail = event.get("progressDetail") or {}
+            if "current" in detail:
+                layer["current"] = detail["current"]
+                layer["total"] = detail.get("total") or layer["total"]
+        return False
+
+    @property
+    def transferred(self) -> int:
+        """The amount of bytes transferred so far."""
+        return sum(layer["current"] for layer in self.layers.values())
+
+    def line(self, rate: float | None = None) -> str:
+        """Formats the progress as a single line.
+
+        Args:
+            rate: The current transfer rate in bytes per second, included if given.
+        """
+        done = sum(1 for layer in self.layers.values() if layer["done"])
+        total = sum(layer["total"] for layer in self.layers.values())
+        line = f"{self.name}: {done}/{len(self.layers)} layers"
+        if total:
+            line += f", {self.transferred / 1e6:.1f}/{total / 1e6:.1f} MB"
+        if rate is not None:
+            line += f", {rate / 1e6:.1f} MB/s"
+        return line
+
+
+class ProgressPrinter:
+    """Prints the progress of a LayerProgress, rate limited. A line is printed whenever a layer finishes and otherwise at most once per interval, including the transfer rate since the previous line.
+
+    Args:
+        progress: The progress to print.
+        output: The function used to print progress, with the same signature as print.
+        interval: The minimum time between two lines not caused by a finished layer, in seconds.
+        clock: The function returning the current time, in seconds.
+    """
+
+    def __init__(
+        self,
+        progress: LayerProgress,
+        output: Callable[..., Any] = print,
+        interval: float = DEFAULT_INTERVAL,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.progress = progress
+        self.output = output
+        self.interval = interval
+        self.clock = clock
+        self.last_time = clock()
+        self.last_transferred = 0
+        self.pending = False
+
+    def update(self, event: dict[str, Any]) -> bool:
+        """Applies an event, printing the progress if it is due.
+
+        Returns:
+            If the event was a layer event, and therefore should not be displayed on its own.
+        """
+        if not is_layer_event(event):
+            return False
+
+        finished = self.progress.update(event)
+        self.pending = True
+        now = self.clock()
+        if finished:
+            self._print(now)
+        elif now - self.last_time >= self.interval:
+            transferred = self.progress.transferred
+            self._print(
+                now,
+                rate=(transferred - self.last_transferred) / (now - self.last_time),
+            )
+        return True
+
+    def finish(self):
+        """Prints the final progress, if it changed since it was last printed."""
+        if self.pending:
+            self._print(self.clock())
+
+    def _print(self, now: float, rate: float | None = None):
+        self.output(self.progress.line(rate=rate))
+        self.last_time = now
+        self.last_transferred = self.progress.transferred
+        self.pending = False
@@ -0,0 +1,277 @@
+"""Waiting for started challenge services to become ready.
+
+A container with a Docker ``HEALTHCHECK`` is ready once Docker reports it as
+healthy. Otherwise every published ``tcp`` and ``website`` service of the
+container is probed, by connecting to it or by requesting ``/`` respectively.
+Probes are retried with exponential backoff until all services are ready or an
+overall deadline has passed.
+"""
+
+from __future__ import annotations
+
+import http.client
+import socket
+import time
+from typing import Any, NamedTuple
+
+from challtools.types import JsonDict
+
+# the default amount of seconds to wait for all services to become ready
+DEFAULT_DEADLINE = 30.0
+# the delay before the first retry of a probe, doubled after every round
+INITIAL_DELAY = 0.05
+MAX_DELAY = 1.0
+# the longest a single probe may take
+PROBE_TIMEOUT = 2.0
+
+READY = "ready"
+WAITING = "waiting"
+FAILED = "failed"
+
+
+class ReadinessResult(NamedTuple):
+    """The outcome of waiting for a single service or container."""
+
+    name: str
+    method: str  # "healthcheck", "tcp" or "http"
+    ready: bool
+    elapsed: float  # seconds until the service was ready, or until waiting stopped
+    reason: str | None = None
+
+
+def probe_tcp(host: str, port: int, timeout: float = PROBE_TIMEOUT) -> str:
+    """Checks if a TCP service accepts connections.
+
+    Published ports are often forwarded by a proxy that accepts connections
+    before the service inside the container listens, and closes them right
+    away if it does not. A connection is therefore only considered ready if it
+    stays open for a short moment or the service sends data.
+
+    Returns:
+        READY or WAITING.
+    """
+    try:
+        with socket.create_connection((host, port), timeout=timeout) as sock:
+            sock.settimeout(min(timeout, 0.1))
+            try:
+                data = sock.recv(1, socket.MSG_PEEK)
+            except socket.timeout:
+                return READY
+            return READY if data else WAITING
+    except OSError:
+        return WAITING
+
+
+def probe_http(host: str, port: int, timeout: float = PROBE_TIMEOUT) -> str:
+    """Checks if a website responds to a request for ``/``. Any response that is not a server error counts as ready, since the index page may not exist.
+
+    Returns:
+        READY or WAITING.
+    """
+    connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        connection.request("GET", "/")
+        status = connection.getresponse().status
+    except (OSError, http.client.HTTPException):
+        return WAITING
+    finally:
+        connection.close()
+
+    return READY if status < 500 else WAITING
+
+
+def has_healthcheck(container: Any) -> bool:
+    """Checks if a docker container has a healthcheck configured."""
+    healthcheck = (container.attrs.get("Config") or {}).get("Healthcheck") or {}
+    test = healthcheck.get("Test") or []
+    return bool(test) and test != ["NONE"]
+
+
+def probe_health(container: Any) -> str:
+    """Checks the health status Docker reports for a container.
+
+    Returns:
+        READY, WAITING or FAILED. FAILED is returned if the container is unhealthy or has stopped.
+    """
+    container.reload()
+    state = container.attrs.get("State") or {}
+    if state.get("Status") in ["exited", "dead"]:
+        return FAILED
+
+    status = (state.get("Health") or {}).get("Status")
+    if status == "healthy":
+        return READY
+    if status == "unhealthy":
+        return FAILED
+    return WAITING
+
+
+def _container_exited(container: Any) -> bool:
+    try:
+        container.reload()
+    except Exception:
+        return False
+    return (container.attrs.get("State") or {}).get("Status") in ["exited", "dead"]
+
+
+class _Target:
+    def __init__(self, name, method, probe, container=None):
+        self.name = name
+        self.method = method
+        self.probe = probe
+        self.container = container
+
+
+def get_container_address(container: Any, network: str) -> str | None:
+    """Gets the IP address of a container on a docker network, which the host can connect to directly on Linux."""
+    container.reload()
+    networks = (container.attrs.get("NetworkSettings") or {}).get("Networks") or {}
+    return (networks.get(network) or {}).get("IPAddress") or None
+
+
+def get_targets(
+    containers: list[Any],
+    config: JsonDict,
+    host: str = "127.0.0.1",
+    network: str | None = None,
+) -> list[_Target]:
+    """Determines what to wait for in a started challenge.
+
+    Args:
+        containers: The started containers, in the order of the containers in the deployment config, as returned by start_chall.
+        config: The normalized challenge config. The external ports of services must have been assigned, which start_chall does.
+        host: The host the services are published on.
+        network: The network the challenge was started on in isolation, if any. Services are then probed on the address of their container on that network and their internal port.
+
+    Returns:
+        The targets to wait for.
+    """
+    targets = []
+
+    container_configs = config["deployment"]["containers"].items()
+    for container, (container_name, container_config) in zip(
+        containers, container_configs
+    ):
+        if has_healthcheck(container):
+            targets.append(
+                _Target(
+                    container_name,
+                    "healthcheck",
+                    lambda container=container: probe_health(container),
+                )
+            )
+            continue
+
+        service_host = host
+        if network:
+            service_host = get_container_address(container, network)
+            if service_host is None:
+                continue
+
+        for service in container_config.get("services", []):
+            port = service["internal_port"] if network else service.get("external_port")
+            if port is None:
+                continue
+            probe, method = (
+                (probe_http, "http")
+                if service["type"] == "website"
+                else (probe_tcp, "tcp")
+            )
+            targets.append(
+                _Target(
+                    f"{container_name}:{service['internal_port']}",
+                    method,
+                    lambda probe=probe, host=service_host, port=port: probe(
+                        host, int(port)
+                    ),
+                    container,
+                )
+            )
+
+    return targets
+
+
+def wait_for_targets(
+    targets: list[_Target], deadline: float = DEFAULT_DEADLINE
+) -> list[ReadinessResult]:
+    """Probes targets with exponential backoff until all of them are ready, failed or the deadline has passed.
+
+    Args:
+        targets: The targets to wait for, as returned by get_targets.
+        deadline: The maximum amount of seconds to wait in total.
+
+    Returns:
+        The result for every target, in the same order.
+    """
+    start = time.monotonic()
+    results: dict[int, ReadinessResult] = {}
+    delay = INITIAL_DELAY
+
+    while True:
+        for i, target in enumerate(targets):
+            if i in results:
+                continue
+
+            status = target.probe()
+            if (
+                status == WAITING
+                and target.container is not None
+                and _container_exited(target.container)
+            ):
+                status = FAILED
+
+            if status == READY:
+                results[i] = ReadinessResult(
+                    target.name, target.method, True, time.monotonic() - start
+                )
+            elif status == FAILED:
+                results[i] = ReadinessResult(
+                    target.name,
+                    target.method,
+                    False,
+                    time.monotonic() - start,
+                    "unhealthy" if target.method == "healthcheck" else "exited",
+                )
+
+        if len(results) == len(targets):
+            break
+
+        remaining = deadline - (time.monotonic() - start)
+        if remaining <= 0:
+            for i, target in enumerate(targets):
+                if i not in results:
+                    results[i] = ReadinessResult(
+                        target.name,
+                        target.method,
+                        False,
+                        time.monotonic() - start,
+                        "timeout",
+                    )
+            break
+
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, MAX_DELAY)
+
+    return [results[i] for i in range(len(targets))]
+
+
+def wait_until_ready(
+    containers: list[Any],
+    config: JsonDict,
+    deadline: float = DEFAULT_DEADLINE,
+    host: str = "127.0.0.1",
+    network: str | None = None,
+) -> list[ReadinessResult]:
+    """Waits until all services of a started challenge are ready.
+
+    Args:
+        containers: The started containers, as returned by start_chall.
+        config: The normalized challenge config, as modified by start_chall.
+        deadline: The maximum amount of seconds to wait in total.
+        host: The host the services are published on.
+        network: The network the challenge was started on in isolation, if any.
+
+    Returns:
+        The result for every healthchecked container and probed service.
+    """
+    return wait_for_targets(get_targets(containers, config, host, network), deadline)
@@ -0,0 +1,216 @@
+"""Pushing challenge images to a container registry.
+
+Before pushing, the digest of the manifest the registry has for an image is
+compared with the digests docker recorded for the local image the last time it
+was pushed or pulled. Images the registry already has are skipped without
+uploading anything, and the rest are pushed concurrently. The per layer progress
+events of a push are aggregated into a single progress line per image, see
+challtools.progress.
+"""
+
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, NamedTuple
+
+from challtools.constants import *
+from challtools.exceptions import CriticalException
+from challtools.progress import (
+    LayerProgress,
+    ProgressPrinter,
+    closing_stream,
+    decode_json_stream,
+)
+
+DEFAULT_PUSH_JOBS = 4
+PUSHED = "pushed"
+UNCHANGED = "unchanged"
+
+
+class PushResult(NamedTuple):
+    """The outcome of pushing one image."""
+
+    repo: str
+    status: str  # PUSHED or UNCHANGED
+    digest: str | None
+
+
+def split_repo(repo: str) -> tuple[str, str]:
+    """Splits an image reference into its repository and tag, defaulting to the latest tag. A colon belonging to a registry port is not mistaken for a tag."""
+    name, _, tag = repo.rpartition(":")
+    if not name or "/" in tag:
+        return repo, "latest"
+    return name, tag
+
+
+def get_local_digests(image: Any, repo: str) -> set[str]:
+    """Gets the manifest digests a local image is known to have in a repository.
+
+    Args:
+        image: The local docker.models.images.Image.
+        repo: The repository, with or without a tag.
+
+    Returns:
+        The digests in the ``sha256:...`` form.
+    """
+    name, _ = split_repo(repo)
+    digests = set()
+    for repo_digest in image.attrs.get("RepoDigests") or []:
+        digest_name, _, digest = repo_digest.partition("@")
+        if digest_name == name:
+            digests.add(digest)
+    return digests
+
+
+def get_remote_digest(client: Any, repo: str) -> str | None:
+    """Gets the digest of the manifest a registry has for an image.
+
+    Args:
+        client: The docker client, logged in to the registry.
+        repo: The image reference in the registry.
+
+    Returns:
+        The digest, or None if the registry does not have the image or can not be asked.
+    """
+    import docker
+
+    try:
+        return client.images.get_registry_data(repo).id
+    except docker.errors.APIError:
+        # the daemon reports missing images and unsupported registries alike
+        return None
+
+
+def is_up_to_date(client: Any, image: Any, repo: str) -> bool:
+    """Checks if the registry already has exactly the local image."""
+    local_digests = get_local_digests(image, repo)
+    if not local_digests:
+        # the image was built since it was last pushed
+        return False
+    return get_remote_digest(client, repo) in local_digests
+
+
+class PushProgress(LayerProgress):
+    """Aggregates the per layer events of a push into the state of the whole image, and keeps the digest the registry reports for the pushed manifest.
+
+    Args:
+        repo: The image being pushed, used in the progress line.
+    """
+
+    def __init__(self, repo: str):
+        super().__init__(repo)
+        self.repo = repo
+        self.digest: str | None = None
+
+    def update(self, event: dict[str, Any]) -> bool:
+        """Applies a decoded push event.
+
+        Returns:
+            If a layer finished with this event.
+
+        Raises:
+            CriticalException: If the event reports an error.
+        """
+        if "error" in event:
+            raise CriticalException(
+                f"{CRITICAL}Failed pushing the container to the repository:{CLEAR}\n\033[31m{event['error']}"
+            )
+
+        if isinstance(event.get("aux"), dict):
+            self.digest = event["aux"].get("Digest", self.digest)
+            return False
+
+        return super().update(event)
+
+
+def push_image(
+    client: Any, repo: str, output: Callable[..., Any] = print, cancel_event=None
+) -> str | None:
+    """Pushes a tagged image, printing its progress as a single line whenever a layer finishes and periodically in between.
+
+    Args:
+        client: The docker client, logged in to the registry.
+        repo: The image reference to push.
+        output: The function used to print progress, with the same signature as print.
+        cancel_event: If set while pushing, the push is aborted.
+
+    Returns:
+        The digest of the pushed manifest, if the registry reported it.
+
+    Raises:
+        CriticalException: If the push fails or is cancelled.
+    """
+    progress = PushProgress(repo)
+    printer = ProgressPrinter(progress, output=output)
+    stream = client.images.push(repo, stream=True)
+
+    with closing_stream(stream):
+        for event in decode_json_stream(stream):
+            if cancel_event is not None and cancel_event.is_set():
+                raise CriticalException(f"Push of {repo} cancelled")
+            if not printer.update(event):
+                # errors and the pushed digest
+                progress.update(event)
+    printer.finish()
+
+    return progress.digest
+
+
+def push_images(
+    client: Any,
+    images: list[tuple[str, str]],
+    jobs: int = DEFAULT_PUSH_JOBS,
+    force: bool = False,
+    output: Callable[..., Any] = print,
+) -> list[PushResult]:
+    """Tags local images for a registry and pushes the ones the registry does not already have, up to ``jobs`` at the same time. As soon as one push fails the remaining ones are cancelled.
+
+    Args:
+        client: The docker client, logged in to the registry.
+        images: (local tag, registry reference) tuples of the images to push.
+        jobs: The maximum amount of images to push at the same time.
+        force: If images should be pushed even if the registry already has them.
+        output: The function used to print progress, with the same signature as print.
+
+    Returns:
+        The result of every image, in the order they were given.
+
+    Raises:
+        CriticalException: If any push fails.
+    """
+    results: dict[str, PushResult] = {}
+    pending = []
+    for tag, repo in images:
+        image = client.images.get(tag)
+        image.tag(repo)
+        if not force and is_up_to_date(client, image, repo):
+            output(
+                f"{BOLD}Container {tag} is unchanged in the registry, skipping{CLEAR}"
+            )
+            results[repo] = PushResult(repo, UNCHANGED, None)
+        else:
+            pending.append((tag, repo))
+
+    cancel_event = threading.Event()
+
+    def push(tag, repo):
+        output(f"{BOLD}Pushing container {tag}...{CLEAR}")
+        digest = push_image(client, repo, output=output, cancel_event=cancel_event)
+        output(f"{BOLD}Pushed container {tag}{CLEAR}")
+        return PushResult(repo, PUSHED, digest)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+            futures = [executor.submit(push, *image) for image in pending]
+            try:
+                for future in as_completed(futures):
+                    result = future.result()
+                    results[result.repo] = result
+            except BaseException:
+                cancel_event.set()
+                for future in futures:
+                    future.cancel()
+                raise
+
+    return [results[repo] for _, repo in images]
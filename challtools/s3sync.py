@@ -0,0 +1,207 @@
+"""Differential synchronization of downloadable files to S3 compatible storage.
+
+The objects under a prefix are listed once and compared against the local
+files. Files are identified by a sha256 digest stored as object metadata when
+uploading, falling back to the ETag of objects uploaded without it. Only new or
+changed files are uploaded, concurrently and using multipart uploads for large
+files, and only objects without a local counterpart are deleted, in a single
+batch request.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Callable, NamedTuple
+
+from challtools.constants import *
+from challtools.exceptions import CriticalException
+
+# the name of the user metadata entry storing the sha256 digest of a file
+DIGEST_METADATA = "sha256"
+# files larger than this are uploaded in parts of this size, several at a time
+MULTIPART_PART_SIZE = 16 * 1024 * 1024
+DEFAULT_UPLOAD_JOBS = 4
+
+
+class SyncPlan(NamedTuple):
+    """The changes needed to make a prefix match the local files."""
+
+    upload: list[tuple[str, Path, str]]  # (key, path, sha256 digest)
+    unchanged: list[str]
+    delete: list[str]
+
+
+def file_digests(path: Path) -> tuple[str, str]:
+    """Computes the sha256 and md5 digests of a file in a single pass.
+
+    Returns:
+        A tuple of the hex digests.
+    """
+    sha256 = hashlib.sha256()
+    md5 = hashlib.md5()
+    with path.open("rb") as f:
+        while chunk := f.read(1024 * 1024):
+            sha256.update(chunk)
+            md5.update(chunk)
+    return sha256.hexdigest(), md5.hexdigest()
+
+
+def _metadata_digest(metadata: Any) -> str | None:
+    """Gets the stored sha256 digest from object metadata, in which keys may or may not carry the ``x-amz-meta-`` prefix and use any case."""
+    for key, value in (metadata or {}).items():
+        key = key.lower()
+        if key in [DIGEST_METADATA, f"x-amz-meta-{DIGEST_METADATA}"]:
+            return value
+    return None
+
+
+def _is_unchanged(
+    client: Any, bucket: str, obj: Any, path: Path, sha256: str, md5: str
+) -> bool:
+    if obj.size != path.stat().st_size:
+        return False
+
+    remote_digest = _metadata_digest(obj.metadata)
+    if remote_digest is None:
+        # listings only contain user metadata on some servers
+        remote_digest = _metadata_digest(
+            client.stat_object(bucket, obj.object_name).metadata
+        )
+    if remote_digest is not None:
+        return remote_digest == sha256
+
+    # objects uploaded without a digest. the ETag of an object uploaded in a
+    # single part is its md5 digest, multipart ETags can not be compared
+    etag = (obj.etag or "").strip('"')
+    return "-" not in etag and etag == md5
+
+
+def plan_sync(
+    client: Any, bucket: str, prefix: str, files: dict[str, Path]
+) -> SyncPlan:
+    """Compares local files against the objects under a prefix.
+
+    Args:
+        client: A minio.Minio client.
+        bucket: The name of the bucket.
+        prefix: The prefix the files are stored under, ending with a slash.
+        files: The local files, by their key relative to the prefix.
+
+    Returns:
+        The changes needed to make the prefix match the local files.
+    """
+    remote = {
+        obj.object_name: obj
+        for obj in client.list_objects(
+            bucket, prefix=prefix, recursive=True, include_user_meta=True
+        )
+    }
+
+    upload = []
+    unchanged = []
+    for name, path in files.items():
+        key = prefix + name
+        sha256, md5 = file_digests(path)
+        if key in remote and _is_unchanged(
+            client, bucket, remote[key], path, sha256, md5
+        ):
+            unchanged.append(key)
+        else:
+            upload.append((key, path, sha256))
+
+    keys = {prefix + name for name in files}
+    delete = sorted(key for key in remote if key not in keys)
+
+    return SyncPlan(upload, unchanged, delete)
+
+
+def sync_files(
+    client: Any,
+    bucket: str,
+    prefix: str,
+    files: dict[str, Path],
+    jobs: int = DEFAULT_UPLOAD_JOBS,
+    output: Callable[..., Any] = print,
+) -> SyncPlan:
+    """Makes the objects under a prefix match local files, transferring only what changed.
+
+    Args:
+        client: A minio.Minio client.
+        bucket: The name of the bucket.
+        prefix: The prefix to store the files under, ending with a slash.
+        files: The local files, by their key relative to the prefix.
+        jobs: The maximum amount of files uploaded at the same time.
+        output: The function used to print progress, with the same signature as print.
+
+    Returns:
+        The changes that were made.
+
+    Raises:
+        CriticalException: If listing, uploading or deleting fails.
+    """
+    from minio.deleteobjects import DeleteObject
+    from minio.error import S3Error
+
+    try:
+        plan = plan_sync(client, bucket, prefix, files)
+    except S3Error as exc:
+        raise CriticalException(f"Could not list existing S3 objects: {exc}") from exc
+
+    for key in plan.unchanged:
+        output(f"{BOLD}{key[len(prefix):]} is unchanged, skipping{CLEAR}")
+
+    def upload(key, path, sha256):
+        client.fput_object(
+            bucket,
+            key,
+            str(path),
+            metadata={DIGEST_METADATA: sha256},
+            part_size=MULTIPART_PART_SIZE,
+        )
+        return key
+
+    if plan.upload:
+        with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+            futures = {
+                executor.submit(upload, key, path, sha256): path
+                for key, path, sha256 in plan.upload
+            }
+            for path in futures.values():
+                output(f"{BOLD}Uploading {path.name}...{CLEAR}")
+            try:
+                for future in as_completed(futures):
+                    future.result()
+                    output(f"{BOLD}Uploaded {futures[future].name}{CLEAR}")
+            except S3Error as exc:
+                for future in futures:
+                    future.cancel()
+                raise CriticalException(f"Failed to upload to S3: {exc}") from exc
+            except Exception as exc:
+                for future in futures:
+                    future.cancel()
+                raise CriticalException(
+                    f"Unexpected error uploading to S3: {exc}"
+                ) from exc
+
+    if plan.delete:
+        for key in plan.delete:
+            output(f"{BOLD}Deleting stale {key[len(prefix):]}...{CLEAR}")
+        try:
+            errors = list(
+                client.remove_objects(
+                    bucket, [DeleteObject(key) for key in plan.delete]
+                )
+            )
+        except S3Error as exc:
+            raise CriticalException(
+                f"Could not delete stale S3 objects: {exc}"
+            ) from exc
+        if errors:
+            raise CriticalException(
+                "Could not delete stale S3 objects: "
+                + ", ".join(f"{error.name}: {error.message}" for error in errors)
+            )
+
+    return plan
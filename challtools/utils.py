@@ -1,18 +1,37 @@
 import hashlib
-import json
 import os
 import re
 import subprocess
 import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-import docker
-import requests
-import yaml
-
+from challtools.cache import cached_validate
 from challtools.constants import *
+from challtools.discovery import find_challenges
 from challtools.exceptions import CriticalException
-from challtools.validator import ConfigValidator
+from challtools.flags import FlagMatcher
+from challtools.loader import load_yaml
+from challtools.plugin import lazy_import
+from challtools.ports import PortAllocator, allocate_ports, lease_ports
+from challtools.progress import (
+    LayerProgress,
+    ProgressPrinter,
+    closing_stream,
+    decode_json_stream,
+)
+
+# these are only imported once used, since most commands never need the docker SDK
+docker = lazy_import("docker")
+requests = lazy_import("requests")
+
+# label storing the digest of the build context an image was built from
+CONTEXT_DIGEST_LABEL = "challtools.context-digest"
+# the default maximum amount of docker images built at the same time
+DEFAULT_BUILD_JOBS = 4
+# the amount of challenge configs from which on they are loaded in a process pool
+PARALLEL_LOAD_THRESHOLD = 64
 
 
 def process_messages(messages, verbose=False):
@@ -121,22 +140,20 @@ def load_ctf_config():
     if not ctfpath:
         return None
 
-    raw_config = ctfpath.read_text()
-    config = yaml.safe_load(raw_config)
+    config = load_yaml(ctfpath)
 
     return config if config else {}
 
 
-def load_config(workdir=".", search=True, cd=True):
-    """Loads the challenge configuration file from the current directory, a specified directory, or optionally one of their parent directories. Optionally changes the working directory to the directory of the configuration file.
+def locate_config(workdir=".", search=True):
+    """Locates the challenge configuration file in the current directory, a specified directory, or optionally one of their parent directories.
 
     Args:
         workdir (string): The directory to search for the configuration file from
         search (bool): If the parent directories of the starting directory should be searched for the configuration file
-        cd (bool): If the working directory should be set to the directory the configuration file is found in
 
     Returns:
-        dict: The config
+        pathlib.Path: The absolute path to the config
 
     Raises:
         CriticalException: If the challenge configuration cannot be found
@@ -159,8 +176,27 @@ def load_config(workdir=".", search=True, cd=True):
             f"Could not find a challenge.yml file in this{' or a parent' if search else ''} directory."
         )
 
-    raw_config = path.read_text()
-    config = yaml.safe_load(raw_config)
+    return path
+
+
+def load_config(workdir=".", search=True, cd=True):
+    """Loads the challenge configuration file from the current directory, a specified directory, or optionally one of their parent directories. Optionally changes the working directory to the directory of the configuration file.
+
+    Args:
+        workdir (string): The directory to search for the configuration file from
+        search (bool): If the parent directories of the starting directory should be searched for the configuration file
+        cd (bool): If the working directory should be set to the directory the configuration file is found in
+
+    Returns:
+        dict: The config
+
+    Raises:
+        CriticalException: If the challenge configuration cannot be found
+    """
+
+    path = locate_config(workdir, search=search)
+
+    config = load_yaml(path)
 
     if cd:
         os.chdir(path.parent)
@@ -168,13 +204,14 @@ def load_config(workdir=".", search=True, cd=True):
     return config
 
 
-def get_valid_config(workdir=None, search=True, cd=True):
-    """Loads the challenge configuration file from the current directory and makes sure its valid.
+def get_valid_config(workdir=None, search=True, cd=True, output=print):
+    """Loads the challenge configuration file from the current directory and makes sure its valid. Validation results are cached on disk, see challtools.cache.cached_validate.
 
     Args:
         workdir (string): The directory to search for the configuration file from
         search (bool): If the parent directories of the starting directory should be searched for the configuration file
         cd (bool): If the working directory should be set to the directory the configuration file is found in
+        output (callable): The function used to print validation messages, with the same signature as print
 
     Returns:
         dict: The normalized config
@@ -183,66 +220,117 @@ def get_valid_config(workdir=None, search=True, cd=True):
         CriticalException: If there are critical validation errors
     """
 
-    config = load_config(
-        search=search, cd=cd, **{"workdir": workdir} if workdir else {}
-    )
+    path = locate_config(search=search, **{"workdir": workdir} if workdir else {})
+
+    if cd:
+        os.chdir(path.parent)
+
+    _, messages, normalized_config = cached_validate(path)
+    check_validation_messages(messages, output=output)
+
+    return normalized_config
+
+
+def check_validation_messages(messages, output=print):
+    """Prints validation messages of high and critical severity.
+
+    Args:
+        messages (list): The validator messages of a challenge config
+        output (callable): The function used to print the messages, with the same signature as print
+
+    Raises:
+        CriticalException: If there are critical validation errors
+    """
 
-    validator = ConfigValidator(config)
-    messages = validator.validate()[1]
     highest_level = process_messages(messages)["highest_level"]
 
     if highest_level == 5:
-        print(
+        output(
             "\n".join(
                 process_messages([m for m in messages if m["level"] == 5])[
                     "message_strings"
                 ]
             )
         )
-        print()
+        output()
         raise CriticalException(
             "There are critical config validation errors. Please fix them before continuing."
         )
     elif highest_level == 4:
-        print(
+        output(
             "\n".join(
                 process_messages([m for m in messages if m["level"] == 4])[
                     "message_strings"
                 ]
             )
         )
-        print(
+        output(
             f"\n{HIGH}There are config validation issues of high severity. You probably want to fix them.{CLEAR}"
         )
 
-    return validator.normalized_config
+
+def load_valid_configs(paths, jobs=None):
+    """Loads and validates many challenge configuration files, like get_valid_config. Configs are loaded in a pool of processes unless there are only a few of them, since starting the pool takes longer than loading a few cached configs.
+
+    Args:
+        paths (list): The paths to the challenge configuration files, as returned by discover_challenges
+        jobs (int): The amount of processes to load the configs in. Defaults to the amount of CPUs. If 1, everything is loaded in the current process
+
+    Returns:
+        list: A list of (path, normalized config) tuples, in the same order as the paths
+
+    Raises:
+        CriticalException: If any config has critical validation errors
+    """
+    paths = list(paths)
+    jobs = jobs or os.cpu_count() or 1
+    parallel = jobs > 1 and len(paths) >= PARALLEL_LOAD_THRESHOLD
+
+    executor = ProcessPoolExecutor(max_workers=jobs) if parallel else None
+    try:
+        if parallel:
+            results = executor.map(
+                _load_valid_config,
+                paths,
+                chunksize=max(1, len(paths) // (jobs * 4)),
+            )
+        else:
+            results = map(_load_valid_config, paths)
+
+        configs = []
+        # messages are printed here rather than in the workers so that they are
+        # not interleaved
+        for path, (messages, normalized_config) in zip(paths, results):
+            check_validation_messages(messages)
+            configs.append((path, normalized_config))
+    finally:
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    return configs
+
+
+def _load_valid_config(path):
+    """Validates a single challenge configuration file. Module level so that it can be used in a process pool."""
+    _, messages, normalized_config = cached_validate(path)
+    return messages, normalized_config
 
 
 def discover_challenges(search_start=None):
-    """Discovers all challenges at the same level as or in a subdirectory below the CTF configuration file.
+    """Discovers all challenges at the same level as or in a subdirectory below the CTF configuration file. Hidden and vendor directories, as well as directories matched by a ``.challtoolsignore`` file, are skipped. See challtools.discovery.find_challenges.
 
     Returns:
         list: A list of pathlib.Path objects to all found challenge configurations
         None: If there was no CTF config
     """
-    root = get_ctf_config_path(
+    ctf_config_path = get_ctf_config_path(
         **{"search_start": search_start} if search_start else {}
-    ).parent
+    )
 
-    if not root:
+    if not ctf_config_path:
         return None
 
-    def checkdir(d):
-        if (d / "challenge.yml").exists():
-            return [d / "challenge.yml"]
-        if (d / "challenge.yaml").exists():
-            return [d / "challenge.yaml"]
-        results = []
-        for subd in [f for f in d.iterdir() if f.is_dir()]:
-            results += checkdir(subd)
-        return results
-
-    return checkdir(root)
+    return find_challenges(ctf_config_path.parent)
 
 
 def get_docker_client():
@@ -256,7 +344,7 @@ def get_docker_client():
     """
     try:
         client = docker.from_env()
-        client.images.list()
+        client.ping()
     except (requests.exceptions.ConnectionError, docker.errors.DockerException) as e:
         lastrow = ""
         if "FileNotFoundError" in e.args[0]:
@@ -379,7 +467,7 @@ def validate_solution_output(config, output):
 
 
 def validate_flag(config, submitted_flag):
-    """validates a flag against the flags in the challenge config.
+    """validates a flag against the flags in the challenge config. When checking many flags, build a challtools.flags.FlagMatcher once and use it directly instead.
 
     Args:
         config (dict): The normalized challenge config
@@ -388,72 +476,253 @@ def validate_flag(config, submitted_flag):
     Returns:
         boolean: If the flag was valid
     """
-    if config["flag_format_prefix"]:
-        if not submitted_flag.startswith(
-            config["flag_format_prefix"]
-        ) or not submitted_flag.endswith(config["flag_format_suffix"]):
-            return False
-        submitted_flag = submitted_flag[
-            len(config["flag_format_prefix"]) : -len(config["flag_format_suffix"])
+    return FlagMatcher(config).is_valid(submitted_flag)
+
+
+def get_context_digest(path):
+    """Computes a deterministic digest of a docker image build context. Files excluded by a ``.dockerignore`` file do not affect the digest.
+
+    Args:
+        path (string): The path to the build context directory
+
+    Returns:
+        string: A hex encoded sha256 digest of all file names, modes and contents in the build context
+    """
+    root = Path(path)
+
+    patterns = []
+    dockerignore = root / ".dockerignore"
+    if dockerignore.is_file():
+        # same parsing as done by the docker SDK when building
+        patterns = [
+            line.strip()
+            for line in dockerignore.read_text().splitlines()
+            if line.strip() and not line.strip().startswith("#")
         ]
 
-    for flag in config["flags"]:
-        if flag["type"] == "text":
-            if submitted_flag == flag["flag"]:
-                return True
+    digest = hashlib.sha256()
+    for name in sorted(docker.utils.build.exclude_paths(str(root), patterns)):
+        file = root / name
+        stat = file.lstat()
+        digest.update(name.replace(os.sep, "/").encode() + b"\0")
+        digest.update(f"{stat.st_mode & 0o170777:o}\0".encode())
+        if file.is_symlink():
+            digest.update(os.readlink(file).encode())
+        elif file.is_file():
+            with file.open("rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        digest.update(b"\0")
+
+    return digest.hexdigest()
 
-        if flag["type"] == "regex":
-            if re.search(flag["flag"], submitted_flag):
-                return True
 
-    return False
+def docker_resource_exists(collection, name):
+    """Checks if a docker image, network or volume exists by looking it up by name, which is a single request no matter how many objects exist on the host.
+
+    Args:
+        collection: The collection to look in, such as ``client.images``
+        name (string): The name of the object. For images, a tag without a version refers to the latest version
+
+    Returns:
+        bool: If the object exists
+    """
+    # getting a network by name also matches partial network IDs, and the
+    # name filters match substrings, so names are compared exactly
+    if isinstance(collection, docker.models.networks.NetworkCollection):
+        return any(network.name == name for network in collection.list(names=[name]))
+    if isinstance(collection, docker.models.volumes.VolumeCollection):
+        return any(
+            volume.name == name for volume in collection.list(filters={"name": name})
+        )
+
+    try:
+        collection.get(name)
+    except docker.errors.NotFound:
+        return False
+
+    return True
+
+
+def get_image_label(client, tag, label):
+    """Gets the value of a label of a local docker image.
+
+    Args:
+        client (docker.client.DockerClient): The docker client
+        tag (string): The tag of the image
+        label (string): The name of the label
+
+    Returns:
+        string: The label value
+        None: If the image or the label does not exist
+    """
+    try:
+        image = client.images.get(tag)
+    except docker.errors.ImageNotFound:
+        return None
+
+    return (image.labels or {}).get(label)
 
 
-def build_image(image, tag, client):
-    """Build a docker image given the image (as a path to a folder, if archive it will load it), the tag and the docker client.
+class PrefixedOutput:
+    """A print replacement that prefixes every line, used to multiplex the output of concurrent builds. Partial lines are buffered until they are complete so that lines from different builds never interleave.
+
+    Args:
+        prefix (string): The string to put before each line
+        output (callable): The function complete lines are printed with, with the same signature as print. May be another PrefixedOutput to nest prefixes
+    """
+
+    # reentrant since a nested PrefixedOutput takes it again
+    lock = threading.RLock()
+
+    def __init__(self, prefix, output=print):
+        self.prefix = prefix
+        self.output = output
+        self.buffer = ""
+
+    def __call__(self, text="", end="\n"):
+        self.buffer += text + end
+        *lines, self.buffer = self.buffer.split("\n")
+        if lines:
+            with self.lock:
+                self.output("\n".join(self.prefix + line for line in lines))
+
+    def flush(self):
+        if self.buffer:
+            self("")
+
+
+def build_image(
+    image, tag, client, force_rebuild=False, output=print, cancel_event=None
+):
+    """Build a docker image given the image (as a path to a folder, if archive it will load it), the tag and the docker client. Images built from a folder are labeled with a digest of the build context, and are not rebuilt if an image with the same tag and digest already exists.
 
     Args:
         image (string): The image as a path to a folder to build or as a path to an archive to import. if neither, the function won't do anything
         tag (string): The tag name to tag the image as
         client (docker.client.DockerClient): The docker client to use for building
+        force_rebuild (bool): If the image should be built even if its build context is unchanged
+        output (callable): The function used to print build output, with the same signature as print
+        cancel_event (threading.Event): If set while building, the build is aborted
+
+    Returns:
+        bool: If an image was built
 
     Raises:
-        CriticalException: If the build fails
+        CriticalException: If the build fails or is cancelled
     """
     imagepath = Path(image)
     if imagepath.is_dir():
-        print(
-            f'{BOLD}Interpreting "{image}" as an image build directory\nBuilding image...{CLEAR}'
-        )
+        output(f'{BOLD}Interpreting "{image}" as an image build directory{CLEAR}')
+
+        context_digest = get_context_digest(imagepath)
+        if (
+            not force_rebuild
+            and get_image_label(client, tag, CONTEXT_DIGEST_LABEL) == context_digest
+        ):
+            output(f"{BOLD}Build context unchanged, image is up to date{CLEAR}")
+            return False
+
+        output(f"{BOLD}Building image...{CLEAR}")
         try:
             stream = client.api.build(
                 path=str(imagepath),
                 tag=tag,
                 rm=True,
+                labels={CONTEXT_DIGEST_LABEL: context_digest},
             )
 
-            for chunk in stream:
-                for line in chunk.strip().split(b"\n"):
-                    decoded = json.loads(line)
-                    # TODO process progress bars for pulling
+            # base images pulled during the build report their progress
+            pull_progress = ProgressPrinter(LayerProgress("Pulling"), output=output)
+            with closing_stream(stream):
+                for decoded in decode_json_stream(stream):
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise CriticalException(f"Build of {tag} cancelled")
+                    if pull_progress.update(decoded):
+                        continue
                     if "error" in decoded:
                         raise CriticalException(decoded["error"])
                     if "stream" in decoded:
-                        print(decoded["stream"], end="")
+                        pull_progress.finish()
+                        output(decoded["stream"], end="")
                     if list(decoded.keys()) == ["message"]:
                         raise CriticalException(decoded["message"])
+            pull_progress.finish()
 
         except docker.errors.APIError as e:
             raise CriticalException(e.explanation)
 
+        return True
+
     elif imagepath.is_file():
-        print(f'{BOLD}Interpreting "{image}" as an image archive{CLEAR}')
-        print(f"{BOLD}Importing image...{CLEAR}")
+        output(f'{BOLD}Interpreting "{image}" as an image archive{CLEAR}')
+        output(f"{BOLD}Importing image...{CLEAR}")
         raise NotImplementedError  # TODO
     else:
-        print(
+        output(
             f'{BOLD}Interpreting "{image}" as an existing image, nothing to build{CLEAR}'
         )
+        return False
+
+
+def build_images(
+    builds, client, jobs=DEFAULT_BUILD_JOBS, force_rebuild=False, output=print
+):
+    """Builds multiple docker images concurrently using build_image. When building more than one image at a time, every line of build output is prefixed with the name of the image it belongs to. As soon as one build fails all remaining builds are cancelled.
+
+    Args:
+        builds (list): A list of (name, image, tag) tuples, where name is displayed to the user and image and tag are passed to build_image
+        client (docker.client.DockerClient): The docker client to use for building
+        jobs (int): The maximum amount of images to build at the same time
+        force_rebuild (bool): If images should be built even if their build context is unchanged
+        output (callable): The function used to print build output, with the same signature as print
+
+    Returns:
+        bool: If any image was built
+
+    Raises:
+        CriticalException: If any build fails
+    """
+    if jobs <= 1 or len(builds) <= 1:
+        built = False
+        for name, image, tag in builds:
+            output(f"{BOLD}Processing {name}...{CLEAR}")
+            built |= build_image(
+                image, tag, client, force_rebuild=force_rebuild, output=output
+            )
+        return built
+
+    width = max(len(name) for name, _, _ in builds)
+    cancel_event = threading.Event()
+
+    def run(name, image, tag):
+        image_output = PrefixedOutput(f"{BOLD}{name:<{width}} |{CLEAR} ", output)
+        try:
+            return build_image(
+                image,
+                tag,
+                client,
+                force_rebuild=force_rebuild,
+                output=image_output,
+                cancel_event=cancel_event,
+            )
+        finally:
+            image_output.flush()
+
+    output(f"{BOLD}Processing {', '.join(name for name, _, _ in builds)}...{CLEAR}")
+    built = False
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(run, *build) for build in builds]
+        try:
+            for future in as_completed(futures):
+                built |= future.result()
+        except BaseException:
+            cancel_event.set()
+            for future in futures:
+                future.cancel()
+            raise
+
+    return built
 
 
 def run_build_script(config):
@@ -475,46 +744,109 @@ def run_build_script(config):
         raise CriticalException(f"Build script exited with code {p.returncode}")
 
 
-def build_docker_images(config, client):
+def get_image_builds(config, workdir=None):
+    """Lists the docker images of a challenge that can be built, as accepted by build_images.
+
+    Args:
+        config (dict): The normalized challenge config
+        workdir (pathlib.Path): The challenge directory image paths are relative to. The current directory if not given
+
+    Returns:
+        list: A list of (name, image, tag) tuples for all deployment containers
+    """
     if not config["deployment"]:
-        return False
+        return []
 
-    for container_name, container in config["deployment"]["containers"].items():
-        print(f"{BOLD}Processing container {container_name}...{CLEAR}")
-        build_image(
-            container["image"],
+    return [
+        (
+            f"container {container_name}",
+            str(Path(workdir) / container["image"]) if workdir else container["image"],
             create_docker_name(
                 config["title"],
                 container_name=container_name,
                 chall_id=config["challenge_id"],
             ),
-            client,
         )
+        for container_name, container in config["deployment"]["containers"].items()
+    ]
+
 
-    network_list = [network.name for network in client.networks.list()]
+def create_docker_resources(config, client, output=print):
+    """Creates the docker networks and volumes used by a challenge that do not exist yet.
+
+    Args:
+        config (dict): The normalized challenge config
+        client (docker.client.DockerClient): The docker client
+        output (callable): The function used to print progress, with the same signature as print
+    """
     for network_name in config["deployment"]["networks"]:
-        if network_name not in network_list:
-            print(f"{BOLD}Creating network {network_name}...{CLEAR}")
+        if not docker_resource_exists(client.networks, network_name):
+            output(f"{BOLD}Creating network {network_name}...{CLEAR}")
             client.networks.create(
                 network_name
             )  # TODO make network names not collide between challenges, add id hash maybe
 
-    volume_list = [volume.name for volume in client.volumes.list()]
     for volume_name in config["deployment"]["volumes"]:
-        if volume_name not in volume_list:
-            print(f"{BOLD}Creating volume {volume_name}...{CLEAR}")
+        if not docker_resource_exists(client.volumes, volume_name):
+            output(f"{BOLD}Creating volume {volume_name}...{CLEAR}")
             client.volumes.create(
                 volume_name
             )  # TODO make volume names not collide between challenges, add id hash maybe
 
+
+def build_docker_images(
+    config,
+    client,
+    force_rebuild=False,
+    jobs=DEFAULT_BUILD_JOBS,
+    workdir=None,
+    output=print,
+):
+    if not config["deployment"]:
+        return False
+
+    build_images(
+        get_image_builds(config, workdir=workdir),
+        client,
+        jobs=jobs,
+        force_rebuild=force_rebuild,
+        output=output,
+    )
+    create_docker_resources(config, client, output=output)
+
     return True
 
 
-def build_chall(config):
-    """Builds a challenge including running the build script and building service and solution docker images. Expects to be run from the root directory of the challenge.
+def get_chall_builds(config):
+    """Lists all docker images of a challenge that can be built, including the solution image, as accepted by build_images. Image paths are relative to the challenge directory.
+
+    Args:
+        config (dict): The normalized challenge config
+
+    Returns:
+        list: A list of (name, image, tag) tuples
+    """
+    builds = get_image_builds(config)
+    if config["solution_image"]:
+        builds.append(
+            (
+                "solution image",
+                config["solution_image"],
+                "sol_"
+                + create_docker_name(config["title"], chall_id=config["challenge_id"]),
+            )
+        )
+    return builds
+
+
+def build_chall(config, force_rebuild=False, jobs=DEFAULT_BUILD_JOBS, client=None):
+    """Builds a challenge including running the build script and building service and solution docker images. Expects to be run from the root directory of the challenge. Images whose build context is unchanged since they were last built are skipped, and up to ``jobs`` images are built concurrently.
 
     Args:
         config (dict): The normalized challenge config
+        force_rebuild (bool): If images should be built even if their build context is unchanged
+        jobs (int): The maximum amount of images to build at the same time
+        client (docker.client.DockerClient): The docker client to use, a new one is created if needed and not given
 
     Returns:
         bool: False if there was nothing to do, True if it ran the build script or built a container
@@ -530,34 +862,32 @@ def build_chall(config):
                 'challtools only supports the "docker" deployment type'
             )
 
+    if client is None and (config["deployment"] or config["solution_image"]):
         client = get_docker_client()
 
     if "build_script" in config["custom"]:
         did_something = True
         run_build_script(config)
 
-    if config["deployment"]:
+    builds = get_chall_builds(config)
+    if builds:
         did_something = True
-        build_docker_images(config, client)
+        build_images(builds, client, jobs=jobs, force_rebuild=force_rebuild)
 
-    if config["solution_image"]:
+    if config["deployment"]:
         did_something = True
-        print(f"{BOLD}Processing solution image...{CLEAR}")
-        build_image(
-            config["solution_image"],
-            "sol_"
-            + create_docker_name(config["title"], chall_id=config["challenge_id"]),
-            client,
-        )
+        create_docker_resources(config, client)
 
     return did_something
 
 
-def start_chall(config):
+def start_chall(config, network=None, output=print):
     """Starts all docker containers for this challenge.
 
     Args:
         config (dict): The normalized challenge config
+        network (string): The name of an existing docker network to start the challenge in isolation on. If given, the containers get unique names, are reachable on the network under their container names and do not publish any ports, which allows starting several challenges at the same time. The networks of the deployment are not used in this case.
+        output (callable): The function used to print progress, with the same signature as print
 
     Returns:
         tuple: The first element is a list of all started containers as docker.models.containers.Container instances. The second element is a list of formatted service strings for displaying to users.
@@ -573,11 +903,6 @@ def start_chall(config):
         raise CriticalException('challtools only supports the "docker" deployment type')
 
     client = get_docker_client()
-    tag_list = [
-        tag.split(":")[0]
-        for img in client.images.list()
-        for tag in img.attrs["RepoTags"]
-    ]
 
     for container_name, container in config["deployment"]["containers"].items():
         tag = create_docker_name(
@@ -586,31 +911,28 @@ def start_chall(config):
             chall_id=config["challenge_id"],
         )  # TODO check that the container hasn't already been started
 
-        if tag not in tag_list and f"docker.io/library/{tag}" not in tag_list:
+        if not docker_resource_exists(client.images, tag):
             raise CriticalException(
                 f'Cannot find image "{tag}". Make sure you have built the required docker images using "challtools build" before attempting to start them.'
             )
 
-    # TODO test that network and volume detection works
-    network_list = [network.name for network in client.networks.list()]
-    for network_name in config["deployment"]["networks"]:
-        if network_name not in network_list:
-            raise CriticalException(
-                f'Cannot find network "{network_name}". Make sure you have created the required docker networks using "challtools build" before attempting to use them.'
-            )
+    if not network:
+        # TODO test that network and volume detection works
+        for network_name in config["deployment"]["networks"]:
+            if not docker_resource_exists(client.networks, network_name):
+                raise CriticalException(
+                    f'Cannot find network "{network_name}". Make sure you have created the required docker networks using "challtools build" before attempting to use them.'
+                )
 
-    volume_list = [volume.name for volume in client.volumes.list()]
     for volume_name in config["deployment"]["volumes"]:
-        if volume_name not in volume_list:
+        if not docker_resource_exists(client.volumes, volume_name):
             raise CriticalException(
                 f'Cannot find volume "{volume_name}". Make sure you have created the required docker volumes using "challtools build" before attempting to use them.'
             )
 
     containers = []
     service_strings = []
-    available_port = (
-        50000  # TODO add some support for running challenges at the same time
-    )
+    allocated_ports = {} if network else assign_external_ports(config, client)
 
     for container_name, container_config in config["deployment"]["containers"].items():
         tag = create_docker_name(
@@ -619,11 +941,38 @@ def start_chall(config):
             chall_id=config["challenge_id"],
         )
 
+        if network:
+            for service in container_config.get("services", []):
+                service_strings.append(
+                    format_network_service(config, container_name, service)
+                )
+
+            # the high level API only takes endpoint aliases since docker 7.0
+            created = client.api.create_container(
+                tag,
+                detach=True,
+                environment={"TEST": "true"},
+                name=f"{network}_{container_name}",
+                host_config=client.api.create_host_config(
+                    privileged=container_config["privileged"], network_mode=network
+                ),
+                networking_config=client.api.create_networking_config(
+                    {
+                        network: client.api.create_endpoint_config(
+                            aliases=[container_name]
+                        )
+                    }
+                ),
+            )
+            container = client.containers.get(created["Id"])
+            container.start()
+            output(f"{BOLD}Started container {container_name}{CLEAR}")
+
+            containers.append(container)
+            continue
+
         ports = {}
         for service in container_config.get("services", []):
-            if "external_port" not in service:
-                service["external_port"] = available_port
-                available_port += 1
             ports[service["internal_port"]] = service["external_port"]
 
             service_strings.append(
@@ -648,24 +997,82 @@ def start_chall(config):
             name=container_name,
             # TODO volumes
         )
+        lease_ports(allocated_ports.get(container_name, []), container.id, client)
 
-        for network, network_containers in config["deployment"]["networks"].items():
+        for network_name, network_containers in config["deployment"][
+            "networks"
+        ].items():
             if container_name in network_containers:
-                client.networks.get(network).connect(container)
+                client.networks.get(network_name).connect(container)
 
         container.start()
-        print(f"{BOLD}Started container {container_name}{CLEAR}")
+        output(f"{BOLD}Started container {container_name}{CLEAR}")
 
         containers.append(container)
 
     return containers, service_strings
 
 
-def start_solution(config):
+def assign_external_ports(config, client=None):
+    """Assigns free host ports to all services of a challenge without an explicitly configured external port. The ports are leased to the current process, see challtools.ports.
+
+    Args:
+        config (dict): The normalized challenge config, which is modified in place
+        client (docker.DockerClient): A docker client used to reclaim port leases of containers that no longer run
+
+    Returns:
+        dict: The assigned ports of each container, by container name
+    """
+    if not config["deployment"]:
+        return {}
+
+    containers = config["deployment"]["containers"]
+    reserved = set()
+    missing = []
+    for container_name, container_config in containers.items():
+        for service in container_config.get("services", []):
+            if "external_port" in service:
+                reserved.add(service["external_port"])
+            else:
+                missing.append((container_name, service))
+        for extra in container_config.get("extra_exposed_ports", []):
+            reserved.add(extra["external_port"])
+
+    assigned = {}
+    ports = allocate_ports(len(missing), reserved=reserved, client=client)
+    for (container_name, service), port in zip(missing, ports):
+        service["external_port"] = port
+        assigned.setdefault(container_name, []).append(port)
+
+    return assigned
+
+
+def format_network_service(config, container_name, service):
+    """Formats a service of a challenge started on an isolated network, where it is reachable under its container name and internal port.
+
+    Args:
+        config (dict): The normalized challenge config
+        container_name (string): The name of the container in the deployment config
+        service (dict): The service config
+
+    Returns:
+        string: A formatted string ready to be passed to a solution
+    """
+    return format_user_service(
+        config,
+        service["type"],
+        host=container_name,
+        port=str(service["internal_port"]),
+        url=f"http://{container_name}:{service['internal_port']}",
+    )
+
+
+def start_solution(config, network=None):
     """Starts a solution container for this challenge.
 
     Args:
         config (dict): The normalized challenge config
+        network (string): The docker network the challenge was started on with start_chall, if any. The solution uses the host network otherwise.
 
     Returns:
         docker.models.containers.Container: The started docker container
@@ -678,35 +1085,43 @@ def start_solution(config):
         return None
 
     client = get_docker_client()
-    tag_list = [
-        tag.split(":")[0]
-        for img in client.images.list()
-        for tag in img.attrs["RepoTags"]
-    ]
     solution_tag = "sol_" + create_docker_name(
         config["title"], chall_id=config["challenge_id"]
     )
 
-    if solution_tag not in tag_list:
+    if not docker_resource_exists(client.images, solution_tag):
         raise CriticalException(
             f'Cannot find solution image "{solution_tag}". Make sure you have built the required solution docker image using "challtools build" before attempting to start it.'
         )
 
     service_strings = []
-    available_port = 50000
+    if not network:
+        # the ports are only assigned here if the challenge wasn't started with start_chall
+        assign_external_ports(config, client)
 
     for predefined_service in config["predefined_services"]:
         service_strings.append(
-            format_user_service(config, service["type"], **predefined_service)
+            format_user_service(
+                config,
+                predefined_service["type"],
+                **{
+                    key: str(value)
+                    for key, value in predefined_service.items()
+                    if key != "type"
+                },
+            )
         )
 
     for container_name, container_config in config["deployment"]["containers"].items():
         for service in container_config.get(
             "services", []
         ):  # FIXME validator breaks spec because .get is required, this should always default to an empty array
-            if "external_port" not in service:
-                service["external_port"] = available_port
-                available_port += 1
+            if network:
+                service_strings.append(
+                    format_network_service(config, container_name, service)
+                )
+                continue
+
             service_strings.append(
                 format_user_service(
                     config,
@@ -720,7 +1135,7 @@ def start_solution(config):
     container = client.containers.create(
         solution_tag,
         detach=True,
-        network="host",
+        network=network or "host",
         environment={"TEST": "true"},
         command=service_strings,
     )
@@ -729,12 +1144,43 @@ def start_solution(config):
     return container
 
 
-def generate_compose(configs, is_global=False, restart_policy="no", start_port=50000):
+def generate_compose(
+    configs, is_global=False, restart_policy="no", start_port=50000, previous=None
+):
+    """Generates a compose file running the services of challenges. Ports of services without an explicitly configured external port are derived from the challenge ID, container name and internal port, so they do not change when other challenges are added or removed.
+
+    Args:
+        configs (list): A list of (path, config) tuples of the challenges to include
+        is_global (bool): If build paths should be relative to the working directory instead of the challenge directory
+        restart_policy (string): The restart policy of all services
+        start_port (int): The first port automatically assigned ports are chosen from
+        previous (dict): A previously generated compose file. Services whose definition would be unchanged apart from automatically assigned ports are copied from it verbatim, so that recreating the deployment does not touch them
+
+    Returns:
+        dict: The compose file
+    """
     # TODO this whole functions paths are broken, there should be a path argument to generate paths relative to and `is_global` shouldn't exist
     compose = {"services": {}, "volumes": {}, "networks": {}}
-    next_port = start_port
     used_ports = set()
     unique_containers = {}
+    # (service name, service, [(external port or None, internal port, key)])
+    pending = []
+
+    # explicitly configured ports are reserved first so that automatically
+    # assigned ports never conflict with them. the compose file is deployed
+    # elsewhere, so the ports are not probed on this host
+    explicit_ports = {
+        service["external_port"]
+        for _, config in configs
+        if config["deployment"]
+        for container in config["deployment"]["containers"].values()
+        for service in [*container["services"], *container["extra_exposed_ports"]]
+        if service.get("external_port")
+    }
+    allocator = PortAllocator(
+        start_port=start_port, end_port=65535, reserved=explicit_ports, probe=False
+    )
+    cwd = Path().absolute()
 
     for path, config in configs:
         if not config["deployment"]:
@@ -745,16 +1191,13 @@ def generate_compose(configs, is_global=False, restart_policy="no", start_port=5
                 'Only deployments of type "docker" can be used to create a docker-compose file'
             )
 
-        if config["deployment"]["volumes"]:
-            compose["volumes"] = {
-                **compose["volumes"],
-                **{volume: {} for volume in config["deployment"]["volumes"]},
-            }
-        if config["deployment"]["networks"]:
-            compose["networks"] = {
-                **compose["networks"],
-                **{network: {} for network in config["deployment"]["networks"]},
-            }
+        for volume in config["deployment"]["volumes"]:
+            compose["volumes"][volume] = {}
+        for network in config["deployment"]["networks"]:
+            compose["networks"][network] = {}
+
+        if is_global:
+            challenge_dir = path.parent.relative_to(cwd)
 
         # use unique container names for single container deployments
         is_single_container = len(config["deployment"]["containers"].keys()) == 1
@@ -769,16 +1212,14 @@ def generate_compose(configs, is_global=False, restart_policy="no", start_port=5
                 "deployment"
             ]["containers"].pop(container_name)
 
-        # TODO handle services with set external ports first so the auto assigned ports dont potentially conflict with them
         for name, container in config["deployment"]["containers"].items():
             compose_service = {"ports": [], "restart": restart_policy}
+            ports = []
             volumes = []
             networks = []
 
             if is_global:
-                image_path = str(
-                    (path.parent / container["image"]).relative_to(Path().absolute())
-                )
+                image_path = str(challenge_dir / container["image"])
             else:
                 image_path = container["image"]
             if Path(image_path).exists():
@@ -788,24 +1229,23 @@ def generate_compose(configs, is_global=False, restart_policy="no", start_port=5
 
             for service in container["services"]:
                 external_port = service.get("external_port")
-                if not external_port:
-                    while next_port in used_ports:
-                        next_port += 1
-                    external_port = next_port
-
-                assert external_port not in used_ports
-                used_ports.add(external_port)
-
-                compose_service["ports"].append(
-                    f"{external_port}:{service['internal_port']}"
+                if external_port:
+                    assert external_port not in used_ports
+                    used_ports.add(external_port)
+
+                key = f"{config['challenge_id'] or config['title']}/{name}/{service['internal_port']}"
+                # services on the same internal port are told apart by their order
+                occurrence = sum(
+                    1 for _, port, _ in ports if port == service["internal_port"]
                 )
+                if occurrence:
+                    key += f"/{occurrence}"
+                ports.append((external_port, service["internal_port"], key))
 
             for service in container["extra_exposed_ports"]:
                 assert service["external_port"] not in used_ports
                 used_ports.add(service["external_port"])
-                compose_service["ports"].append(
-                    f"{service['external_port']}:{service['internal_port']}"
-                )
+                ports.append((service["external_port"], service["internal_port"], ""))
 
             for volume_name, containers in config["deployment"]["volumes"].items():
                 for mapping in containers:
@@ -824,16 +1264,48 @@ def generate_compose(configs, is_global=False, restart_policy="no", start_port=5
             if container["privileged"]:
                 compose_service["privileged"] = True
 
-            if name in compose["services"]:
+            if name in unique_containers:
                 first_duplicate = config["title"]
                 second_duplicate = unique_containers[name]
                 raise CriticalException(
                     f'More than one multi-container challenge ("{first_duplicate}" and "{second_duplicate}") is using the container name "{name}". Aborting.'
                 )
-            compose["services"][
-                name
-            ] = compose_service  # TODO add warning/error on container name collision?
             unique_containers[name] = config["title"]
+            pending.append((name, compose_service, ports))
+
+    # services that are unchanged apart from their automatically assigned ports
+    # keep the ports they had before
+    if previous:
+        for name, compose_service, ports in pending:
+            previous_ports = get_reusable_ports(
+                (previous.get("services") or {}).get(name),
+                compose_service,
+                ports,
+                allocator.reserved,
+            )
+            if previous_ports is None:
+                continue
+            for (external_port, _, _), previous_port in zip(ports, previous_ports):
+                if not external_port:
+                    allocator.reserve(previous_port)
+            ports[:] = [
+                (previous_port, internal_port, key)
+                for (_, internal_port, key), previous_port in zip(ports, previous_ports)
+            ]
+
+    # the remaining ports are assigned in an order independent of the order of
+    # the challenges, so that only colliding ports can move
+    automatic = sorted(
+        key for _, _, ports in pending for external, _, key in ports if not external
+    )
+    assigned = {key: allocator.allocate_stable(key) for key in automatic}
+
+    for name, compose_service, ports in pending:
+        compose_service["ports"] = [
+            f"{external_port or assigned[key]}:{internal_port}"
+            for external_port, internal_port, key in ports
+        ]
+        compose["services"][name] = compose_service
 
     if not compose["volumes"]:
         del compose["volumes"]
@@ -841,3 +1313,53 @@ def generate_compose(configs, is_global=False, restart_policy="no", start_port=5
         del compose["networks"]
 
     return compose
+
+
+def get_reusable_ports(previous_service, compose_service, ports, reserved):
+    """Checks if a previously generated compose service can be kept as it is, because the only differences to the newly generated one are automatically assigned ports.
+
+    Args:
+        previous_service (dict): The service in the previous compose file, or None if there was none
+        compose_service (dict): The newly generated service, without ports
+        ports (list): The (external port or None, internal port, key) tuples of the new service
+        reserved (set): Ports that are taken, which automatically assigned ports can not be kept at
+
+    Returns:
+        list: The external port of every port of the previous service
+        None: If the previous service can not be kept
+    """
+    if not previous_service:
+        return None
+
+    if {k: v for k, v in previous_service.items() if k != "ports"} != {
+        k: v for k, v in compose_service.items() if k != "ports"
+    }:
+        return None
+
+    previous_ports = []
+    for mapping in previous_service.get("ports") or []:
+        try:
+            external, internal = str(mapping).split(":")
+            previous_ports.append((int(external), int(internal)))
+        except ValueError:
+            return None
+
+    if len(previous_ports) != len(ports):
+        return None
+
+    taken = set()
+    for (external_port, internal_port, _), (
+        previous_external,
+        previous_internal,
+    ) in zip(ports, previous_ports):
+        if previous_internal != internal_port:
+            return None
+        if external_port and external_port != previous_external:
+            return None
+        if not external_port and (
+            previous_external in reserved or previous_external in taken
+        ):
+            return None
+        taken.add(previous_external)
+
+    return [external for external, _ in previous_ports]
@@ -3,25 +3,42 @@ from __future__ import annotations
 import importlib.resources
 import json
 import re
-from collections.abc import Generator
+from collections.abc import Generator, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from copy import deepcopy
+from functools import cache
 from pathlib import Path
-from typing import Any, cast
-
-import yaml
-from jsonschema import Draft7Validator, ValidationError, validate, validators
-from jsonschema.protocols import Validator
+from typing import TYPE_CHECKING, Any, cast
 
 from challtools.types import (
     JsonDict,
     ValidatorMessage,
 )
 
-with (importlib.resources.files("challtools") / "codes.yml").open() as f:
-    codes = yaml.safe_load(f)
+# jsonschema and yaml are slow to import and only needed once a config is
+# actually validated, so they are imported on first use
+if TYPE_CHECKING:
+    from jsonschema import Draft7Validator, ValidationError
+    from jsonschema.protocols import Validator
+
+
+@cache
+def get_codes() -> dict[str, JsonDict]:
+    """The message definitions from codes.yml, loaded on first use."""
+    from challtools.loader import parse_yaml
+
+    return parse_yaml(
+        (importlib.resources.files("challtools") / "codes.yml").read_bytes()
+    )
+
 
-with (importlib.resources.files("challtools") / "challenge.schema.json").open() as f:
-    schema = json.load(f)
+@cache
+def get_schema() -> JsonDict:
+    """The challenge JSON schema, loaded on first use."""
+    with (
+        importlib.resources.files("challtools") / "challenge.schema.json"
+    ).open() as f:
+        return json.load(f)
 
 
 def is_url(s: str):
@@ -30,6 +47,8 @@ def is_url(s: str):
 
 
 def _extend_with_default(validator_class: type[Draft7Validator]) -> type[Validator]:
+    from jsonschema import validators
+
     validate_properties = validator_class.VALIDATORS["properties"]
 
     def set_defaults(
@@ -38,7 +57,7 @@ def _extend_with_default(validator_class: type[Draft7Validator]) -> type[Validat
         instance: JsonDict | None,
         schema2: dict[str, JsonDict],
     ) -> Generator[ValidationError, Any, None]:
-        if instance is not None:
+        if validator.is_type(instance, "object"):
             for property2, subschema in properties.items():
                 if "default" in subschema:
                     _ = instance.setdefault(property2, subschema["default"])
@@ -56,7 +75,36 @@ def _extend_with_default(validator_class: type[Draft7Validator]) -> type[Validat
     )
 
 
-DefaultValidatingDraft7Validator = _extend_with_default(Draft7Validator)
+@cache
+def get_default_validating_validator() -> type[Validator]:
+    """A Draft 7 validator class that inserts defaults from the schema into the validated instance."""
+    from jsonschema import Draft7Validator
+
+    return _extend_with_default(Draft7Validator)
+
+
+@cache
+def get_schema_validator() -> Validator:
+    """The default filling validator for the challenge schema. The schema is checked and the validator is compiled once per process, as jsonschema.validate would otherwise redo both for every validated config."""
+    schema = get_schema()
+    validator_class = get_default_validating_validator()
+    validator_class.check_schema(schema)
+    return validator_class(schema)
+
+
+def __getattr__(name: str) -> Any:
+    # these used to be created on import, they are still available as module
+    # attributes but are now only created when first accessed
+    lazy_attributes = {
+        "codes": get_codes,
+        "schema": get_schema,
+        "schema_validator": get_schema_validator,
+        "DefaultValidatingDraft7Validator": get_default_validating_validator,
+    }
+    if name in lazy_attributes:
+        return lazy_attributes[name]()
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class ConfigValidator:
@@ -94,13 +142,17 @@ class ConfigValidator:
 
         # TODO A001
 
-        # A002, validating schema
-        try:
-            validate(instance=self.config, schema=schema)
-        except ValidationError as e:
+        # A002, validating schema. defaults are inserted into the normalized
+        # config in the same pass, so the config is only traversed once
+        from jsonschema.exceptions import best_match
+
+        self.normalized_config = deepcopy(self.config)
+        error = best_match(get_schema_validator().iter_errors(self.normalized_config))
+        if error is not None:
+            self.normalized_config = None
             path = ""
-            if e.absolute_path:
-                for part in e.absolute_path:
+            if error.absolute_path:
+                for part in error.absolute_path:
                     if isinstance(part, int):
                         path += f"[{part}]."
                         continue
@@ -112,7 +164,7 @@ class ConfigValidator:
             self._raise_code(
                 "A002",
                 path,
-                message=e.message,
+                message=error.message,
             )
             return (
                 False,
@@ -120,9 +172,6 @@ class ConfigValidator:
             )  # stop validation here in case of schema violations
 
         ### normalizing config
-        self.normalized_config = deepcopy(self.config)
-        # insterting defaults
-        DefaultValidatingDraft7Validator(schema).validate(self.normalized_config)
         # converting strings that should be lists into lists
         for field in [
             "authors",
@@ -270,6 +319,37 @@ class ConfigValidator:
             else True
         ), self.messages
 
+    @staticmethod
+    def validate_many(
+        paths: Iterable[Path],
+        ctf_config: JsonDict | None = None,
+        jobs: int | None = None,
+    ) -> Iterator[tuple[Path, bool, list[ValidatorMessage]]]:
+        """Validates many challenge configuration files concurrently in a pool of processes. Results are yielded as soon as each challenge has been validated, so they are not necessarily in the same order as the paths.
+
+        Args:
+            paths: Paths to the challenge configuration files to validate. The directory of each file is used as the challenge directory.
+            ctf_config: The parsed CTF configuration to validate all challenges against, if any.
+            jobs: The amount of processes to validate in. Defaults to the amount of CPUs. If 1, everything is validated in the current process.
+
+        Yields:
+            A tuple of the path to the configuration file, if the config is valid and the list of messages, as returned by validate.
+        """
+        if jobs == 1:
+            for path in paths:
+                yield _validate_file(path, ctf_config)
+            return
+
+        executor = ProcessPoolExecutor(max_workers=jobs)
+        try:
+            futures = [
+                executor.submit(_validate_file, path, ctf_config) for path in paths
+            ]
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
     def _raise_code(self, code: str, field: str | None = None, **formatting: str):
         """Adds a formatted message entry into the messages array.
 
@@ -279,6 +359,7 @@ class ConfigValidator:
             **formatting: Arguments used to format the ``formatted_message`` from codes.yml using pythons ``str.format()``. ``field_name`` is always formatted using the value from the field argument.
         """
 
+        codes = get_codes()
         if code not in codes:
             raise ValueError("The specified code doesn't exist")
 
@@ -295,3 +376,24 @@ class ConfigValidator:
                 ),
             }
         )
+
+
+def _validate_file(
+    path: Path, ctf_config: JsonDict | None
+) -> tuple[Path, bool, list[ValidatorMessage]]:
+    """Loads and validates a single challenge configuration file. Module level so that it can be used in a process pool."""
+    import yaml
+
+    from challtools.loader import load_yaml
+
+    validator = ConfigValidator({}, ctf_config=ctf_config, challdir=path.parent)
+
+    try:
+        config = load_yaml(path)
+    except yaml.YAMLError as e:
+        validator._raise_code("A009", error=str(e))
+        return path, False, validator.messages
+
+    validator.config = config
+    valid, messages = validator.validate()
+    return path, valid, messages
@@ -0,0 +1,344 @@
+"""Watching directory trees for changes, for the ``--watch`` mode of commands.
+
+On Linux changes are reported by inotify, used through ctypes so that no
+dependency is needed. A watch is added to every directory of the tree, and to
+directories created later. Elsewhere, or if inotify can not be used, for example
+because the watch limit is reached, the tree is polled instead by comparing the
+modification times and sizes of all files.
+
+Hidden directories, including the ``.challtools`` cache, and the directories
+challenge discovery prunes are not watched, so that writing caches does not
+cause changes. Editors and build tools often change several files at once or
+write a file in several steps, so changes are collected until none happened for
+a short while before they are reported.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Iterable
+
+from challtools.discovery import PRUNED_DIRECTORIES
+
+# changes are reported once no further change happened for this many seconds
+DEFAULT_SETTLE = 0.2
+# the time between two scans of the tree when polling, in seconds
+DEFAULT_POLL_INTERVAL = 1.0
+
+# from sys/inotify.h
+IN_MODIFY = 0x2
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x1000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_ONLYDIR
+)
+# struct inotify_event without the trailing name
+_EVENT = struct.Struct("iIII")
+
+
+def is_skipped(name: str) -> bool:
+    """Checks if a directory with a name is left out of watched trees."""
+    return name.startswith(".") or name in PRUNED_DIRECTORIES
+
+
+def _walk(root: Path) -> Iterable[tuple[str, list[str]]]:
+    """Walks the watched directories of a tree, yielding each directory and the names of the files in it."""
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if not is_skipped(name)]
+        yield directory, filenames
+
+
+def affected_directories(
+    changed: Iterable[Path], directories: Iterable[Path]
+) -> set[Path]:
+    """Finds the directories affected by changes, which are those that contain a changed path, are changed themselves or are inside a changed directory.
+
+    Args:
+        changed: Absolute paths of changed files and directories, as returned by a watcher.
+        directories: Absolute paths of the directories to check.
+
+    Returns:
+        The affected directories.
+    """
+    directories = set(directories)
+    affected = set()
+    for path in changed:
+        affected.update(
+            parent for parent in [path, *path.parents] if parent in directories
+        )
+        if not path.is_file():
+            # removed files and changed directories may contain directories
+            affected.update(
+                directory for directory in directories if path in directory.parents
+            )
+    return affected
+
+
+class Watcher(ABC):
+    """Watches a directory tree, and optionally single files outside of it, for changes. Use ``create_watcher`` to get the best watcher available.
+
+    Args:
+        root: The root of the watched tree.
+        files: Files outside of the tree to watch as well.
+        settle: The time without changes after which changes are reported, in seconds.
+    """
+
+    def __init__(
+        self, root: Path, files: Iterable[Path] = (), settle: float = DEFAULT_SETTLE
+    ):
+        self.root = Path(root).absolute()
+        self.files = [Path(file).absolute() for file in files]
+        self.settle = settle
+
+    @abstractmethod
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        """Waits for changes.
+
+        Args:
+            timeout: The maximum time to wait for a first change, in seconds, or None to wait indefinitely.
+
+        Returns:
+            The absolute paths of the changed files and directories, including removed ones. If it is unknown what changed, the root is returned. Empty if the timeout passed without changes.
+        """
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class PollingWatcher(Watcher):
+    """Finds changes by scanning the tree repeatedly.
+
+    Args:
+        interval: The time between two scans, in seconds.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        files: Iterable[Path] = (),
+        settle: float = DEFAULT_SETTLE,
+        interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        super().__init__(root, files, settle)
+        self.interval = interval
+        self.state = self._scan()
+
+    def _scan(self) -> dict[Path, tuple[int, int]]:
+        state = {}
+        paths = [
+            Path(directory, name)
+            for directory, filenames in _walk(self.root)
+            for name in filenames
+        ]
+        for path in paths + self.files:
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            state[path] = (stat.st_mtime_ns, stat.st_size)
+        return state
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = set()
+        while True:
+            if changed:
+                time.sleep(self.settle)
+            elif deadline is None:
+                time.sleep(self.interval)
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return set()
+                time.sleep(min(self.interval, remaining))
+
+            state = self._scan()
+            new = {
+                path
+                for path in state.keys() | self.state.keys()
+                if state.get(path) != self.state.get(path)
+            }
+            self.state = state
+            if new:
+                changed |= new
+            elif changed:
+                return changed
+
+
+class InotifyWatcher(Watcher):
+    """Finds changes using inotify.
+
+    Raises:
+        OSError: If inotify is not available or the watches can not be added.
+    """
+
+    def __init__(
+        self, root: Path, files: Iterable[Path] = (), settle: float = DEFAULT_SETTLE
+    ):
+        super().__init__(root, files, settle)
+        self.libc = _get_libc()
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        # watch descriptor -> watched directory
+        self.directories: dict[int, Path] = {}
+        # watch descriptor -> names of the only files reported in the directory,
+        # for directories outside of the tree
+        self.only: dict[int, set[str]] = {}
+        try:
+            self._add_tree(self.root)
+            for file in self.files:
+                wd = self._add_watch(file.parent)
+                if wd not in self.directories or wd in self.only:
+                    self.directories[wd] = file.parent
+                    self.only.setdefault(wd, set()).add(file.name)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, directory: Path) -> int:
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno), str(directory))
+        return wd
+
+    def _add_tree(self, root: Path, changed: set[Path] | None = None):
+        """Watches every directory of a tree. If changed is given, the tree is new and all files in it are added to changed, since they may have been created before the watches were added."""
+        for directory, filenames in _walk(root):
+            try:
+                self.directories[self._add_watch(Path(directory))] = Path(directory)
+            except OSError:
+                if changed is None:
+                    raise
+                # the directory was removed again already
+                continue
+            if changed is not None:
+                changed.update(Path(directory, name) for name in filenames)
+
+    def _remove_tree(self, root: Path):
+        for wd, directory in list(self.directories.items()):
+            if directory == root or root in directory.parents:
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.directories[wd]
+
+    def _read(self, changed: set[Path]):
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+                offset += length
+                self._handle(wd, mask, name, changed)
+
+    def _handle(self, wd: int, mask: int, name: str, changed: set[Path]):
+        if mask & IN_Q_OVERFLOW:
+            changed.add(self.root)
+            return
+        if mask & IN_IGNORED:
+            self.directories.pop(wd, None)
+            self.only.pop(wd, None)
+            return
+
+        directory = self.directories.get(wd)
+        if directory is None or not name:
+            return
+        if wd in self.only:
+            if name in self.only[wd]:
+                changed.add(directory / name)
+            return
+
+        path = directory / name
+        if mask & IN_ISDIR:
+            if is_skipped(name):
+                return
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._add_tree(path, changed)
+            elif mask & IN_MOVED_FROM:
+                self._remove_tree(path)
+        changed.add(path)
+
+    def wait(self, timeout: float | None = None) -> set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        changed = set()
+        while True:
+            if changed:
+                wait_time = self.settle
+            elif deadline is None:
+                wait_time = None
+            else:
+                wait_time = max(0, deadline - time.monotonic())
+
+            readable, _, _ = select.select([self.fd], [], [], wait_time)
+            if readable:
+                self._read(changed)
+            elif changed or deadline is not None:
+                return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def _get_libc() -> ctypes.CDLL:
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    libc.inotify_rm_watch.argtypes = [ctypes.c_int, ctypes.c_int]
+    return libc
+
+
+def create_watcher(
+    root: Path, files: Iterable[Path] = (), polling: bool = False
+) -> Watcher:
+    """Creates the best available watcher for a tree, using inotify if possible and polling otherwise.
+
+    Args:
+        root: The root of the watched tree.
+        files: Files outside of the tree to watch as well.
+        polling: If the tree should be polled even if inotify is available.
+    """
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root, files)
+        except (OSError, AttributeError):
+            pass
+    return PollingWatcher(root, files)
@@ -0,0 +1,87 @@
+import yaml
+from utils import main_wrapper, populate_dir
+
+from challtools import cache
+from challtools.cache import cached_validate, get_cache_dir
+
+
+def fail_parsing(*args, **kwargs):
+    raise AssertionError("the config should not be parsed")
+
+
+class Test_cached_validate:
+    def test_hit(self, tmp_path, monkeypatch):
+        populate_dir(tmp_path, "minimal_valid")
+        first = cached_validate(tmp_path / "challenge.yml")
+        assert first[0]
+
+        monkeypatch.setattr(yaml, "safe_load", fail_parsing)
+        assert cached_validate(tmp_path / "challenge.yml") == first
+
+    def test_changed(self, tmp_path):
+        populate_dir(tmp_path, "minimal_valid")
+        assert cached_validate(tmp_path / "challenge.yml")[0]
+
+        with (tmp_path / "challenge.yml").open("a") as f:
+            f.write("\nscore: not a number\n")
+        valid, messages, normalized_config = cached_validate(tmp_path / "challenge.yml")
+        assert not valid
+        assert normalized_config is None
+        assert any(message["code"] == "A002" for message in messages)
+
+    def test_ctf_config(self, tmp_path):
+        populate_dir(tmp_path, "simple_ctf")
+        path = tmp_path / "chall1" / "challenge.yml"
+        messages = cached_validate(path)[1]
+        assert any(message["code"] == "B001" for message in messages)
+        messages = cached_validate(path, ctf_config_path=tmp_path / "ctf.yml")[1]
+        assert not any(message["code"] == "B001" for message in messages)
+
+    def test_downloadable_files(self, tmp_path):
+        populate_dir(tmp_path, "minimal_valid")
+        with (tmp_path / "challenge.yml").open("a") as f:
+            f.write("\ndownloadable_files: file.txt\n")
+
+        messages = cached_validate(tmp_path / "challenge.yml", challdir=tmp_path)[1]
+        assert any(message["code"] == "A003" for message in messages)
+
+        (tmp_path / "file.txt").touch()
+        messages = cached_validate(tmp_path / "challenge.yml", challdir=tmp_path)[1]
+        assert not any(message["code"] == "A003" for message in messages)
+
+    def test_disabled(self, tmp_path, monkeypatch):
+        populate_dir(tmp_path, "minimal_valid")
+        monkeypatch.setenv("CHALLTOOLS_NO_CACHE", "1")
+        assert cached_validate(tmp_path / "challenge.yml")[0]
+        assert not get_cache_dir(tmp_path).exists()
+
+    def test_eviction(self, tmp_path, monkeypatch):
+        populate_dir(tmp_path, "minimal_valid")
+        monkeypatch.setattr(cache, "MAX_VALIDATION_ENTRIES", 2)
+        for i in range(4):
+            (tmp_path / "challenge.yml").write_text(
+                (tmp_path / "challenge.yml").read_text() + f"\n# {i}\n"
+            )
+            cached_validate(tmp_path / "challenge.yml")
+        assert len(list((get_cache_dir(tmp_path) / "validation").glob("*.json"))) == 2
+
+
+class Test_get_cache_dir:
+    def test_ctf_root(self, tmp_path):
+        populate_dir(tmp_path, "simple_ctf")
+        assert get_cache_dir(tmp_path / "chall1" / "challenge.yml") == (
+            tmp_path / ".challtools" / "cache"
+        )
+
+    def test_no_ctf(self, tmp_path):
+        populate_dir(tmp_path, "minimal_valid")
+        assert get_cache_dir(tmp_path) == tmp_path / ".challtools" / "cache"
+
+
+class Test_cli:
+    def test_no_cache(self, tmp_path, monkeypatch):
+        populate_dir(tmp_path, "minimal_valid")
+        # --no-cache sets the variable, so make sure it is restored afterwards
+        monkeypatch.setenv("CHALLTOOLS_NO_CACHE", "")
+        assert main_wrapper(["--no-cache", "validate"]) == 0
+        assert not get_cache_dir(tmp_path).exists()
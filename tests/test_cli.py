@@ -1,10 +1,25 @@
+import io
+import json
 import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 import pytest
 import yaml
-from utils import inittemplatepath, main_wrapper, populate_dir
-
+from utils import (
+    FakeDockerClient,
+    ScriptedWatcher,
+    inittemplatepath,
+    main_wrapper,
+    populate_dir,
+)
+
+from challtools import watch
+from challtools.builtins import build, push, solveall
+from challtools.builtins.allchalls import run_isolated
+from challtools.exceptions import CriticalException
+from challtools.ports import stable_port
 from challtools.utils import build_chall, get_valid_config, create_docker_name
 
 
@@ -14,6 +29,30 @@ class Test_allchalls:
         assert main_wrapper(["allchalls", "validate"]) == 0
         assert capsys.readouterr().out.count("Validation succeeded.") == 3
 
+    def test_parallel(self, tmp_path, capsys):
+        populate_dir(tmp_path, "simple_ctf")
+        assert main_wrapper(["allchalls", "-j", "2", "validate"]) == 0
+        out = capsys.readouterr().out
+        assert out.count("Validation succeeded.") == 3
+        assert "3/3 challenges ran, 0 failed" in out
+
+    def test_parallel_failure(self, tmp_path, capsys):
+        populate_dir(tmp_path, "simple_ctf")
+        (tmp_path / "chall2" / "challenge.yml").write_text("title: broken\n")
+        assert main_wrapper(["allchalls", "-j", "2", "validate"]) == 1
+        out = capsys.readouterr().out
+        assert out.count("Validation succeeded.") == 2
+        assert "3/3 challenges ran, 1 failed" in out
+
+    def test_cancelled(self, tmp_path):
+        populate_dir(tmp_path, "simple_ctf")
+        processes = set()
+        cancel = threading.Event()
+        cancel.set()
+        path = tmp_path / "chall1" / "challenge.yml"
+        assert run_isolated(["validate"], path, processes, cancel) is None
+        assert not processes
+
     def test_no_ctf_config(self, tmp_path):
         populate_dir(tmp_path, "simple_ctf")
         Path("ctf.yml").unlink()
@@ -40,6 +79,72 @@ class Test_validate:
         assert main_wrapper(["validate"]) == 1
         assert "A002" in capsys.readouterr().out
 
+    def test_jsonl(self, tmp_path, capsys):
+        populate_dir(tmp_path, "minimal_valid")
+        assert main_wrapper(["validate", "--format", "jsonl"]) == 0
+        record = json.loads(capsys.readouterr().out)
+        assert record["valid"]
+        assert record["path"] == str(tmp_path / "challenge.yml")
+
+    def test_all(self, tmp_path, capsys):
+        populate_dir(tmp_path, "simple_ctf")
+        assert main_wrapper(["validate", "--all"]) == 0
+        assert capsys.readouterr().out.count("Validation succeeded.") == 3
+
+    def test_all_jsonl(self, tmp_path, capsys):
+        populate_dir(tmp_path, "simple_ctf")
+        (tmp_path / "chall2" / "challenge.yml").write_text("title: [")
+        assert main_wrapper(["validate", "--all", "--format", "jsonl", "-j", "2"]) == 1
+        records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+        assert len(records) == 3
+        invalid = [record for record in records if not record["valid"]]
+        assert len(invalid) == 1
+        assert invalid[0]["path"] == str(tmp_path / "chall2" / "challenge.yml")
+        assert invalid[0]["messages"][0]["code"] == "A009"
+
+    def test_all_no_ctf_config(self, tmp_path):
+        populate_dir(tmp_path, "minimal_valid")
+        assert main_wrapper(["validate", "--all"]) == 1
+
+    def test_watch(self, tmp_path, capsys, monkeypatch):
+        populate_dir(tmp_path, "minimal_valid")
+        config = (tmp_path / "challenge.yml").read_text()
+        watcher = ScriptedWatcher(
+            [
+                (tmp_path / "challenge.yml", config + "unknown_field: 1\n"),
+                (tmp_path / "challenge.yml", config + "# comment\n"),
+                (tmp_path / "challenge.yml", config),
+            ]
+        )
+        monkeypatch.setattr(watch, "create_watcher", lambda root, files=(): watcher)
+        assert main_wrapper(["validate", "--watch"]) == 0
+
+        out = capsys.readouterr().out
+        assert out.count("Validation succeeded.") == 1
+        added, resolved, unchanged = out.split("Watching")[1:4]
+        assert "+\x1b[0m [\x1b[1;31mCRITICAL" in added and "A002" in added
+        assert "-\x1b[0m [\x1b[1;31mCRITICAL" in resolved and "A002" in resolved
+        assert "challenge.yml: no changes" in unchanged
+
+    def test_watch_all(self, tmp_path, capsys, monkeypatch):
+        populate_dir(tmp_path, "simple_ctf")
+        watcher = ScriptedWatcher(
+            [
+                (tmp_path / "chall2" / "challenge.yml", "title: ["),
+                (tmp_path / "ctf.yml", "categories:\n  - nonexistent\n"),
+            ]
+        )
+        monkeypatch.setattr(watch, "create_watcher", lambda root, files=(): watcher)
+        assert main_wrapper(["validate", "--all", "--watch", "-j", "1"]) == 1
+
+        initial, chall2_changed, ctf_changed = capsys.readouterr().out.split(
+            "Watching"
+        )[:3]
+        assert initial.count("Validation succeeded.") == 3
+        assert "chall1" not in chall2_changed
+        assert "chall2" in chall2_changed and "A009" in chall2_changed
+        assert ctf_changed.count("B002") == 2
+
 
 class Test_build:
     # TODO build scripts
@@ -48,6 +153,57 @@ class Test_build:
         assert main_wrapper(["build"]) == 0
         assert "nothing to do" in capsys.readouterr().out.lower()
 
+    def test_watch(self, tmp_path, capsys, monkeypatch):
+        populate_dir(tmp_path, "trivial_tcp")
+        config = (tmp_path / "challenge.yml").read_text()
+        client = FakeDockerClient()
+        watcher = ScriptedWatcher(
+            [
+                (tmp_path / "container" / "Dockerfile", "FROM alpine\n"),
+                (tmp_path / "README.md", "not part of the build context"),
+                (tmp_path / "challenge.yml", config + "# comment\n"),
+                (tmp_path / "challenge.yml", config.replace("1337", "1338")),
+            ]
+        )
+        monkeypatch.setattr(watch, "create_watcher", lambda root, files=(): watcher)
+        monkeypatch.setattr(build, "get_docker_client", lambda: client)
+        assert main_wrapper(["build", "--watch"]) == 0
+
+        tag = "challtools_test_challenge_f9629917705648c9"
+        # the initial build and the Dockerfile change, changes to the config
+        # that don't affect the image don't build it again
+        assert client.builds == [tag, tag]
+        assert capsys.readouterr().out.count("Images rebuilt successfully!") == 1
+
+    def test_watch_retry(self, tmp_path, capsys, monkeypatch):
+        populate_dir(tmp_path, "trivial_tcp")
+        client = FakeDockerClient()
+        clients = [None, client]
+
+        def get_docker_client():
+            current = clients.pop(0)
+            if current is None:
+                raise CriticalException("Could not connect to the Docker daemon")
+            return current
+
+        watcher = ScriptedWatcher(
+            [
+                (tmp_path / "container" / "Dockerfile", "FROM alpine\n"),
+                (tmp_path / "container" / "Dockerfile", "FROM alpine:3\n"),
+            ]
+        )
+        monkeypatch.setattr(watch, "create_watcher", lambda root, files=(): watcher)
+        monkeypatch.setattr(build, "get_docker_client", get_docker_client)
+        assert main_wrapper(["build", "--watch"]) == 0
+
+        tag = "challtools_test_challenge_f9629917705648c9"
+        # the failed initial build is done in full once the daemon is up
+        assert client.builds == [tag, tag]
+        out = capsys.readouterr().out
+        assert "Could not connect" in out
+        assert out.count("Challenge built successfully!") == 1
+        assert out.count("Images rebuilt successfully!") == 1
+
     @pytest.mark.fails_without_docker
     def test_single(self, tmp_path, docker_client, clean_container_state):
         populate_dir(tmp_path, "trivial_tcp")
@@ -116,6 +272,120 @@ class Test_solve:
         assert "could not be solved" in capsys.readouterr().out.lower()
 
 
+class Test_checkflag:
+    def test_args(self, tmp_path, capsys):
+        populate_dir(tmp_path, "minimal_valid")
+        assert main_wrapper(["checkflag", "CTF{d3f4ul7_fl46}"]) == 0
+        assert main_wrapper(["checkflag", "CTF{d3f4ul7_fl46}", "CTF{wrong}"]) == 1
+        out = capsys.readouterr().out
+        assert "CTF{d3f4ul7_fl46}: correct" in out
+        assert "CTF{wrong}: incorrect" in out
+
+    def test_no_flags(self, tmp_path, capsys):
+        populate_dir(tmp_path, "minimal_valid")
+        assert main_wrapper(["checkflag"]) == 1
+        assert "no flags to check" in capsys.readouterr().out.lower()
+
+    def test_stdin(self, tmp_path, capsys, monkeypatch):
+        populate_dir(tmp_path, "minimal_valid")
+        monkeypatch.setattr(
+            "sys.stdin",
+            io.StringIO("CTF{d3f4ul7_fl46}\r\n\nCTF{wrong}\nCTF{d3f4ul7_fl46}"),
+        )
+        assert main_wrapper(["checkflag", "--stdin"]) == 1
+        out = capsys.readouterr().out
+        assert "Checked 3 submissions" in out
+        assert "text   d3f4ul7_fl46: 2" in out
+        assert "2 correct" in out
+        assert "1 incorrect" in out
+
+    def test_csv(self, tmp_path, capsys):
+        populate_dir(tmp_path, "simple_ctf")
+        (tmp_path / "submissions.csv").write_text(
+            "challenge_id,submission\n"
+            "edce939f-1f76-4a60-845d-f2d79dc8535d,CTF{d3f4ul7_fl46}\n"
+            '42b2814e-c71c-4c32-806c-1201f6a1eef9,"CTF{wrong,flag}"\n'
+            "00000000-0000-0000-0000-000000000000,CTF{d3f4ul7_fl46}\n"
+        )
+        assert main_wrapper(["checkflag", "--csv", "submissions.csv"]) == 1
+        out = capsys.readouterr().out
+        assert "Checked 3 submissions" in out
+        assert "chall1           1          0" in out
+        assert "chall2           0          1" in out
+        assert "1 submissions to unknown challenge ID 00000000" in out
+        assert "1 correct" in out
+
+    def test_csv_malformed(self, tmp_path, capsys):
+        populate_dir(tmp_path, "simple_ctf")
+        (tmp_path / "submissions.csv").write_text("only_one_column\n")
+        assert main_wrapper(["checkflag", "--csv", "submissions.csv"]) == 1
+        assert "does not have exactly two columns" in capsys.readouterr().out
+
+    def test_collisions(self, tmp_path, capsys):
+        populate_dir(tmp_path, "simple_ctf")
+        assert main_wrapper(["checkflag", "--collisions"]) == 1
+        assert "CTF{d3f4ul7_fl46}: chall1, chall2, chall3" in capsys.readouterr().out
+
+        for i in [2, 3]:
+            config_path = tmp_path / f"chall{i}" / "challenge.yml"
+            config_path.write_text(
+                config_path.read_text().replace("d3f4ul7_fl46", f"flag_{i}")
+            )
+        assert main_wrapper(["checkflag", "--collisions"]) == 0
+        assert "No flag is accepted by more than one challenge" in (
+            capsys.readouterr().out
+        )
+
+
+class Test_solveall:
+    def test_no_ctf_config(self, tmp_path, capsys):
+        populate_dir(tmp_path, "minimal_valid")
+        assert main_wrapper(["solveall"]) == 1
+        assert "no ctf configuration file" in capsys.readouterr().out.lower()
+
+    def test_no_solution(self, tmp_path, capsys):
+        populate_dir(tmp_path, "simple_ctf")
+        assert main_wrapper(["solveall", "-j", "2"]) == 0
+        out = capsys.readouterr().out
+        assert "chall1: skipped" in out
+        assert "0 solved, 0 failed, 0 timed out, 3 skipped" in out
+
+    def test_unexpected_error(self, tmp_path, capsys, monkeypatch):
+        (tmp_path / "ctf.yml").touch()
+        for name in ["chall1", "chall2"]:
+            (tmp_path / name).mkdir()
+            populate_dir(tmp_path / name, "trivial_tcp_solution")
+        os.chdir(tmp_path)
+
+        def get_docker_client():
+            raise OSError("socket unavailable")
+
+        monkeypatch.setattr(solveall, "get_docker_client", get_docker_client)
+        assert main_wrapper(["solveall", "-j", "2"]) == 1
+        out = capsys.readouterr().out
+        assert out.count("(OSError: socket unavailable)") == 2
+        assert "0 solved, 2 failed, 0 timed out, 0 skipped" in out
+
+    @pytest.mark.fails_without_docker
+    def test_ok(self, tmp_path, capsys, clean_container_state):
+        (tmp_path / "ctf.yml").touch()
+        (tmp_path / "chall1").mkdir()
+        (tmp_path / "chall2").mkdir()
+        populate_dir(tmp_path / "chall1", "trivial_tcp_solution")
+        build_chall(get_valid_config())
+        populate_dir(tmp_path / "chall2", "broken_solution")
+        build_chall(get_valid_config())
+        os.chdir(tmp_path)
+        assert main_wrapper(["solveall", "-j", "2"]) == 1
+        out = capsys.readouterr().out
+        assert "chall1: solved" in out
+        assert "chall2: failed" in out
+
+
+def stable_compose_port(title, name, internal_port):
+    return stable_port(f"{title}/{name}/{internal_port}", 50000, 65535)
+
+
 class Test_compose:
     # TODO challenges with muliple containers
     def test_no_service(self, tmp_path):
@@ -129,12 +399,13 @@ class Test_compose:
         assert Path("compose.yml").exists()
         compose = yaml.safe_load(Path("compose.yml").read_text())
         assert len(compose) == 1
+        name = create_docker_name(
+            "Challtools test", container_name="challenge", chall_id=None
+        )
         assert compose.get("services") == {
-            create_docker_name(
-                "Challtools test", container_name="challenge", chall_id=None
-            ): {
+            name: {
                 "build": "container",
-                "ports": ["50000:1337"],
+                "ports": [f"{stable_compose_port('Challtools test', name, 1337)}:1337"],
                 "privileged": True,
                 "restart": "always",
             }
@@ -146,12 +417,13 @@ class Test_compose:
         assert Path("compose.yml").exists()
         compose = yaml.safe_load(Path("compose.yml").read_text())
         assert len(compose) == 1
+        name = create_docker_name(
+            "Challtools test", container_name="custom-container-name", chall_id=None
+        )
         assert compose.get("services") == {
-            create_docker_name(
-                "Challtools test", container_name="custom-container-name", chall_id=None
-            ): {
+            name: {
                 "build": "container",
-                "ports": ["50000:1337"],
+                "ports": [f"{stable_compose_port('Challtools test', name, 1337)}:1337"],
                 "privileged": True,
                 "restart": "always",
             }
@@ -166,17 +438,83 @@ class Test_compose:
         assert compose.get("services") == {
             "custom-container-name-1": {
                 "build": "container",
-                "ports": ["50000:1337"],
+                "ports": [
+                    f"{stable_compose_port('Challtools test', 'custom-container-name-1', 1337)}:1337"
+                ],
                 "privileged": True,
                 "restart": "always",
             },
             "custom-container-name-2": {
                 "build": "container",
-                "ports": ["50001:7331"],
+                "ports": [
+                    f"{stable_compose_port('Challtools test', 'custom-container-name-2', 7331)}:7331"
+                ],
                 "restart": "always",
             },
         }
 
+    def test_explicit_port_reserved(self, tmp_path):
+        populate_dir(tmp_path, "custom_container_name_multiple")
+        port = stable_compose_port("Challtools test", "custom-container-name-1", 1337)
+        config = yaml.safe_load(Path("challenge.yml").read_text())
+        containers = config["deployment"]["containers"]
+        containers["custom-container-name-2"]["services"][0]["external_port"] = port
+        Path("challenge.yml").write_text(yaml.dump(config))
+        assert main_wrapper(["compose"]) == 0
+        compose = yaml.safe_load(Path("compose.yml").read_text())
+        assert compose["services"]["custom-container-name-1"]["ports"] == [
+            f"{port + 1 if port < 65535 else 50000}:1337"
+        ]
+        assert compose["services"]["custom-container-name-2"]["ports"] == [
+            f"{port}:7331"
+        ]
+
+    def test_stable_ports(self, tmp_path):
+        populate_dir(tmp_path, "custom_container_name_collision_single")
+        assert main_wrapper(["compose", "--all"]) == 0
+        compose = yaml.safe_load(Path("compose.yml").read_text())
+
+        # adding a challenge does not move the ports of the others
+        (tmp_path / "chall0").mkdir()
+        populate_dir(tmp_path / "chall0", "trivial_tcp")
+        os.chdir(tmp_path)
+        assert main_wrapper(["compose", "--all"]) == 0
+        new_compose = yaml.safe_load(Path("compose.yml").read_text())
+        assert len(new_compose["services"]) == 3
+        for name, service in compose["services"].items():
+            assert new_compose["services"][name] == service
+
+    def test_incremental(self, tmp_path, capsys):
+        populate_dir(tmp_path, "custom_container_name_multiple")
+        assert main_wrapper(["compose"]) == 0
+        compose = yaml.safe_load(Path("compose.yml").read_text())
+
+        # ports edited by hand are kept as long as the service is unchanged
+        compose["services"]["custom-container-name-1"]["ports"] = ["51234:1337"]
+        compose["services"]["custom-container-name-2"]["ports"] = ["51235:7331"]
+        compose["services"]["removed"] = {"image": "removed", "ports": []}
+        Path("compose.yml").write_text(yaml.dump(compose))
+        config = yaml.safe_load(Path("challenge.yml").read_text())
+        config["deployment"]["containers"]["custom-container-name-2"][
+            "privileged"
+        ] = True
+        Path("challenge.yml").write_text(yaml.dump(config))
+        capsys.readouterr()
+
+        assert main_wrapper(["compose", "--incremental"]) == 0
+        new_compose = yaml.safe_load(Path("compose.yml").read_text())
+        assert new_compose["services"]["custom-container-name-1"]["ports"] == [
+            "51234:1337"
+        ]
+        assert new_compose["services"]["custom-container-name-2"]["ports"] == [
+            f"{stable_compose_port('Challtools test', 'custom-container-name-2', 7331)}:7331"
+        ]
+        assert "removed" not in new_compose["services"]
+        out = capsys.readouterr().out
+        assert "Changed service custom-container-name-2" in out
+        assert "Removed service removed" in out
+        assert "0 added, 1 changed, 1 removed, 1 unchanged" in out
+
     def test_custom_container_name_collision_single(self, tmp_path, capsys):
         populate_dir(tmp_path, "custom_container_name_collision_single")
         assert main_wrapper(["compose", "--all", "--restart-policy", "always"]) == 0
@@ -216,6 +554,121 @@ class Test_compose:
         )
 
 
+@pytest.fixture()
+def platform():
+    """A fake platform recording every pushed challenge, rejecting the ones listed in ``rejected``."""
+    pushed = []
+    rejected = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            pushed.append((self.path, self.headers["X-API-Key"], payload))
+            status = 400 if payload["challenge_id"] in rejected else 200
+            body = json.dumps({"message": "rejected"}).encode()
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    server.pushed = pushed
+    server.rejected = rejected
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+class Test_push:
+    def configure_platform(self, path, platform):
+        (path / "ctf.yml").write_text(
+            yaml.safe_dump(
+                {
+                    "custom": {
+                        "platform_url": platform.url,
+                        "platform_api_key": "key",
+                    }
+                }
+            )
+        )
+
+    def test_all_no_ctf_config(self, tmp_path, capsys):
+        populate_dir(tmp_path, "minimal_valid")
+        assert main_wrapper(["push", "--all"]) == 1
+        assert "no ctf configuration file" in capsys.readouterr().out.lower()
+
+    def test_all_no_platform(self, tmp_path, capsys):
+        populate_dir(tmp_path, "simple_ctf")
+        assert main_wrapper(["push", "--all", "--skip-files"]) == 1
+        assert "platform url not configured" in capsys.readouterr().out.lower()
+
+    def test_all(self, tmp_path, capsys, platform):
+        populate_dir(tmp_path, "simple_ctf")
+        self.configure_platform(tmp_path, platform)
+        assert (
+            main_wrapper(
+                [
+                    "push",
+                    "--all",
+                    "--skip-files",
+                    "--skip-container-push",
+                    "--challenge-jobs",
+                    "2",
+                ]
+            )
+            == 0
+        )
+        assert len(platform.pushed) == 3
+        assert all(
+            path == "/api/admin/push_challenge" and key == "key"
+            for path, key, _ in platform.pushed
+        )
+        out = capsys.readouterr().out
+        assert "chall1: pushed" in out
+        assert "3 pushed, 0 failed" in out
+
+    def test_all_failure(self, tmp_path, capsys, platform):
+        populate_dir(tmp_path, "simple_ctf")
+        self.configure_platform(tmp_path, platform)
+        platform.rejected.add("42b2814e-c71c-4c32-806c-1201f6a1eef9")
+        assert (
+            main_wrapper(["push", "--all", "--skip-files", "--skip-container-push"])
+            == 1
+        )
+        assert len(platform.pushed) == 3
+        out = capsys.readouterr().out
+        assert "chall2: failed" in out
+        assert "status 400 - rejected" in out
+        assert "2 pushed, 1 failed" in out
+
+    def test_single(self, tmp_path, capsys, platform):
+        populate_dir(tmp_path, "simple_ctf")
+        self.configure_platform(tmp_path, platform)
+        os.chdir(tmp_path / "chall3")
+        assert main_wrapper(["push", "--skip-files", "--skip-container-push"]) == 0
+        assert [payload["challenge_id"] for _, _, payload in platform.pushed] == [
+            "920fa577-cf26-4b02-afb9-ff3d29fcb753"
+        ]
+        assert "Challenge pushed!" in capsys.readouterr().out
+
+    def test_session_docker_client(self, monkeypatch):
+        clients = []
+        monkeypatch.setattr(
+            push,
+            "get_docker_client",
+            lambda: clients.append(FakeDockerClient()) or clients[-1],
+        )
+        session = push.PushSession({})
+        assert session.get_docker() is session.get_docker()
+        assert len(clients) == 1
+
+
 class Test_ensureid:
     def test_ok(self, tmp_path, capsys):
         populate_dir(tmp_path, "minimal_valid")
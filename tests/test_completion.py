@@ -0,0 +1,112 @@
+import os
+import subprocess
+import sys
+
+from utils import populate_dir
+
+from challtools.completion import (
+    deserialize_parser,
+    get_completion_parser,
+    get_manifest_path,
+    serialize_parser,
+)
+from challtools.entry import build_parser, load_plugin_modules
+
+
+def build_plugin_parser(plugins_dir):
+    return build_parser(load_plugin_modules(plugins_dir))[0]
+
+
+def complete(path, line):
+    output = path / "completions"
+    env = dict(
+        os.environ,
+        _ARGCOMPLETE="1",
+        COMP_LINE=line,
+        COMP_POINT=str(len(line)),
+        _ARGCOMPLETE_STDOUT_FILENAME=str(output),
+    )
+    subprocess.run([sys.executable, "-m", "challtools"], cwd=path, env=env, check=True)
+    return output.read_text().split("\v")
+
+
+class Test_serialize_parser:
+    def test_roundtrip(self, tmp_path):
+        populate_dir(tmp_path, "plugin_dir")
+        parser = build_plugin_parser(tmp_path / ".challtools" / "plugins")
+        data = serialize_parser(parser)
+        assert serialize_parser(deserialize_parser(data)) == data
+
+    def test_completer(self, tmp_path):
+        populate_dir(tmp_path, "plugin_dir")
+        parser = build_plugin_parser(tmp_path / ".challtools" / "plugins")
+        rebuilt = deserialize_parser(serialize_parser(parser))
+        init_parser = rebuilt._subparsers._group_actions[0].choices["init"]
+        template_action = next(
+            action for action in init_parser._actions if action.dest == "template"
+        )
+        assert "default" in template_action.completer()
+
+
+class Test_get_completion_parser:
+    def test_cached(self, tmp_path):
+        populate_dir(tmp_path, "plugin_dir")
+        plugins_dir = tmp_path / ".challtools" / "plugins"
+        builds = []
+
+        def build():
+            builds.append(None)
+            return build_plugin_parser(plugins_dir)
+
+        get_completion_parser(plugins_dir, build)
+        assert get_manifest_path(plugins_dir).is_file()
+        parser = get_completion_parser(plugins_dir, build)
+        assert len(builds) == 1
+        assert "test_command" in parser._subparsers._group_actions[0].choices
+
+    def test_plugin_changed(self, tmp_path):
+        populate_dir(tmp_path, "plugin_dir")
+        plugins_dir = tmp_path / ".challtools" / "plugins"
+        get_completion_parser(plugins_dir, lambda: build_plugin_parser(plugins_dir))
+
+        plugin_file = plugins_dir / "test_plugin" / "__init__.py"
+        plugin_file.write_text(
+            plugin_file.read_text().replace("test_command", "other_command")
+        )
+        parser = get_completion_parser(
+            plugins_dir, lambda: build_plugin_parser(plugins_dir)
+        )
+        assert "other_command" in parser._subparsers._group_actions[0].choices
+
+    def test_unserializable_completer(self, tmp_path):
+        populate_dir(tmp_path, "plugin_dir")
+        plugins_dir = tmp_path / ".challtools" / "plugins"
+
+        def build():
+            parser = build_plugin_parser(plugins_dir)
+            parser.add_argument("--thing").completer = lambda **kwargs: ["a"]
+            return parser
+
+        get_completion_parser(plugins_dir, build)
+        assert not get_manifest_path(plugins_dir).exists()
+
+    def test_disabled(self, tmp_path, monkeypatch):
+        populate_dir(tmp_path, "plugin_dir")
+        monkeypatch.setenv("CHALLTOOLS_NO_CACHE", "1")
+        plugins_dir = tmp_path / ".challtools" / "plugins"
+        get_completion_parser(plugins_dir, lambda: build_plugin_parser(plugins_dir))
+        assert not get_manifest_path(plugins_dir).exists()
+
+
+class Test_completion:
+    def test_plugin_command(self, tmp_path):
+        populate_dir(tmp_path, "plugin_dir")
+        assert complete(tmp_path, "challtools test_") == ["test_command "]
+        # the second completion is served from the manifest
+        assert (tmp_path / ".challtools" / "cache" / "completion.json").is_file()
+        assert complete(tmp_path, "challtools test_") == ["test_command "]
+
+    def test_completer(self, tmp_path):
+        populate_dir(tmp_path, "plugin_dir")
+        complete(tmp_path, "challtools ")
+        assert "default" in complete(tmp_path, "challtools init ")
@@ -0,0 +1,94 @@
+import os
+from pathlib import Path
+
+import pytest
+from utils import populate_dir
+
+from challtools import context as context_module
+from challtools.context import _CTF, _Challenge, context
+
+
+@pytest.fixture(autouse=True)
+def rundir(tmp_path, monkeypatch):
+    monkeypatch.setattr(context, "rundir", tmp_path)
+    context.invalidate()
+    yield
+    context.invalidate()
+
+
+class Test_CTF:
+    def test_missing(self, tmp_path):
+        populate_dir(tmp_path, "minimal_valid")
+        assert context.ctf is None
+
+    def test_shared(self, tmp_path):
+        populate_dir(tmp_path, "simple_ctf")
+        assert context.ctf is _CTF()
+        assert context.ctf is _CTF(search_start=tmp_path / "chall1")
+        assert context.ctf.challenges[0] is _Challenge(
+            context.ctf.challenges[0].config_path
+        )
+
+    def test_parsed_once(self, tmp_path, monkeypatch):
+        populate_dir(tmp_path, "simple_ctf")
+        loads = []
+        load_yaml = context_module.load_yaml
+        monkeypatch.setattr(
+            context_module,
+            "load_yaml",
+            lambda path: loads.append(path) or load_yaml(path),
+        )
+        assert all(challenge.valid for challenge in context.ctf.challenges)
+        assert loads.count(tmp_path / "ctf.yml") == 1
+        assert len(loads) == len(context.ctf.challenges) + 1
+
+    def test_validated_against_ctf(self, tmp_path):
+        populate_dir(tmp_path, "simple_ctf")
+        for challenge in context.ctf.challenges:
+            assert challenge.ctf is context.ctf
+            assert challenge.valid
+            assert "B001" not in [m["code"] for m in challenge.validator_messages]
+
+        (tmp_path / "ctf.yml").write_text("categories:\n  - nonexistent\n")
+        context.ctf.invalidate()
+        for challenge in context.ctf.challenges:
+            assert "B002" in [m["code"] for m in challenge.validator_messages]
+
+    def test_invalidate_challenges(self, tmp_path):
+        populate_dir(tmp_path, "simple_ctf")
+        assert len(context.ctf.challenges) == 3
+        (tmp_path / "chall3" / "challenge.yml").unlink()
+        assert len(context.ctf.challenges) == 3
+        context.ctf.invalidate()
+        assert len(context.ctf.challenges) == 2
+
+
+class Test_Challenge:
+    def test_standalone(self, tmp_path):
+        populate_dir(tmp_path, "minimal_valid")
+        assert context.challenge.ctf is None
+        assert context.challenge is _Challenge()
+        assert "B001" in [m["code"] for m in context.challenge.validator_messages]
+
+    def test_in_ctf(self, tmp_path, monkeypatch):
+        populate_dir(tmp_path, "simple_ctf")
+        monkeypatch.setattr(context, "rundir", tmp_path / "chall2")
+        assert context.challenge.ctf is context.ctf
+        assert context.challenge in context.ctf.challenges
+
+    def test_relative_rundir(self, tmp_path, monkeypatch):
+        populate_dir(tmp_path, "simple_ctf")
+        os.chdir(tmp_path)
+        monkeypatch.setattr(context, "rundir", Path("chall2"))
+        assert context.challenge.config_path.is_absolute()
+        assert context.challenge in context.ctf.challenges
+
+    def test_invalidate(self, tmp_path):
+        populate_dir(tmp_path, "minimal_valid")
+        challenge = context.challenge
+        assert challenge.valid
+        (tmp_path / "challenge.yml").write_text("title: 1\n")
+        assert challenge.valid
+        challenge.invalidate()
+        assert not challenge.valid
+        assert challenge.raw_config == {"title": 1}
@@ -0,0 +1,74 @@
+import pytest
+from utils import populate_dir
+
+from challtools.discovery import find_challenges, is_ignored, parse_ignore_rule
+
+
+def ignored(patterns, path, is_dir=True):
+    rules = [parse_ignore_rule(pattern) for pattern in patterns]
+    return is_ignored([rule for rule in rules if rule], path, is_dir)
+
+
+class Test_ignore_rules:
+    @pytest.mark.parametrize(
+        "pattern,path,expected",
+        [
+            ("drafts", "drafts", True),
+            ("drafts", "web/drafts", True),
+            ("drafts", "drafts_old", False),
+            ("/drafts", "web/drafts", False),
+            ("web/drafts", "web/drafts", True),
+            ("web/drafts", "pwn/web/drafts", False),
+            ("draft*", "web/drafts", True),
+            ("dr?fts", "drafts", True),
+            ("dr[a-c]fts", "drafts", True),
+            ("dr[!a]fts", "drafts", False),
+            ("**/drafts", "a/b/drafts", True),
+            ("web/**/drafts", "web/drafts", True),
+            ("web/**/drafts", "web/a/b/drafts", True),
+            ("web/**", "web/a", True),
+            ("web/**", "web", False),
+            ("# comment", "# comment", False),
+            ("\\#hash", "#hash", True),
+        ],
+    )
+    def test_pattern(self, pattern, path, expected):
+        assert ignored([pattern], path) == expected
+
+    def test_dir_only(self):
+        assert ignored(["drafts/"], "drafts", is_dir=True)
+        assert not ignored(["drafts/"], "drafts", is_dir=False)
+
+    def test_negation(self):
+        assert not ignored(["draft*", "!drafts"], "drafts")
+        assert ignored(["!drafts", "draft*"], "drafts")
+
+    def test_base(self):
+        rule = parse_ignore_rule("/drafts", "web")
+        assert is_ignored([rule], "web/drafts", True)
+        assert not is_ignored([rule], "drafts", True)
+
+
+class Test_find_challenges:
+    def test_simple(self, tmp_path):
+        populate_dir(tmp_path, "simple_ctf")
+        assert find_challenges(tmp_path) == [
+            tmp_path / "chall1" / "challenge.yml",
+            tmp_path / "chall2" / "challenge.yml",
+            tmp_path / "chall3" / "challenge.yml",
+        ]
+
+    def test_pruned(self, tmp_path):
+        populate_dir(tmp_path, "simple_ctf")
+        for directory in [".git", "node_modules", "chall1/nested"]:
+            (tmp_path / directory).mkdir()
+            (tmp_path / directory / "challenge.yml").touch()
+        assert len(find_challenges(tmp_path)) == 3
+
+    def test_ignore_file(self, tmp_path):
+        populate_dir(tmp_path, "simple_ctf")
+        (tmp_path / "category").mkdir()
+        (tmp_path / "chall1").rename(tmp_path / "category" / "chall1")
+        (tmp_path / ".challtoolsignore").write_text("chall2\n")
+        (tmp_path / "category" / ".challtoolsignore").write_text("/chall1\n")
+        assert find_challenges(tmp_path) == [tmp_path / "chall3" / "challenge.yml"]
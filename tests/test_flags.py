@@ -0,0 +1,162 @@
+import io
+
+import pytest
+
+from challtools.exceptions import CriticalException
+from challtools.flags import (
+    FlagIndex,
+    FlagMatcher,
+    parse_submissions,
+    split_records,
+)
+
+
+def make_config(flags, prefix="CTF{", suffix="}"):
+    return {"flags": flags, "flag_format_prefix": prefix, "flag_format_suffix": suffix}
+
+
+class Test_FlagMatcher:
+    def test_text(self):
+        matcher = FlagMatcher(
+            make_config(
+                [{"type": "text", "flag": "first"}, {"type": "text", "flag": "second"}]
+            )
+        )
+        assert matcher.match("CTF{first}") == 0
+        assert matcher.match("CTF{second}") == 1
+        assert matcher.match("CTF{third}") is None
+        assert matcher.match("first") is None
+        assert matcher.match("CTF{first") is None
+
+    def test_regex(self):
+        matcher = FlagMatcher(make_config([{"type": "regex", "flag": r"^\d{8}$"}]))
+        assert matcher.is_valid("CTF{12345678}")
+        assert not matcher.is_valid("CTF{1234567}")
+        assert not matcher.is_valid("12345678")
+
+    def test_first_match(self):
+        matcher = FlagMatcher(
+            make_config(
+                [
+                    {"type": "regex", "flag": r"^a"},
+                    {"type": "text", "flag": "abc"},
+                    {"type": "regex", "flag": r"c$"},
+                ]
+            )
+        )
+        assert matcher.match("CTF{abc}") == 0
+        assert matcher.match("CTF{xbc}") == 2
+
+    def test_empty_suffix(self):
+        matcher = FlagMatcher(
+            make_config([{"type": "text", "flag": "flag"}], prefix="flag_", suffix="")
+        )
+        assert matcher.is_valid("flag_flag")
+        assert not matcher.is_valid("flag_flags")
+
+    def test_overlapping_format(self):
+        # the prefix and suffix can not share characters
+        matcher = FlagMatcher(
+            make_config([{"type": "regex", "flag": ".*"}], prefix="ab", suffix="ba")
+        )
+        assert not matcher.is_valid("aba")
+        assert matcher.is_valid("abba")
+
+    @pytest.mark.parametrize("prefix", [None, ""])
+    def test_no_format(self, prefix):
+        matcher = FlagMatcher(
+            make_config([{"type": "text", "flag": "flag"}], prefix=prefix, suffix="}")
+        )
+        assert matcher.is_valid("flag")
+        assert not matcher.is_valid("CTF{flag}")
+
+
+def make_challenge(challenge_id, flags, prefix="CTF{"):
+    config = make_config(flags, prefix=prefix)
+    config["title"] = f"challenge {challenge_id}"
+    config["challenge_id"] = challenge_id
+    return config
+
+
+class Test_FlagIndex:
+    def make_index(self):
+        index = FlagIndex()
+        index.add(make_challenge("a", [{"type": "text", "flag": "alpha"}]))
+        index.add(
+            make_challenge(
+                "b",
+                [{"type": "text", "flag": "beta"}, {"type": "regex", "flag": "^al"}],
+            ),
+            name="b_name",
+        )
+        index.add(make_challenge("c", [{"type": "text", "flag": "beta"}], prefix=None))
+        return index
+
+    def test_match(self):
+        index = self.make_index()
+        assert index.match("a", "CTF{alpha}")
+        assert not index.match("a", "CTF{beta}")
+        assert index.match("c", "beta")
+        assert index.match("d", "CTF{alpha}") is None
+        assert index.names["a"] == "challenge a"
+        assert index.names["b"] == "b_name"
+
+    def test_duplicate_id(self):
+        index = self.make_index()
+        with pytest.raises(CriticalException, match="same challenge ID"):
+            index.add(make_challenge("a", []))
+
+    def test_no_id(self):
+        with pytest.raises(CriticalException, match="no challenge ID"):
+            FlagIndex().add(make_challenge(None, []))
+
+    def rows(self):
+        return [
+            ("a", "CTF{alpha}"),
+            ("a", "CTF{beta}"),
+            ("b", "CTF{beta}"),
+            ("b", "CTF{alpine}"),
+            ("c", "CTF{beta}"),
+            ("d", "CTF{alpha}"),
+        ] * 5
+
+    def test_verify(self):
+        result = self.make_index().verify(self.rows())
+        assert result.correct == {"a": 5, "b": 10}
+        assert result.incorrect == {"a": 5, "c": 5}
+        assert result.unknown == {"d": 5}
+
+    def csv(self):
+        return "challenge_id,submission\n" + "".join(
+            f'{challenge_id},"{submission}"\n'
+            for challenge_id, submission in self.rows()
+        )
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_verify_csv(self, jobs):
+        index = self.make_index()
+        f = io.StringIO(self.csv(), newline="")
+        assert index.verify_csv(f, jobs=jobs, chunk_size=4) == index.verify(self.rows())
+
+    def test_collisions(self):
+        assert self.make_index().collisions() == [("CTF{alpha}", ["a", "b"])]
+
+
+def test_parse_submissions():
+    lines = io.StringIO(
+        'challenge_id,submission\na,"CTF{with,comma}"\n\nb,"CTF{multi\nline}"\n',
+        newline="",
+    )
+    assert list(parse_submissions(lines)) == [
+        ("a", "CTF{with,comma}"),
+        ("b", "CTF{multi\nline}"),
+    ]
+    assert list(parse_submissions(["a,b\n"], skip_header=False)) == [("a", "b")]
+    with pytest.raises(CriticalException, match="exactly two columns"):
+        list(parse_submissions(["a,b,c\n"]))
+
+
+def test_split_records():
+    lines = ['a,"1\n', '2"\n', "b,3\n", "c,4\n"]
+    assert list(split_records(lines, 1)) == ['a,"1\n2"\n', "b,3\n", "c,4\n"]
+    assert list(split_records(lines, 3)) == ['a,"1\n2"\nb,3\n', "c,4\n"]
@@ -0,0 +1,65 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from utils import populate_dir, testpath
+
+budgets = json.loads((testpath / "import_budget.json").read_text())
+
+
+def measure_imports(args, cwd):
+    """Runs challtools with ``python -X importtime`` and returns the self import time of every imported module in microseconds."""
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if key not in ["_ARGCOMPLETE", "CHALLTOOLS_NO_CACHE"]
+    }
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-X",
+            "importtime",
+            "-c",
+            f"from challtools.entry import main; main({args!r})",
+        ],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, name = line[len("import time:") :].split("|")
+        modules[name.strip()] = int(self_time)
+    return modules
+
+
+@pytest.mark.parametrize("name", budgets)
+def test_import_budget(tmp_path, name):
+    budget = budgets[name]
+    populate_dir(tmp_path, "minimal_valid")
+    # run once beforehand so that the validation cache is populated
+    measure_imports(budget["args"], tmp_path)
+
+    modules = measure_imports(budget["args"], tmp_path)
+
+    forbidden = [
+        module
+        for module in modules
+        if any(
+            module == forbidden or module.startswith(forbidden + ".")
+            for forbidden in budget["forbidden_modules"]
+        )
+    ]
+    assert not forbidden, f"challtools {name} imported {forbidden}"
+
+    total = sum(modules.values())
+    assert (
+        total <= budget["max_import_time_us"]
+    ), f"challtools {name} spent {total}us importing modules, the budget is {budget['max_import_time_us']}us"
@@ -0,0 +1,97 @@
+import datetime
+import os
+
+import pytest
+import yaml
+
+from challtools import loader
+from challtools.loader import get_loader, load_yaml, parse_yaml
+
+
+@pytest.fixture(autouse=True)
+def clear_memo(monkeypatch):
+    monkeypatch.setattr(loader, "_memo", {})
+    monkeypatch.delenv("CHALLTOOLS_NO_CACHE", raising=False)
+
+
+def fail_parse(data):
+    raise AssertionError("parsed again")
+
+
+def test_get_loader():
+    if yaml.__with_libyaml__:
+        assert get_loader() is yaml.CSafeLoader
+    else:
+        assert get_loader() is yaml.SafeLoader
+
+
+class Test_parse_yaml:
+    def test_parse(self):
+        assert parse_yaml("a: [1, b]\nc: null\n") == {"a": [1, "b"], "c": None}
+        assert parse_yaml(b"") is None
+
+    def test_unsafe(self):
+        with pytest.raises(yaml.YAMLError):
+            parse_yaml("!!python/object/apply:os.system ['true']")
+
+    def test_cached(self, tmp_path, monkeypatch):
+        path = tmp_path / "challenge.yml"
+        path.write_text("title: test\n")
+        assert parse_yaml("title: test\n", path) == {"title": "test"}
+        assert len(list((tmp_path / ".challtools" / "cache" / "yaml").iterdir())) == 1
+
+        monkeypatch.setattr(loader, "_parse", fail_parse)
+        assert parse_yaml("title: test\n", path) == {"title": "test"}
+
+    def test_not_marshallable(self, tmp_path):
+        path = tmp_path / "challenge.yml"
+        path.write_text("date: 2024-01-01\n")
+        assert parse_yaml("date: 2024-01-01\n", path) == {
+            "date": datetime.date(2024, 1, 1)
+        }
+        assert not (tmp_path / ".challtools" / "cache" / "yaml").exists()
+
+    def test_cache_disabled(self, tmp_path, monkeypatch):
+        monkeypatch.setenv("CHALLTOOLS_NO_CACHE", "1")
+        assert parse_yaml("title: test\n", tmp_path / "challenge.yml")
+        assert not (tmp_path / ".challtools").exists()
+
+
+class Test_load_yaml:
+    def test_memoized(self, tmp_path, monkeypatch):
+        path = tmp_path / "challenge.yml"
+        path.write_text("flags: [a]\n")
+        first = load_yaml(path)
+        first["flags"].append("b")
+
+        monkeypatch.setattr(loader, "_parse", fail_parse)
+        monkeypatch.setattr(loader, "parse_yaml", fail_parse)
+        assert load_yaml(path) == {"flags": ["a"]}
+
+    def test_changed(self, tmp_path):
+        path = tmp_path / "challenge.yml"
+        path.write_text("title: a\n")
+        assert load_yaml(path) == {"title": "a"}
+        path.write_text("title: bc\n")
+        assert load_yaml(path) == {"title": "bc"}
+
+        stat = path.stat()
+        path.write_text("title: de\n")
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000))
+        assert load_yaml(path) == {"title": "de"}
+
+    def test_not_marshallable(self, tmp_path):
+        path = tmp_path / "challenge.yml"
+        path.write_text("dates: [2024-01-01]\n")
+        load_yaml(path)["dates"].clear()
+        assert load_yaml(path) == {"dates": [datetime.date(2024, 1, 1)]}
+
+    def test_missing(self, tmp_path):
+        with pytest.raises(OSError):
+            load_yaml(tmp_path / "challenge.yml")
+
+    def test_invalid(self, tmp_path):
+        path = tmp_path / "challenge.yml"
+        path.write_text("a: [\n")
+        with pytest.raises(yaml.YAMLError):
+            load_yaml(path)
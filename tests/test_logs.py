@@ -0,0 +1,117 @@
+import re
+import threading
+import time
+
+from challtools import logs
+from challtools.logs import LogMultiplexer, format_timestamp, split_log_lines
+
+
+class FakeContainer:
+    def __init__(self, chunks, delay=0, keep_open=None):
+        self.chunks = chunks
+        self.delay = delay
+        self.keep_open = keep_open
+
+    def logs(self, **kwargs):
+        assert kwargs["stream"] and kwargs["follow"] and kwargs["timestamps"]
+        return self._stream()
+
+    def _stream(self):
+        for chunk in self.chunks:
+            time.sleep(self.delay)
+            yield chunk
+        if self.keep_open:
+            self.keep_open.wait()
+
+
+def strip_colors(line):
+    return re.sub(r"\033\[[\d;]*m", "", line)
+
+
+class Test_split_log_lines:
+    def test_partial(self):
+        chunks = [b"first li", b"ne\nsecond\nthi", b"rd"]
+        assert list(split_log_lines(chunks)) == [b"first line", b"second", b"third"]
+
+    def test_long_line(self, monkeypatch):
+        monkeypatch.setattr(logs, "MAX_LINE_LENGTH", 4)
+        assert list(split_log_lines([b"abcdefghij"])) == [b"abcd", b"efgh", b"ij"]
+
+
+class Test_format_timestamp:
+    def test_docker(self):
+        assert re.fullmatch(
+            r"\d\d:\d\d:\d\d\.123", format_timestamp(b"2024-05-01T12:00:00.123456789Z")
+        )
+
+    def test_invalid(self):
+        assert re.fullmatch(r"\d\d:\d\d:\d\d\.\d{3}", format_timestamp(b"garbage"))
+
+
+class Test_LogMultiplexer:
+    def test_merged(self):
+        still_running = threading.Event()
+        lines = []
+        multiplexer = LogMultiplexer(
+            {
+                "web": FakeContainer(
+                    [
+                        b"2024-05-01T12:00:00.1Z hello\n",
+                        b"2024-05-01T12:00:01.2Z bye\n",
+                    ],
+                    delay=0.01,
+                ),
+                "database": FakeContainer(
+                    [b"2024-05-01T12:00:00.5Z ready\n"], keep_open=still_running
+                ),
+            },
+            output=lines.append,
+        )
+        try:
+            assert multiplexer.run() == "web"
+        finally:
+            still_running.set()
+            multiplexer.stop()
+
+        lines = [strip_colors(line) for line in lines]
+        assert [line for line in lines if line.startswith("web")] == [
+            line for line in lines if "hello" in line or "bye" in line
+        ]
+        assert any(re.fullmatch(r"web      \S+ \| hello", line) for line in lines)
+        assert any(re.fullmatch(r"database \S+ \| ready", line) for line in lines)
+
+    def test_bounded(self):
+        chunks = [f"2024-05-01T12:00:00Z line {i}\n".encode() for i in range(200)]
+        lines = []
+        multiplexer = LogMultiplexer(
+            {"chatty": FakeContainer(chunks)},
+            max_queued_lines=5,
+            output=lambda line: (lines.append(line), time.sleep(0.001)),
+        )
+        assert multiplexer.run() == "chatty"
+        multiplexer.stop()
+        assert [strip_colors(line).split("| ")[1] for line in lines] == [
+            f"line {i}" for i in range(200)
+        ]
+        assert multiplexer.queue.maxsize == 5
+
+    def test_continuation(self, monkeypatch):
+        monkeypatch.setattr(logs, "MAX_LINE_LENGTH", 32)
+        lines = []
+        multiplexer = LogMultiplexer(
+            {
+                "web": FakeContainer(
+                    [b"2024-05-01T12:00:00Z " + b"a" * 11 + b"2024 b", b"\n"]
+                )
+            },
+            output=lines.append,
+        )
+        assert multiplexer.run() == "web"
+        multiplexer.stop()
+        assert [strip_colors(line).split("| ")[1] for line in lines] == [
+            "a" * 11,
+            "2024 b",
+        ]
+
+    def test_no_containers(self):
+        assert LogMultiplexer({}).run() is None
@@ -0,0 +1,146 @@
+import os
+import socket
+import subprocess
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import docker
+import pytest
+
+from challtools.exceptions import CriticalException
+from challtools.ports import (
+    PortAllocator,
+    PortLeases,
+    allocate_ports,
+    is_port_free,
+    lease_ports,
+    stable_port,
+)
+
+
+@pytest.fixture(autouse=True)
+def lease_path(tmp_path, monkeypatch):
+    path = tmp_path / "leases" / "port-leases.json"
+    monkeypatch.setenv("CHALLTOOLS_PORT_LEASES", str(path))
+    return path
+
+
+@pytest.fixture()
+def bound_port():
+    sock = socket.socket()
+    sock.bind(("", 0))
+    sock.listen()
+    yield sock.getsockname()[1]
+    sock.close()
+
+
+class FakeContainers:
+    def __init__(self, statuses):
+        self.statuses = statuses
+
+    def get(self, container_id):
+        if container_id not in self.statuses:
+            raise docker.errors.NotFound(f"No such container: {container_id}")
+        return type("Container", (), {"status": self.statuses[container_id]})
+
+
+class FakeClient:
+    def __init__(self, statuses):
+        self.containers = FakeContainers(statuses)
+
+
+class Test_PortAllocator:
+    def test_reserved(self):
+        allocator = PortAllocator(
+            start_port=50000, reserved={50000, 50002}, probe=False
+        )
+        assert [allocator.allocate() for _ in range(3)] == [50001, 50003, 50004]
+
+    def test_probe(self, bound_port):
+        assert not is_port_free(bound_port)
+        # ephemeral ports may lie above the default range
+        allocator = PortAllocator(start_port=bound_port, end_port=65535)
+        assert allocator.allocate() != bound_port
+
+    def test_exhausted(self):
+        allocator = PortAllocator(start_port=50000, end_port=50001, probe=False)
+        allocator.allocate()
+        allocator.allocate()
+        with pytest.raises(CriticalException):
+            allocator.allocate()
+
+    def test_stable(self):
+        port = stable_port("chall/web/80", 50000, 50009)
+        assert 50000 <= port <= 50009
+        assert port == stable_port("chall/web/80", 50000, 50009)
+
+        allocator = PortAllocator(start_port=50000, end_port=50009, probe=False)
+        assert allocator.allocate_stable("chall/web/80") == port
+        # collisions move to the next free port, wrapping around
+        assert (
+            allocator.allocate_stable("chall/web/80") == (port - 50000 + 1) % 10 + 50000
+        )
+
+    def test_stable_exhausted(self):
+        allocator = PortAllocator(
+            start_port=50000, end_port=50001, reserved={50000, 50001}, probe=False
+        )
+        with pytest.raises(CriticalException):
+            allocator.allocate_stable("key")
+
+
+class Test_PortLeases:
+    def test_persisted(self, lease_path):
+        ports = allocate_ports(2)
+        assert len(set(ports)) == 2
+        with PortLeases() as leases:
+            assert leases.ports() == set(ports)
+        assert lease_path.is_file()
+
+    def test_leased_ports_skipped(self):
+        first = allocate_ports(3)
+        second = allocate_ports(3)
+        assert not set(first) & set(second)
+
+    def test_reserved(self):
+        (port,) = allocate_ports(1, reserved={50000})
+        assert port != 50000
+
+    def test_dead_process(self):
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "from challtools.ports import allocate_ports; print(allocate_ports(1)[0])",
+            ],
+            check=True,
+            capture_output=True,
+            text=True,
+        )
+        port = int(process.stdout)
+        with PortLeases() as leases:
+            assert port not in leases.ports()
+
+    def test_container(self):
+        ports = allocate_ports(2)
+        lease_ports(ports[:1], "running")
+        lease_ports(ports[1:], "removed")
+        with PortLeases(FakeClient({"running": "running"})) as leases:
+            assert leases.ports() == set(ports[:1])
+
+    def test_container_without_client(self):
+        ports = allocate_ports(1)
+        lease_ports(ports, "removed")
+        with PortLeases() as leases:
+            assert leases.ports() == set(ports)
+
+    def test_concurrent(self):
+        with ThreadPoolExecutor(8) as executor:
+            results = list(executor.map(lambda _: allocate_ports(5), range(8)))
+        ports = [port for result in results for port in result]
+        assert len(set(ports)) == len(ports) == 40
+
+    def test_corrupt(self, lease_path):
+        lease_path.parent.mkdir()
+        lease_path.write_text("not json")
+        assert len(allocate_ports(1)) == 1
@@ -0,0 +1,183 @@
+import json
+
+import docker
+import pytest
+
+from challtools.progress import (
+    LayerProgress,
+    ProgressPrinter,
+    closing_stream,
+    decode_json_stream,
+    is_layer_event,
+)
+
+
+def split_every(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+class Test_decode_json_stream:
+    def test_lines(self):
+        chunks = [b'{"stream": "a"}\r\n{"stream": "b"}\r\n', b'{"stream": "c"}\r\n']
+        assert list(decode_json_stream(chunks)) == [
+            {"stream": "a"},
+            {"stream": "b"},
+            {"stream": "c"},
+        ]
+
+    @pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+    def test_split_objects(self, size):
+        events = [{"stream": f"Step {i}/10 : RUN echo ü\n"} for i in range(10)]
+        data = b"".join(json.dumps(event).encode() + b"\r\n" for event in events)
+        assert list(decode_json_stream(split_every(data, size))) == events
+
+    def test_split_multibyte(self):
+        data = json.dumps({"stream": "ü"}, ensure_ascii=False).encode()
+        index = data.index("ü".encode()) + 1
+        assert list(decode_json_stream([data[:index], data[index:]])) == [
+            {"stream": "ü"}
+        ]
+
+    def test_concatenated(self):
+        assert list(decode_json_stream([b'{"a": 1}{"b": 2}  {"c"', b": 3}"])) == [
+            {"a": 1},
+            {"b": 2},
+            {"c": 3},
+        ]
+
+    def test_empty(self):
+        assert list(decode_json_stream([b"", b"\r\n", b""])) == []
+
+    def test_malformed_line(self):
+        with pytest.raises(json.JSONDecodeError):
+            list(decode_json_stream([b'{"a": 1}\r\nnot json\r\n{"b": 2}']))
+
+    def test_truncated(self):
+        with pytest.raises(json.JSONDecodeError):
+            list(decode_json_stream([b'{"a": 1}\r\n{"b": ']))
+
+
+class FakeRaw:
+    """The raw urllib3 response of a chunked docker API stream."""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.closed = False
+        self._fp = self
+        self.chunked = True
+        self.chunk_left = None
+
+    def read(self, amount):
+        return self.chunks.pop(0) if self.chunks else b""
+
+
+class FakeResponse:
+    def __init__(self, chunks):
+        self.raw = FakeRaw(chunks)
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class Test_closing_stream:
+    def test_docker_stream(self):
+        response = FakeResponse([b'{"stream": "a"}\n', b'{"stream": "b"}\n'])
+        stream = docker.APIClient(version="1.41")._stream_helper(response)
+        with closing_stream(stream):
+            assert json.loads(next(stream)) == {"stream": "a"}
+        assert response.closed
+        with pytest.raises(StopIteration):
+            next(stream)
+
+    def test_plain_iterable(self):
+        with closing_stream([b"a"]) as stream:
+            assert list(stream) == [b"a"]
+
+
+def test_is_layer_event():
+    assert is_layer_event({"status": "Downloading", "id": "abc", "progressDetail": {}})
+    assert is_layer_event({"status": "Mounted from library/alpine", "id": "abc"})
+    assert not is_layer_event({"status": "Pulling from library/alpine", "id": "3.18"})
+    assert not is_layer_event({"status": "Downloading"})
+    assert not is_layer_event({"stream": "Step 1/2"})
+
+
+class Test_LayerProgress:
+    def test_pull(self):
+        progress = LayerProgress("alpine")
+        progress.update({"status": "Pulling fs layer", "id": "a"})
+        progress.update({"status": "Pulling fs layer", "id": "b"})
+        progress.update(
+            {
+                "status": "Downloading",
+                "id": "a",
+                "progressDetail": {"current": 1000000, "total": 4000000},
+            }
+        )
+        # extraction progress does not count as transferred
+        progress.update(
+            {
+                "status": "Extracting",
+                "id": "a",
+                "progressDetail": {"current": 3000000, "total": 4000000},
+            }
+        )
+        assert progress.line() == "alpine: 0/2 layers, 1.0/4.0 MB"
+        assert not progress.update({"status": "Download complete", "id": "a"})
+        assert progress.update({"status": "Pull complete", "id": "a"})
+        assert progress.update({"status": "Already exists", "id": "b"})
+        assert progress.line(rate=2e6) == "alpine: 2/2 layers, 4.0/4.0 MB, 2.0 MB/s"
+
+    def test_ignores_other_events(self):
+        progress = LayerProgress("alpine")
+        assert not progress.update({"status": "Pulling from library/alpine", "id": "3"})
+        assert not progress.update({"stream": "Step 1/2"})
+        assert progress.layers == {}
+
+
+class Test_ProgressPrinter:
+    def downloading(self, current):
+        return {
+            "status": "Downloading",
+            "id": "a",
+            "progressDetail": {"current": current, "total": 10000000},
+        }
+
+    def test_throttled(self):
+        now = [0.0]
+        lines = []
+        printer = ProgressPrinter(
+            LayerProgress("alpine"), output=lines.append, clock=lambda: now[0]
+        )
+        for i in range(1, 100):
+            now[0] = i / 20
+            assert printer.update(self.downloading(i * 100000))
+        # 5 seconds of events at a 2 second interval
+        assert lines == [
+            "alpine: 0/1 layers, 4.0/10.0 MB, 2.0 MB/s",
+            "alpine: 0/1 layers, 8.0/10.0 MB, 2.0 MB/s",
+        ]
+
+        printer.finish()
+        assert lines[-1] == "alpine: 0/1 layers, 9.9/10.0 MB"
+        printer.finish()
+        assert len(lines) == 3
+
+    def test_layer_finished(self):
+        lines = []
+        printer = ProgressPrinter(LayerProgress("alpine"), output=lines.append)
+        printer.update({"status": "Pulling fs layer", "id": "a"})
+        printer.update(self.downloading(10000000))
+        assert lines == []
+        printer.update({"status": "Pull complete", "id": "a"})
+        assert lines == ["alpine: 1/1 layers, 10.0/10.0 MB"]
+        printer.finish()
+        assert len(lines) == 1
+
+    def test_other_events(self):
+        lines = []
+        printer = ProgressPrinter(LayerProgress("alpine"), output=lines.append)
+        assert not printer.update({"stream": "Step 1/2"})
+        printer.finish()
+        assert lines == []
@@ -0,0 +1,191 @@
+import http.server
+import socket
+import threading
+import time
+
+import pytest
+
+from challtools import readiness
+from challtools.readiness import (
+    get_targets,
+    has_healthcheck,
+    probe_http,
+    probe_tcp,
+    wait_for_targets,
+    wait_until_ready,
+)
+
+
+class FakeContainer:
+    def __init__(self, healthcheck=None, health_statuses=(), status="running"):
+        self.health_statuses = list(health_statuses)
+        self.attrs = {
+            "Config": {"Healthcheck": {"Test": healthcheck}} if healthcheck else {},
+            "State": {"Status": status},
+        }
+
+    def reload(self):
+        if self.health_statuses:
+            self.attrs["State"]["Health"] = {"Status": self.health_statuses.pop(0)}
+
+
+def make_config(*services):
+    return {
+        "deployment": {
+            "containers": {
+                "challenge": {"services": list(services)},
+            }
+        }
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture()
+def tcp_server():
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    yield server.getsockname()[1]
+    server.close()
+
+
+@pytest.fixture()
+def http_server():
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(404)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+
+class Test_probes:
+    def test_tcp(self, tcp_server):
+        assert probe_tcp("127.0.0.1", tcp_server) == readiness.READY
+
+    def test_tcp_closed(self):
+        assert probe_tcp("127.0.0.1", free_port()) == readiness.WAITING
+
+    def test_http(self, http_server):
+        assert probe_http("127.0.0.1", http_server) == readiness.READY
+
+    def test_http_closed(self):
+        assert probe_http("127.0.0.1", free_port()) == readiness.WAITING
+
+
+class Test_has_healthcheck:
+    def test_healthcheck(self):
+        assert has_healthcheck(FakeContainer(["CMD", "true"]))
+
+    def test_none(self):
+        assert not has_healthcheck(FakeContainer())
+        assert not has_healthcheck(FakeContainer(["NONE"]))
+
+
+class Test_wait_until_ready:
+    def test_ready(self, tcp_server, http_server):
+        config = make_config(
+            {"type": "tcp", "internal_port": 1337, "external_port": tcp_server},
+            {"type": "website", "internal_port": 80, "external_port": http_server},
+        )
+        results = wait_until_ready([FakeContainer()], config, deadline=5)
+        assert [(result.name, result.method) for result in results] == [
+            ("challenge:1337", "tcp"),
+            ("challenge:80", "http"),
+        ]
+        assert all(result.ready for result in results)
+
+    def test_delayed(self):
+        port = free_port()
+        server = socket.socket()
+
+        def listen():
+            time.sleep(0.3)
+            server.bind(("127.0.0.1", port))
+            server.listen()
+
+        thread = threading.Thread(target=listen)
+        thread.start()
+        try:
+            config = make_config(
+                {"type": "tcp", "internal_port": 1337, "external_port": port}
+            )
+            (result,) = wait_until_ready([FakeContainer()], config, deadline=5)
+            assert result.ready
+            assert 0.3 <= result.elapsed < 5
+        finally:
+            thread.join()
+            server.close()
+
+    def test_network(self, tcp_server):
+        container = FakeContainer()
+        container.attrs["NetworkSettings"] = {
+            "Networks": {"isolated": {"IPAddress": "127.0.0.1"}}
+        }
+        config = make_config({"type": "tcp", "internal_port": tcp_server})
+        (result,) = wait_until_ready(
+            [container], config, deadline=5, network="isolated"
+        )
+        assert result.ready
+
+    def test_timeout(self):
+        config = make_config(
+            {"type": "tcp", "internal_port": 1337, "external_port": free_port()}
+        )
+        (result,) = wait_until_ready([FakeContainer()], config, deadline=0.3)
+        assert not result.ready
+        assert result.reason == "timeout"
+
+    def test_exited(self):
+        config = make_config(
+            {"type": "tcp", "internal_port": 1337, "external_port": free_port()}
+        )
+        (result,) = wait_until_ready(
+            [FakeContainer(status="exited")], config, deadline=5
+        )
+        assert not result.ready
+        assert result.reason == "exited"
+
+    def test_healthcheck(self):
+        container = FakeContainer(
+            ["CMD", "true"], health_statuses=["starting", "starting", "healthy"]
+        )
+        config = make_config(
+            {"type": "tcp", "internal_port": 1337, "external_port": free_port()}
+        )
+        (result,) = wait_until_ready([container], config, deadline=5)
+        assert result.ready
+        assert result.method == "healthcheck"
+        assert result.name == "challenge"
+
+    def test_unhealthy(self):
+        container = FakeContainer(["CMD", "false"], health_statuses=["unhealthy"])
+        (result,) = wait_until_ready([container], make_config(), deadline=5)
+        assert not result.ready
+        assert result.reason == "unhealthy"
+
+
+class Test_wait_for_targets:
+    def test_backoff(self, monkeypatch):
+        sleeps = []
+        monkeypatch.setattr(readiness.time, "sleep", sleeps.append)
+        statuses = [readiness.WAITING] * 4 + [readiness.READY]
+        targets = get_targets([], make_config())
+        targets.append(readiness._Target("target", "tcp", lambda: statuses.pop(0)))
+
+        (result,) = wait_for_targets(targets, deadline=60)
+        assert result.ready
+        assert sleeps == [0.05, 0.1, 0.2, 0.4]
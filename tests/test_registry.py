@@ -0,0 +1,250 @@
+import json
+import threading
+import time
+
+import docker
+import pytest
+
+from challtools.exceptions import CriticalException
+from challtools.registry import (
+    PUSHED,
+    UNCHANGED,
+    PushProgress,
+    get_local_digests,
+    push_images,
+    split_repo,
+)
+
+
+class FakeRegistryImage:
+    def __init__(self, client, image_id):
+        self.client = client
+        self.id = image_id
+        self.attrs = {"Id": image_id, "RepoDigests": []}
+
+    def tag(self, repository, tag=None):
+        self.client.images_by_tag[repository] = self
+        return True
+
+
+class FakeRegistryData:
+    def __init__(self, digest):
+        self.id = digest
+
+
+class FakeRegistryImages:
+    """Behaves like the image collection of a docker daemon pushing to a registry:2 instance."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, name):
+        if name not in self.client.images_by_tag:
+            raise docker.errors.ImageNotFound(f"No such image: {name}")
+        return self.client.images_by_tag[name]
+
+    def get_registry_data(self, name):
+        if name not in self.client.registry:
+            raise docker.errors.NotFound(f"{name}: not found")
+        return FakeRegistryData(self.client.registry[name])
+
+    def push(self, repository, stream=False):
+        return self.client.push_stream(repository)
+
+
+class FakeRegistryClient:
+    def __init__(self, layers=3, push_time=0):
+        self.images = FakeRegistryImages(self)
+        self.images_by_tag = {}
+        self.registry = {}
+        self.layers = layers
+        self.push_time = push_time
+        self.pushes = []
+        self.failing = set()
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def add_image(self, tag, image_id):
+        self.images_by_tag[tag] = FakeRegistryImage(self, image_id)
+
+    def push_stream(self, repository):
+        with self.lock:
+            self.pushes.append(repository)
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            name, tag = split_repo(repository)
+            yield json.dumps(
+                {"status": f"The push refers to repository [{name}]"}
+            ).encode()
+            for i in range(self.layers):
+                layer = f"layer{i}"
+                yield json.dumps({"status": "Preparing", "id": layer}).encode()
+                for current in [500000, 1000000]:
+                    time.sleep(self.push_time)
+                    yield json.dumps(
+                        {
+                            "status": "Pushing",
+                            "id": layer,
+                            "progressDetail": {"current": current, "total": 1000000},
+                        }
+                    ).encode() + b"\r\n"
+                if repository in self.failing:
+                    yield json.dumps({"error": "denied: access forbidden"}).encode()
+                    return
+                yield json.dumps({"status": "Pushed", "id": layer}).encode()
+
+            image = self.images_by_tag[repository]
+            digest = "sha256:" + image.id.split(":")[1][::-1]
+            self.registry[repository] = digest
+            image.attrs["RepoDigests"].append(f"{name}@{digest}")
+            yield json.dumps({"status": f"{tag}: digest: {digest}", "id": tag}).encode()
+            yield json.dumps(
+                {"aux": {"Tag": tag, "Digest": digest, "Size": 1000}}
+            ).encode()
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+class Test_split_repo:
+    def test_tag(self):
+        assert split_repo("registry.example/chall:v1") == (
+            "registry.example/chall",
+            "v1",
+        )
+
+    def test_no_tag(self):
+        assert split_repo("chall") == ("chall", "latest")
+
+    def test_port(self):
+        assert split_repo("localhost:5000/chall") == ("localhost:5000/chall", "latest")
+
+
+def test_get_local_digests():
+    client = FakeRegistryClient()
+    client.add_image("chall", "sha256:1234")
+    image = client.images.get("chall")
+    image.attrs["RepoDigests"] = [
+        "localhost:5000/chall@sha256:aaaa",
+        "localhost:5000/other@sha256:bbbb",
+    ]
+    assert get_local_digests(image, "localhost:5000/chall") == {"sha256:aaaa"}
+    assert get_local_digests(image, "localhost:5000/chall:latest") == {"sha256:aaaa"}
+    assert get_local_digests(image, "localhost:5001/chall") == set()
+
+
+class Test_PushProgress:
+    def test_layers(self):
+        progress = PushProgress("localhost:5000/chall")
+        assert not progress.update({"status": "Preparing", "id": "a"})
+        assert not progress.update({"status": "Preparing", "id": "b"})
+        assert not progress.update(
+            {
+                "status": "Pushing",
+                "id": "a",
+                "progressDetail": {"current": 500000, "total": 2000000},
+            }
+        )
+        assert progress.line() == "localhost:5000/chall: 0/2 layers, 0.5/2.0 MB"
+        assert progress.update({"status": "Layer already exists", "id": "b"})
+        assert progress.update({"status": "Pushed", "id": "a"})
+        assert not progress.update({"status": "Pushed", "id": "a"})
+        assert progress.line() == "localhost:5000/chall: 2/2 layers, 2.0/2.0 MB"
+
+    def test_digest(self):
+        progress = PushProgress("localhost:5000/chall")
+        progress.update({"status": "latest: digest: sha256:abcd", "id": "latest"})
+        progress.update({"aux": {"Tag": "latest", "Digest": "sha256:abcd"}})
+        assert progress.digest == "sha256:abcd"
+        assert progress.layers == {}
+
+    def test_error(self):
+        progress = PushProgress("localhost:5000/chall")
+        with pytest.raises(CriticalException):
+            progress.update({"error": "denied"})
+
+
+class Test_push_images:
+    def test_push(self):
+        client = FakeRegistryClient()
+        client.add_image("chall", "sha256:1234")
+        lines = []
+        results = push_images(
+            client, [("chall", "localhost:5000/chall")], output=lines.append
+        )
+        assert results == [("localhost:5000/chall", PUSHED, "sha256:4321")]
+        assert client.pushes == ["localhost:5000/chall"]
+        # one line per finished layer, not per progress event
+        assert [line for line in lines if "layers" in line] == [
+            "localhost:5000/chall: 1/1 layers, 1.0/1.0 MB",
+            "localhost:5000/chall: 2/2 layers, 2.0/2.0 MB",
+            "localhost:5000/chall: 3/3 layers, 3.0/3.0 MB",
+        ]
+
+    def test_unchanged(self):
+        client = FakeRegistryClient()
+        client.add_image("chall", "sha256:1234")
+        push_images(client, [("chall", "localhost:5000/chall")], output=print)
+        results = push_images(client, [("chall", "localhost:5000/chall")], output=print)
+        assert results[0].status == UNCHANGED
+        assert client.pushes == ["localhost:5000/chall"]
+
+    def test_force(self):
+        client = FakeRegistryClient()
+        client.add_image("chall", "sha256:1234")
+        push_images(client, [("chall", "localhost:5000/chall")], output=print)
+        results = push_images(
+            client, [("chall", "localhost:5000/chall")], force=True, output=print
+        )
+        assert results[0].status == PUSHED
+        assert len(client.pushes) == 2
+
+    def test_changed(self):
+        client = FakeRegistryClient()
+        client.add_image("chall", "sha256:1234")
+        push_images(client, [("chall", "localhost:5000/chall")], output=print)
+        # rebuilding the image creates a new image without any repo digests
+        client.add_image("chall", "sha256:5678")
+        results = push_images(client, [("chall", "localhost:5000/chall")], output=print)
+        assert results[0].status == PUSHED
+        assert client.registry["localhost:5000/chall"] == "sha256:8765"
+
+    def test_parallel(self):
+        client = FakeRegistryClient(push_time=0.02)
+        images = []
+        for i in range(4):
+            client.add_image(f"chall{i}", f"sha256:{i}")
+            images.append((f"chall{i}", f"localhost:5000/chall{i}"))
+        results = push_images(client, images, jobs=4, output=print)
+        assert [result.repo for result in results] == [repo for _, repo in images]
+        assert all(result.status == PUSHED for result in results)
+        assert client.max_running > 1
+
+    def test_failure(self):
+        client = FakeRegistryClient()
+        client.add_image("chall", "sha256:1234")
+        client.failing.add("localhost:5000/chall")
+        with pytest.raises(CriticalException, match="access forbidden"):
+            push_images(client, [("chall", "localhost:5000/chall")], output=print)
+
+
+@pytest.mark.fails_without_docker
+def test_registry(docker_client):
+    registry = docker_client.containers.run(
+        "registry:2", detach=True, ports={"5000/tcp": ("127.0.0.1", None)}
+    )
+    try:
+        registry.reload()
+        port = registry.ports["5000/tcp"][0]["HostPort"]
+        repo = f"localhost:{port}/challtools_test_registry"
+        docker_client.images.pull("busybox", tag="latest")
+        time.sleep(1)
+
+        results = push_images(docker_client, [("busybox", repo)], output=print)
+        assert results[0].status == PUSHED
+        results = push_images(docker_client, [("busybox", repo)], output=print)
+        assert results[0].status == UNCHANGED
+    finally:
+        registry.remove(force=True)
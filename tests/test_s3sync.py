@@ -0,0 +1,146 @@
+import hashlib
+import threading
+
+import pytest
+
+from challtools.exceptions import CriticalException
+from challtools.s3sync import plan_sync, sync_files
+
+
+class FakeObject:
+    def __init__(self, object_name, size, etag, metadata):
+        self.object_name = object_name
+        self.size = size
+        self.etag = etag
+        self.metadata = metadata
+
+
+class FakeMinio:
+    """An in-memory stand-in for minio.Minio that records the requests made."""
+
+    def __init__(self, list_metadata=True):
+        self.objects = {}
+        self.list_metadata = list_metadata
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def put(self, key, data, metadata=None):
+        self.objects[key] = (data, metadata or {})
+
+    def _object(self, key, with_metadata):
+        data, metadata = self.objects[key]
+        return FakeObject(
+            key,
+            len(data),
+            f'"{hashlib.md5(data).hexdigest()}"',
+            (
+                {f"X-Amz-Meta-{k.title()}": v for k, v in metadata.items()}
+                if with_metadata
+                else None
+            ),
+        )
+
+    def list_objects(self, bucket, prefix=None, recursive=False, **kwargs):
+        self.calls.append(("list", prefix))
+        return [
+            self._object(key, self.list_metadata)
+            for key in sorted(self.objects)
+            if key.startswith(prefix)
+        ]
+
+    def stat_object(self, bucket, key):
+        self.calls.append(("stat", key))
+        obj = self._object(key, True)
+        obj.metadata = {k.lower(): v for k, v in obj.metadata.items()}
+        return obj
+
+    def fput_object(self, bucket, key, file_path, metadata=None, **kwargs):
+        with self.lock:
+            self.calls.append(("upload", key))
+        with open(file_path, "rb") as f:
+            self.put(key, f.read(), metadata)
+
+    def remove_objects(self, bucket, delete_objects):
+        keys = [obj.name for obj in delete_objects]
+        self.calls.append(("delete", keys))
+        for key in keys:
+            del self.objects[key]
+        return iter([])
+
+
+@pytest.fixture()
+def files(tmp_path):
+    (tmp_path / "a.txt").write_text("first file")
+    (tmp_path / "b.txt").write_text("second file")
+    return {"a.txt": tmp_path / "a.txt", "b.txt": tmp_path / "b.txt"}
+
+
+def uploads(client):
+    return sorted(call[1] for call in client.calls if call[0] == "upload")
+
+
+class Test_sync_files:
+    def test_initial(self, files):
+        client = FakeMinio()
+        plan = sync_files(client, "bucket", "folder/", files, output=lambda *a: None)
+        assert uploads(client) == ["folder/a.txt", "folder/b.txt"]
+        assert plan.delete == []
+        assert client.objects["folder/a.txt"][0] == b"first file"
+
+    def test_unchanged(self, files):
+        client = FakeMinio()
+        sync_files(client, "bucket", "folder/", files, output=lambda *a: None)
+        client.calls.clear()
+
+        plan = sync_files(client, "bucket", "folder/", files, output=lambda *a: None)
+        assert uploads(client) == []
+        assert sorted(plan.unchanged) == ["folder/a.txt", "folder/b.txt"]
+        assert client.calls == [("list", "folder/")]
+
+    def test_changed_and_stale(self, files):
+        client = FakeMinio()
+        sync_files(client, "bucket", "folder/", files, output=lambda *a: None)
+        client.put("folder/old.txt", b"stale")
+        client.calls.clear()
+
+        files["a.txt"].write_text("first file, changed")
+        plan = sync_files(client, "bucket", "folder/", files, output=lambda *a: None)
+        assert uploads(client) == ["folder/a.txt"]
+        assert plan.unchanged == ["folder/b.txt"]
+        assert ("delete", ["folder/old.txt"]) in client.calls
+        assert "folder/old.txt" not in client.objects
+
+    def test_same_size_changed(self, files):
+        client = FakeMinio()
+        sync_files(client, "bucket", "folder/", files, output=lambda *a: None)
+        files["a.txt"].write_text("FIRST FILE")
+        plan_uploads = plan_sync(client, "bucket", "folder/", files).upload
+        assert [key for key, _, _ in plan_uploads] == ["folder/a.txt"]
+
+    def test_metadata_not_listed(self, files):
+        client = FakeMinio(list_metadata=False)
+        sync_files(client, "bucket", "folder/", files, output=lambda *a: None)
+        client.calls.clear()
+
+        plan = sync_files(client, "bucket", "folder/", files, output=lambda *a: None)
+        assert uploads(client) == []
+        assert len(plan.unchanged) == 2
+        assert [call[0] for call in client.calls].count("stat") == 2
+
+    def test_etag_fallback(self, files):
+        client = FakeMinio(list_metadata=False)
+        client.put("folder/a.txt", b"first file")
+        client.put("folder/b.txt", b"other data!")
+        plan = plan_sync(client, "bucket", "folder/", files)
+        assert plan.unchanged == ["folder/a.txt"]
+        assert [key for key, _, _ in plan.upload] == ["folder/b.txt"]
+
+    def test_upload_error(self, files):
+        client = FakeMinio()
+
+        def fail(*args, **kwargs):
+            raise OSError("connection reset")
+
+        client.fput_object = fail
+        with pytest.raises(CriticalException):
+            sync_files(client, "bucket", "folder/", files, output=lambda *a: None)
@@ -5,20 +5,26 @@ from pathlib import Path
 import docker
 import pytest
 import yaml
-from utils import populate_dir
+from utils import FakeDockerClient, FakeImage, populate_dir
 
+from challtools import utils
 from challtools.exceptions import CriticalException
 from challtools.utils import (
+    PrefixedOutput,
     build_chall,
     build_image,
+    build_images,
     create_docker_name,
     discover_challenges,
+    docker_resource_exists,
     format_user_service,
+    get_context_digest,
     get_ctf_config_path,
     get_first_text_flag,
     get_valid_config,
     load_config,
     load_ctf_config,
+    load_valid_configs,
     process_messages,
     start_chall,
     start_solution,
@@ -103,6 +109,14 @@ class Test_get_valid_config:
         with pytest.raises(CriticalException):
             get_valid_config()
 
+    def test_output(self, tmp_path, capsys):
+        populate_dir(tmp_path, "schema_violation")
+        lines = []
+        with pytest.raises(CriticalException):
+            get_valid_config(output=lambda text="": lines.append(text))
+        assert any("A002" in line for line in lines)
+        assert not capsys.readouterr().out
+
 
 class Test_discover_challenges:
     def test_root(self, tmp_path):
@@ -133,6 +147,39 @@ class Test_discover_challenges:
             tmp_path / "chall3" / "challenge.yml",
         }
 
+    def test_ignored(self, tmp_path):
+        populate_dir(tmp_path, "simple_ctf")
+        (tmp_path / ".challtoolsignore").write_text("chall2/\n")
+        assert set(discover_challenges()) == {
+            tmp_path / "chall1" / "challenge.yml",
+            tmp_path / "chall3" / "challenge.yml",
+        }
+
+    def test_missing(self, tmp_path):
+        populate_dir(tmp_path, "minimal_valid")
+        assert discover_challenges() is None
+
+
+class Test_load_valid_configs:
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_valid(self, tmp_path, monkeypatch, jobs):
+        monkeypatch.setattr(utils, "PARALLEL_LOAD_THRESHOLD", 1)
+        populate_dir(tmp_path, "simple_ctf")
+        paths = sorted(discover_challenges())
+        configs = load_valid_configs(paths, jobs=jobs)
+        assert [path for path, _ in configs] == paths
+        assert [config["title"] for _, config in configs] == [
+            get_valid_config(path, cd=False)["title"] for path in paths
+        ]
+
+    @pytest.mark.parametrize("jobs", [1, 2])
+    def test_invalid(self, tmp_path, monkeypatch, jobs):
+        monkeypatch.setattr(utils, "PARALLEL_LOAD_THRESHOLD", 1)
+        populate_dir(tmp_path, "simple_ctf")
+        (tmp_path / "chall2" / "challenge.yml").write_text("title: 1\n")
+        with pytest.raises(CriticalException):
+            load_valid_configs(discover_challenges(), jobs=jobs)
+
 
 class Test_get_first_text_flag:
     def test_exists(self, tmp_path):
@@ -248,7 +295,89 @@ class Test_validate_flag:
         assert not validate_flag(config, "12345678")
 
 
+class Test_docker_resource_exists:
+    def test_image(self):
+        client = FakeDockerClient()
+        client.images_by_tag["challenge"] = FakeImage(["challenge:latest"])
+        assert docker_resource_exists(client.images, "challenge")
+        assert docker_resource_exists(client.images, "challenge:latest")
+        assert not docker_resource_exists(client.images, "other")
+
+    def test_network_exact_name(self, monkeypatch):
+        client = docker.DockerClient(base_url="tcp://127.0.0.1:1", version="1.41")
+        # the daemon matches the name as a substring and "cafe" as a partial ID
+        networks = [{"Name": "cafe-net", "Id": "cafe01"}]
+        monkeypatch.setattr(client.api, "networks", lambda **kwargs: networks)
+        assert not docker_resource_exists(client.networks, "cafe")
+        networks.append({"Name": "cafe", "Id": "beef01"})
+        assert docker_resource_exists(client.networks, "cafe")
+
+    def test_volume_exact_name(self, monkeypatch):
+        client = docker.DockerClient(base_url="tcp://127.0.0.1:1", version="1.41")
+        volumes = {"Volumes": [{"Name": "data2"}]}
+        monkeypatch.setattr(client.api, "volumes", lambda **kwargs: volumes)
+        assert not docker_resource_exists(client.volumes, "data")
+        volumes["Volumes"].append({"Name": "data"})
+        assert docker_resource_exists(client.volumes, "data")
+
+    @pytest.mark.fails_without_docker
+    def test_network(self, docker_client):
+        assert docker_resource_exists(docker_client.networks, "bridge")
+        assert not docker_resource_exists(
+            docker_client.networks, "challtools_test_missing_network"
+        )
+
+
+class Test_get_context_digest:
+    def test_deterministic(self, tmp_path):
+        populate_dir(tmp_path, "trivial_tcp")
+        assert get_context_digest("container") == get_context_digest("container")
+
+    def test_changed(self, tmp_path):
+        populate_dir(tmp_path, "trivial_tcp")
+        digest = get_context_digest("container")
+        with Path("container/service").open("a") as f:
+            f.write("\n")
+        assert get_context_digest("container") != digest
+
+    def test_added(self, tmp_path):
+        populate_dir(tmp_path, "trivial_tcp")
+        digest = get_context_digest("container")
+        Path("container/new_file").touch()
+        assert get_context_digest("container") != digest
+
+    def test_dockerignore(self, tmp_path):
+        populate_dir(tmp_path, "trivial_tcp")
+        Path("container/.dockerignore").write_text("ignored\n")
+        digest = get_context_digest("container")
+        Path("container/ignored").write_text("not part of the context")
+        assert get_context_digest("container") == digest
+
+
 class Test_build_image:
+    def test_unchanged(self, tmp_path, capsys):
+        populate_dir(tmp_path, "trivial_tcp")
+        client = FakeDockerClient()
+        assert build_image("container", "challtools_test", client)
+        assert not build_image("container", "challtools_test", client)
+        assert client.builds == ["challtools_test"]
+        assert "up to date" in capsys.readouterr().out
+
+    def test_changed(self, tmp_path):
+        populate_dir(tmp_path, "trivial_tcp")
+        client = FakeDockerClient()
+        build_image("container", "challtools_test", client)
+        Path("container/new_file").touch()
+        assert build_image("container", "challtools_test", client)
+        assert client.builds == ["challtools_test"] * 2
+
+    def test_force_rebuild(self, tmp_path):
+        populate_dir(tmp_path, "trivial_tcp")
+        client = FakeDockerClient()
+        build_image("container", "challtools_test", client)
+        assert build_image("container", "challtools_test", client, force_rebuild=True)
+        assert client.builds == ["challtools_test"] * 2
+
     @pytest.mark.fails_without_docker
     def test_simple(self, tmp_path, docker_client, clean_container_state):
         populate_dir(tmp_path, "trivial_tcp")
@@ -258,6 +387,55 @@ class Test_build_image:
         ]
 
 
+class Test_build_images:
+    def make_builds(self, count):
+        for i in range(count):
+            Path(f"container{i}").mkdir()
+            Path(f"container{i}/Dockerfile").write_text(f"FROM scratch\n# {i}\n")
+        return [(f"image {i}", f"container{i}", f"tag{i}") for i in range(count)]
+
+    def test_concurrent(self, tmp_path, capsys):
+        os.chdir(tmp_path)
+        client = FakeDockerClient()
+        client.build_steps = 3
+        client.build_step_time = 0.05
+        assert build_images(self.make_builds(4), client, jobs=2)
+        assert sorted(client.builds) == ["tag0", "tag1", "tag2", "tag3"]
+        assert client.api.max_running == 2
+        out = capsys.readouterr().out
+        assert "image 3 |" in out
+        assert "Step 2" in out
+
+    def test_sequential(self, tmp_path, capsys):
+        os.chdir(tmp_path)
+        client = FakeDockerClient()
+        assert build_images(self.make_builds(2), client, jobs=1)
+        assert client.builds == ["tag0", "tag1"]
+        assert " |" not in capsys.readouterr().out
+
+    def test_output(self, tmp_path, capsys):
+        os.chdir(tmp_path)
+        output = PrefixedOutput("[chall] ")
+        assert build_images(self.make_builds(2), FakeDockerClient(), output=output)
+        output.flush()
+        lines = capsys.readouterr().out.splitlines()
+        assert lines
+        assert all(line.startswith("[chall] ") for line in lines)
+        assert any("image 1 |" in line for line in lines)
+
+    def test_fail_fast(self, tmp_path):
+        os.chdir(tmp_path)
+        client = FakeDockerClient()
+        client.build_steps = 5
+        client.build_step_time = 0.05
+        client.failing_tags = {"tag0"}
+        with pytest.raises(CriticalException, match="build failed"):
+            build_images(self.make_builds(6), client, jobs=2)
+        assert "tag5" not in client.builds
+        assert not client.images_by_tag
+        assert client.api.running == 0
+
+
 class Test_build_chall:
     # TODO challenges with muliple containers
     # TODO build scripts
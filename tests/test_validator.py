@@ -1,3 +1,5 @@
+import yaml
+
 from challtools.validator import ConfigValidator
 
 
@@ -21,6 +23,28 @@ class Test_A002:
         assert not success
         assert any([error["code"] == "A002" for error in errors])
 
+    def test_not_object(self):
+        validator = ConfigValidator(["title"])
+
+        success, errors = validator.validate()
+        assert not success
+        assert any([error["code"] == "A002" for error in errors])
+        assert validator.normalized_config is None
+
+
+class Test_normalization:
+    def test_defaults(self):
+        config = get_min_valid_config()
+        validator = ConfigValidator(config)
+
+        success, _ = validator.validate()
+        assert success
+        assert validator.normalized_config["flag_format_suffix"] == "}"
+        assert validator.normalized_config["flags"] == [
+            {"flag": "test_flag", "type": "text"}
+        ]
+        assert "flag_format_suffix" not in config
+
 
 class Test_A005:
     def test_valid(self):
@@ -123,3 +147,44 @@ class Test_A008:
 
         assert success
         assert any([error["code"] == "A008" for error in errors])
+
+
+class Test_validate_many:
+    def write_configs(self, tmp_path):
+        paths = []
+        for i in range(3):
+            (tmp_path / f"chall{i}").mkdir()
+            config = get_min_valid_config()
+            config["categories"] = f"category {i}"
+            path = tmp_path / f"chall{i}" / "challenge.yml"
+            path.write_text(yaml.safe_dump(config))
+            paths.append(path)
+        return paths
+
+    def test_processes(self, tmp_path):
+        paths = self.write_configs(tmp_path)
+        results = list(
+            ConfigValidator.validate_many(
+                paths, ctf_config={"categories": ["category 0"]}, jobs=2
+            )
+        )
+        assert sorted(result[0] for result in results) == paths
+        assert all(result[1] for result in results)
+        invalid_categories = {
+            result[0]
+            for result in results
+            if any(message["code"] == "B002" for message in result[2])
+        }
+        assert invalid_categories == set(paths[1:])
+
+    def test_inline(self, tmp_path):
+        paths = self.write_configs(tmp_path)
+        paths[0].write_text("title: [")
+        results = list(ConfigValidator.validate_many(paths, jobs=1))
+        assert [result[0] for result in results] == paths
+        assert not results[0][1]
+        assert results[0][2][0]["code"] == "A009"
+        assert all(
+            any(message["code"] == "B001" for message in result[2])
+            for result in results[1:]
+        )
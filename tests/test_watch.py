@@ -0,0 +1,117 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from challtools.watch import (
+    InotifyWatcher,
+    PollingWatcher,
+    affected_directories,
+    create_watcher,
+)
+
+watchers = [
+    pytest.param(
+        lambda root, files=(): PollingWatcher(root, files, settle=0.05, interval=0.05),
+        id="polling",
+    ),
+    pytest.param(
+        lambda root, files=(): InotifyWatcher(root, files, settle=0.05),
+        id="inotify",
+        marks=pytest.mark.skipif(
+            not sys.platform.startswith("linux"), reason="inotify is Linux only"
+        ),
+    ),
+]
+
+
+def later(function, delay=0.1):
+    """Runs a function in the background after a delay, so that it happens while waiting."""
+    thread = threading.Timer(delay, function)
+    thread.start()
+    return thread
+
+
+@pytest.mark.parametrize("make_watcher", watchers)
+class Test_Watcher:
+    def test_timeout(self, tmp_path, make_watcher):
+        with make_watcher(tmp_path) as watcher:
+            start = time.monotonic()
+            assert watcher.wait(timeout=0.2) == set()
+            assert time.monotonic() - start >= 0.2
+
+    def test_modified(self, tmp_path, make_watcher):
+        (tmp_path / "challenge.yml").write_text("title: a\n")
+        with make_watcher(tmp_path) as watcher:
+            later(lambda: (tmp_path / "challenge.yml").write_text("title: bc\n"))
+            assert watcher.wait(timeout=5) == {tmp_path / "challenge.yml"}
+
+    def test_batched(self, tmp_path, make_watcher):
+        with make_watcher(tmp_path) as watcher:
+
+            def write():
+                (tmp_path / "a").write_text("a")
+                time.sleep(0.01)
+                (tmp_path / "b").write_text("b")
+
+            later(write)
+            assert watcher.wait(timeout=5) == {tmp_path / "a", tmp_path / "b"}
+
+    def test_new_directory(self, tmp_path, make_watcher):
+        with make_watcher(tmp_path) as watcher:
+
+            def create():
+                (tmp_path / "container" / "src").mkdir(parents=True)
+                (tmp_path / "container" / "src" / "main.c").write_text("int main;")
+
+            later(create)
+            assert tmp_path / "container" / "src" / "main.c" in watcher.wait(timeout=5)
+
+            later(lambda: (tmp_path / "container" / "src" / "main.c").write_text(""))
+            assert watcher.wait(timeout=5) == {
+                tmp_path / "container" / "src" / "main.c"
+            }
+
+    def test_removed(self, tmp_path, make_watcher):
+        (tmp_path / "file").write_text("")
+        with make_watcher(tmp_path) as watcher:
+            later((tmp_path / "file").unlink)
+            assert watcher.wait(timeout=5) == {tmp_path / "file"}
+
+    def test_hidden_skipped(self, tmp_path, make_watcher):
+        (tmp_path / ".challtools").mkdir()
+        with make_watcher(tmp_path) as watcher:
+            later(lambda: (tmp_path / ".challtools" / "entry").write_text(""))
+            assert watcher.wait(timeout=0.5) == set()
+
+    def test_outside_file(self, tmp_path, make_watcher):
+        (tmp_path / "chall").mkdir()
+        (tmp_path / "ctf.yml").write_text("")
+        with make_watcher(tmp_path / "chall", [tmp_path / "ctf.yml"]) as watcher:
+            later(lambda: (tmp_path / "other").write_text(""))
+            assert watcher.wait(timeout=0.5) == set()
+            later(lambda: (tmp_path / "ctf.yml").write_text("authors: []\n"))
+            assert watcher.wait(timeout=5) == {tmp_path / "ctf.yml"}
+
+
+def test_create_watcher(tmp_path):
+    with create_watcher(tmp_path, polling=True) as watcher:
+        assert isinstance(watcher, PollingWatcher)
+    if sys.platform.startswith("linux"):
+        with create_watcher(tmp_path) as watcher:
+            assert isinstance(watcher, InotifyWatcher)
+
+
+def test_affected_directories(tmp_path):
+    chall1 = tmp_path / "chall1"
+    chall2 = tmp_path / "category" / "chall2"
+    chall1.mkdir()
+    (chall1 / "challenge.yml").write_text("")
+    directories = [chall1, chall2]
+
+    assert affected_directories([chall1 / "challenge.yml"], directories) == {chall1}
+    assert affected_directories([chall2 / "container" / "a"], directories) == {chall2}
+    assert affected_directories([tmp_path / "category"], directories) == {chall2}
+    assert affected_directories([tmp_path], directories) == {chall1, chall2}
+    assert affected_directories([tmp_path / "other"], directories) == set()
@@ -1,5 +1,7 @@
 import os
 import shutil
+import threading
+import time
 from pathlib import Path
 
 from challtools.entry import main
@@ -29,3 +31,87 @@ def main_wrapper(args):
         exit_code = e.code or 0
 
     return exit_code
+
+
+class FakeImage:
+    def __init__(self, tags, labels=None):
+        self.tags = tags
+        self.labels = labels or {}
+
+
+class FakeImages:
+    def __init__(self, client):
+        self.client = client
+
+    def get(self, name):
+        import docker
+
+        for image in self.client.images_by_tag.values():
+            if name in image.tags or f"{name}:latest" in image.tags:
+                return image
+        raise docker.errors.ImageNotFound(f"No such image: {name}")
+
+
+class FakeAPI:
+    def __init__(self, client):
+        self.client = client
+        self.running = 0
+        self.max_running = 0
+        self.lock = threading.Lock()
+
+    def build(self, path, tag, labels=None, **kwargs):
+        with self.lock:
+            self.client.builds.append(tag)
+        return self._build_stream(tag, labels)
+
+    def _build_stream(self, tag, labels):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            for i in range(self.client.build_steps):
+                time.sleep(self.client.build_step_time)
+                if tag in self.client.failing_tags:
+                    yield b'{"error": "build failed"}\r\n'
+                yield f'{{"stream": "Step {i}\\n"}}\r\n'.encode()
+            self.client.images_by_tag[tag] = FakeImage([f"{tag}:latest"], labels)
+            yield b'{"stream": "Successfully built\\n"}\r\n'
+        finally:
+            with self.lock:
+                self.running -= 1
+
+
+class FakeDockerClient:
+    """A minimal stand-in for docker.DockerClient that keeps images in memory."""
+
+    def __init__(self):
+        self.images_by_tag = {}
+        self.builds = []
+        self.failing_tags = set()
+        self.build_steps = 1
+        self.build_step_time = 0
+        self.images = FakeImages(self)
+        self.api = FakeAPI(self)
+
+
+class ScriptedWatcher:
+    """A stand-in for challtools.watch.Watcher that makes changes itself. Every call to wait applies the next change and returns the paths it changed, and once all changes are applied, wait raises KeyboardInterrupt as if the user stopped watching."""
+
+    def __init__(self, changes):
+        self.changes = list(changes)
+
+    def wait(self, timeout=None):
+        if not self.changes:
+            raise KeyboardInterrupt
+        path, content = self.changes.pop(0)
+        path.write_text(content)
+        return {path.absolute()}
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()